@@ -0,0 +1,411 @@
+"""
+Batch processing of a large document backlog by many machines over a shared folder.
+
+Coordination uses only the filesystem, so any number of headless workers on any
+number of machines can share one backlog. Each document has a small job ticket;
+a worker claims a ticket by renaming it into the lease folder, and only one
+rename can succeed. Leases are kept alive by touching the lease file, and
+leases whose owner stopped touching them are put back in the queue. A lease's
+modification time is only compared with its own earlier values: each worker
+measures how long a lease has gone unchanged on its own monotonic clock, so
+machines do not need synchronized clocks:
+
+    python batch_coordinator.py enqueue 共用資料夾
+    python batch_coordinator.py work 共用資料夾 --processes 4
+    python batch_coordinator.py status 共用資料夾
+
+Layout of the shared folder:
+
+    input/            documents to process (any subfolders)
+    output/           results, mirroring the input folders
+    queue/todo/xx/    tickets waiting to be claimed (xx = first two hex digits of the key)
+    queue/leases/     claimed tickets, named <key>.<worker>.lease
+    queue/done/xx/    finished tickets
+    queue/failed/xx/  failed tickets with a .reason.txt
+    workers/          one heartbeat file per running worker
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import socket
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+from perf_timer import StageTimer
+from pipeline import iter_input_files, load_pipeline
+
+# 租約未更新超過此秒數視為工作程序已停止，工作票會放回佇列
+# （需遠大於共用資料夾檔案時間的精確度，例如 FAT 的 2 秒）
+DEFAULT_LEASE_SECONDS = 300
+# 佇列暫時沒有可領取的工作、但仍有其他租約時的等待間隔（秒）
+DEFAULT_POLL_INTERVAL = 5.0
+# 每次列出一個分桶後最多嘗試領取的工作票數
+CLAIM_ATTEMPTS = 32
+
+_JOB_SUFFIX = ".job"
+_LEASE_SUFFIX = ".lease"
+
+
+def job_key(relative_path):
+    """以輸入檔相對路徑的雜湊作為工作票名稱（重複加入佇列時名稱相同）"""
+    return hashlib.sha1(relative_path.replace(os.sep, "/").encode("utf-8")).hexdigest()[:20]
+
+
+class SharedQueue:
+    """共用資料夾中的工作佇列"""
+
+    def __init__(self, root):
+        """初始化佇列路徑
+
+        參數:
+            root: 共用資料夾路徑
+        """
+        self.root = root
+        self.input_dir = os.path.join(root, "input")
+        self.output_dir = os.path.join(root, "output")
+        self.todo_dir = os.path.join(root, "queue", "todo")
+        self.lease_dir = os.path.join(root, "queue", "leases")
+        self.done_dir = os.path.join(root, "queue", "done")
+        self.failed_dir = os.path.join(root, "queue", "failed")
+        self.worker_dir = os.path.join(root, "workers")
+
+    def create_dirs(self):
+        """建立佇列使用的資料夾"""
+        for path in (self.input_dir, self.output_dir, self.todo_dir, self.lease_dir, self.done_dir,
+                     self.failed_dir, self.worker_dir):
+            os.makedirs(path, exist_ok=True)
+
+    def ticket_path(self, directory, key):
+        """取得分桶後的工作票路徑（每個資料夾的檔案數保持在網路磁碟可快速列出的範圍）"""
+        return os.path.join(directory, key[:2], key + _JOB_SUFFIX)
+
+    def enqueue(self):
+        """為 input 資料夾中尚未加入佇列的文件建立工作票
+
+        回傳:
+            新增的工作票數量
+        """
+        self.create_dirs()
+        leased = {name.split(".", 1)[0] for name in os.listdir(self.lease_dir)}
+        added = 0
+        for file_path in iter_input_files([self.input_dir]):
+            relative_path = os.path.relpath(file_path, self.input_dir)
+            key = job_key(relative_path)
+            # 已在任何狀態的工作票不重複加入
+            if any(os.path.exists(self.ticket_path(directory, key))
+                   for directory in (self.todo_dir, self.done_dir, self.failed_dir)):
+                continue
+            if key in leased:
+                continue
+            ticket = self.ticket_path(self.todo_dir, key)
+            os.makedirs(os.path.dirname(ticket), exist_ok=True)
+            with open(ticket, "w", encoding="utf-8") as f:
+                json.dump({"path": relative_path.replace(os.sep, "/")}, f, ensure_ascii=False)
+            added += 1
+        return added
+
+    def count(self, directory):
+        """計算資料夾（含分桶）中的工作票數量"""
+        total = 0
+        if not os.path.isdir(directory):
+            return 0
+        for entry in os.scandir(directory):
+            if entry.is_dir():
+                total += sum(1 for name in os.listdir(entry.path) if name.endswith(_JOB_SUFFIX))
+            elif entry.name.endswith((_JOB_SUFFIX, _LEASE_SUFFIX)):
+                total += 1
+        return total
+
+    def status(self):
+        """各狀態的工作票數量"""
+        return {
+            "todo": self.count(self.todo_dir),
+            "leased": self.count(self.lease_dir),
+            "done": self.count(self.done_dir),
+            "failed": self.count(self.failed_dir),
+        }
+
+
+class BatchWorker:
+    """從共用佇列領取文件並處理的工作程序"""
+
+    def __init__(self, root, lease_seconds=DEFAULT_LEASE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL,
+                 protected_words_path="protected_words.json", worker_id=None):
+        """初始化工作程序
+
+        參數:
+            root: 共用資料夾路徑
+            lease_seconds: 租約的有效秒數
+            poll_interval: 等待其他租約完成或到期時的輪詢間隔（秒）
+            protected_words_path: 詞彙保護表路徑
+            worker_id: 工作程序代號，預設為主機名稱、程序代號與隨機字串
+        """
+        self.queue = SharedQueue(root)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.protected_words_path = protected_words_path
+        host = re.sub(r"[^A-Za-z0-9-]", "-", socket.gethostname())
+        self.worker_id = worker_id or f"{host}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.heartbeat_path = os.path.join(self.queue.worker_dir, f"{self.worker_id}.alive")
+        self.work_dir = os.path.join(self.queue.output_dir, ".work", self.worker_id)
+        self.pipeline = None  # 首次執行時載入，也可預先指定
+        self.processed = 0
+        self.failed = 0
+        # 租約檔名 → (修改時間, 本機首次看到此修改時間的 monotonic 時間)
+        self.observed_leases = {}
+
+    def touch_heartbeat(self):
+        """更新工作程序的心跳檔（供管理者查看仍在執行的工作程序）"""
+        with open(self.heartbeat_path, "a", encoding="utf-8"):
+            pass
+        os.utime(self.heartbeat_path)
+
+    def claim(self):
+        """領取一張工作票
+
+        將工作票改名到租約資料夾；改名是原子操作，同一張工作票只有一個工作程序會成功。
+
+        回傳:
+            租約檔案路徑，沒有可領取的工作時為 None
+        """
+        try:
+            buckets = os.listdir(self.queue.todo_dir)
+        except FileNotFoundError:
+            return None
+        random.shuffle(buckets)
+        for bucket in buckets:
+            bucket_dir = os.path.join(self.queue.todo_dir, bucket)
+            try:
+                names = [name for name in os.listdir(bucket_dir) if name.endswith(_JOB_SUFFIX)]
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            # 隨機挑選，降低多個工作程序同時搶同一張工作票的機會
+            random.shuffle(names)
+            for name in names[:CLAIM_ATTEMPTS]:
+                ticket = os.path.join(bucket_dir, name)
+                key = name[:-len(_JOB_SUFFIX)]
+                lease = os.path.join(self.queue.lease_dir, f"{key}.{self.worker_id}{_LEASE_SUFFIX}")
+                try:
+                    os.rename(ticket, lease)
+                except (FileNotFoundError, PermissionError):
+                    # 已被其他工作程序領取（Windows 上同時改名可能回報權限錯誤）
+                    continue
+                return lease
+        return None
+
+    def reclaim_expired(self):
+        """將超過有效時間未更新的租約放回佇列
+
+        租約的修改時間只用來判斷是否有更新，不與任何時鐘比較：本機以 monotonic 時間
+        記錄每個修改時間首次被看到的時刻，持續 lease_seconds 沒有變化才視為到期。
+        各機器的時鐘即使不一致（網路磁碟的修改時間可能由寫入端的時鐘決定），
+        也不會提早收回仍在更新的租約。
+
+        回傳:
+            (放回佇列的數量, 仍有效的租約數量)
+        """
+        now = time.monotonic()
+        reclaimed = active = 0
+        observed = {}
+        for name in os.listdir(self.queue.lease_dir):
+            if not name.endswith(_LEASE_SUFFIX):
+                continue
+            lease = os.path.join(self.queue.lease_dir, name)
+            try:
+                mtime = os.stat(lease).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            previous = self.observed_leases.get(name)
+            since = previous[1] if previous and previous[0] == mtime else now
+            observed[name] = (mtime, since)
+            if now - since <= self.lease_seconds:
+                active += 1
+                continue
+            key, owner = name[:-len(_LEASE_SUFFIX)].split(".", 1)
+            ticket = self.queue.ticket_path(self.queue.todo_dir, key)
+            os.makedirs(os.path.dirname(ticket), exist_ok=True)
+            try:
+                os.rename(lease, ticket)
+            except FileNotFoundError:
+                continue
+            del observed[name]
+            reclaimed += 1
+            print(f"{owner} 的租約已到期，放回佇列: {key}")
+        # 已消失的租約不再追蹤
+        self.observed_leases = observed
+        return reclaimed, active
+
+    def _heartbeat(self, lease, stop, lost):
+        """處理期間定期更新租約與工作程序的修改時間"""
+        while not stop.wait(self.lease_seconds / 4):
+            try:
+                os.utime(lease)
+            except FileNotFoundError:
+                # 租約已被其他工作程序收回
+                lost.set()
+                return
+            except OSError as e:
+                print(f"更新租約時發生錯誤: {str(e)}")
+                continue
+            try:
+                self.touch_heartbeat()
+            except OSError:
+                pass
+
+    def _finish(self, lease, key, directory):
+        """將租約改名到完成或失敗資料夾，租約已被收回時返回 False"""
+        ticket = self.queue.ticket_path(directory, key)
+        os.makedirs(os.path.dirname(ticket), exist_ok=True)
+        try:
+            os.rename(lease, ticket)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def process(self, lease):
+        """處理一張已領取的工作票
+
+        結果先寫到工作程序自己的暫存資料夾，完成後才搬到 output；同一份文件被重新處理時
+        只會以相同內容覆寫，不會留下不完整的輸出。
+
+        參數:
+            lease: 租約檔案路徑
+        """
+        key = os.path.basename(lease).split(".", 1)[0]
+        try:
+            with open(lease, "r", encoding="utf-8") as f:
+                relative_path = json.load(f)["path"]
+        except FileNotFoundError:
+            return
+        input_path = os.path.join(self.queue.input_dir, *relative_path.split("/"))
+        output_dir = os.path.join(self.queue.output_dir, os.path.dirname(relative_path))
+        work_dir = os.path.join(self.work_dir, key)
+
+        stop = threading.Event()
+        lost = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(lease, stop, lost), daemon=True)
+        heartbeat.start()
+        timer = StageTimer(relative_path)
+        try:
+            self.pipeline.process_document(input_path, work_dir, timer=timer)
+            # 整個圖片資料夾一起取代，圖片數量減少時才不會留下舊檔案
+            shutil.rmtree(os.path.join(output_dir, os.path.basename(input_path) + "_images"), ignore_errors=True)
+            os.makedirs(output_dir, exist_ok=True)
+            for name in os.listdir(work_dir):
+                os.replace(os.path.join(work_dir, name), os.path.join(output_dir, name))
+        except Exception as e:
+            stop.set()
+            heartbeat.join()
+            self.failed += 1
+            print(f"處理失敗: {relative_path}（{str(e)}）")
+            if self._finish(lease, key, self.queue.failed_dir):
+                reason_path = os.path.join(self.queue.failed_dir, key[:2], f"{key}.reason.txt")
+                with open(reason_path, "w", encoding="utf-8") as f:
+                    f.write(f"檔案: {relative_path}\n")
+                    f.write(f"工作程序: {self.worker_id}\n")
+                    f.write(f"錯誤: {str(e)}\n\n")
+                    f.write("".join(traceback.format_exception(type(e), e, e.__traceback__)))
+            return
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        stop.set()
+        heartbeat.join()
+        if lost.is_set() or not self._finish(lease, key, self.queue.done_dir):
+            # 已由其他工作程序接手；輸出內容相同，保留即可
+            print(f"租約已被收回，改由其他工作程序完成: {relative_path}")
+            return
+        self.processed += 1
+        print(f"已完成: {timer.summary()}")
+
+    def run(self, wait=True):
+        """持續領取並處理文件，直到佇列與所有租約都處理完
+
+        參數:
+            wait: 佇列已空但仍有其他工作程序的租約時，是否等待（其租約可能到期而需要接手）
+        """
+        self.queue.create_dirs()
+        if self.pipeline is None:
+            self.pipeline = load_pipeline(self.protected_words_path)
+        self.touch_heartbeat()
+        print(f"工作程序 {self.worker_id} 已啟動")
+        lease = None
+        try:
+            while True:
+                lease = self.claim()
+                if lease is not None:
+                    self.process(lease)
+                    continue
+                reclaimed, active = self.reclaim_expired()
+                if reclaimed:
+                    continue
+                if not active or not wait:
+                    break
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            # 中斷時立即歸還處理中的工作票，不必等租約到期
+            if lease is not None and os.path.exists(lease):
+                self._finish(lease, os.path.basename(lease).split(".", 1)[0], self.queue.todo_dir)
+            print("已停止")
+        finally:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            try:
+                os.unlink(self.heartbeat_path)
+            except FileNotFoundError:
+                pass
+        print(f"工作程序 {self.worker_id} 結束：完成 {self.processed} 份，失敗 {self.failed} 份")
+
+
+def run_worker(root, lease_seconds, poll_interval, protected_words_path):
+    """在獨立程序中執行一個工作程序"""
+    BatchWorker(root, lease_seconds, poll_interval, protected_words_path).run()
+
+
+def main(argv=None):
+    """批次協調主入口點"""
+    parser = argparse.ArgumentParser(description="多台電腦透過共用資料夾分工處理大量文件")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="為 input 資料夾中的新文件建立工作票")
+    enqueue_parser.add_argument("root", help="共用資料夾")
+
+    work_parser = subparsers.add_parser("work", help="領取並處理文件")
+    work_parser.add_argument("root", help="共用資料夾")
+    work_parser.add_argument("--processes", type=int, default=1, help="本機的工作程序數量")
+    work_parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="租約有效秒數")
+    work_parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL, help="輪詢間隔（秒）")
+    work_parser.add_argument("--protected-words", default="protected_words.json", help="詞彙保護表路徑")
+
+    status_parser = subparsers.add_parser("status", help="顯示各狀態的工作票數量")
+    status_parser.add_argument("root", help="共用資料夾")
+    args = parser.parse_args(argv)
+
+    queue = SharedQueue(args.root)
+    if args.command == "enqueue":
+        print(f"新增 {queue.enqueue()} 張工作票")
+    elif args.command == "status":
+        status = queue.status()
+        print(f"待處理 {status['todo']}，處理中 {status['leased']}，完成 {status['done']}，失敗 {status['failed']}")
+    elif args.processes <= 1:
+        BatchWorker(args.root, args.lease, args.interval, args.protected_words).run()
+    else:
+        processes = [multiprocessing.Process(target=run_worker,
+                                             args=(args.root, args.lease, args.interval, args.protected_words))
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Module for checkpointing batch runs in an append-only manifest so they can be resumed.
+"""
+import datetime
+import hashlib
+import json
+import os
+import traceback
+
+from perf_timer import StageTimer
+
+# 同一份文件在內容與設定不變時最多處理的次數（含中途當機）
+DEFAULT_MAX_ATTEMPTS = 3
+
+STATUS_STARTED = "started"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# 計算內容雜湊時每次讀取的位元組數
+_HASH_BLOCK = 1024 * 1024
+
+# Pipeline.process_document 在輸出名稱後加上的後綴
+_OUTPUT_SUFFIXES = (".txt", ".docx", "_images")
+
+
+def file_hash(file_path):
+    """計算檔案內容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def settings_fingerprint(**settings):
+    """以會影響校正結果的設定（保護詞彙、錯字字典、正規化規則等）計算指紋
+
+    參數:
+        settings: 可序列化為 JSON 的設定值
+
+    回傳:
+        十六進位字串
+    """
+    data = json.dumps(settings, ensure_ascii=False, sort_keys=True, default=list)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+class BatchManifest:
+    """批次處理的清單，每處理一份文件附加記錄（內容雜湊、狀態、輸出檔與各階段耗時）
+
+    每筆記錄寫入後同步到磁碟；重新載入時同一份文件以最後一筆記錄為準，
+    最後一行因當機而不完整時略過。
+    """
+
+    def __init__(self, path):
+        """載入既有的清單
+
+        參數:
+            path: 清單路徑（JSON lines）
+        """
+        self.path = path
+        self.records = {}  # 文件路徑 → 最後一筆記錄
+        self._partial_line = False  # 最後一行沒有換行（寫入途中當機）
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._partial_line = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.records[record["path"]] = record
+
+    def append(self, record):
+        """附加一筆記錄並同步到磁碟"""
+        record["time"] = datetime.datetime.now().isoformat(timespec="seconds")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            # 不完整的最後一行先換行，避免新記錄接在後面而無法讀取
+            if self._partial_line:
+                f.write("\n")
+                self._partial_line = False
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[record["path"]] = record
+
+    def plan(self, file_path, fingerprint, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """判斷文件是否需要處理
+
+        大小與修改時間都與上次完成時相同就不重新計算雜湊；內容相同但修改時間改變時
+        只更新記錄。內容或設定改變時重新計算嘗試次數。
+
+        參數:
+            file_path: 文件路徑
+            fingerprint: 目前設定的指紋
+            max_attempts: 最多處理次數
+
+        回傳:
+            (是否處理, 新記錄)；不處理時新記錄為略過的原因
+        """
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        record = self.records.get(key)
+        if (record and record["status"] == STATUS_DONE and record["settings"] == fingerprint
+                and record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns):
+            return False, "已完成"
+
+        content_hash = file_hash(file_path)
+        entry = {"path": key, "hash": content_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                 "settings": fingerprint, "attempts": 1}
+        if record and record["hash"] == content_hash and record["settings"] == fingerprint:
+            if record["status"] == STATUS_DONE:
+                # 只有修改時間改變，更新記錄後下次不必再計算雜湊
+                self.append(dict(record, size=stat.st_size, mtime_ns=stat.st_mtime_ns))
+                return False, "已完成"
+            if record["attempts"] >= max_attempts:
+                return False, f"已失敗 {record['attempts']} 次"
+            entry["attempts"] = record["attempts"] + 1
+        return True, entry
+
+
+def _output_claims(base):
+    """一份文件可能產生的輸出（文字、.docx 與圖片資料夾），用於比對是否重複
+
+    參數:
+        base: 輸出資料夾中的輸出名稱（不含後綴）
+
+    回傳:
+        正規化後的路徑列表
+    """
+    return [os.path.normcase(os.path.abspath(base + suffix)) for suffix in _OUTPUT_SUFFIXES]
+
+
+def plan_jobs(manifest, jobs, output_dir):
+    """在派送任何文件之前比對所有文件的輸出路徑
+
+    已完成的記錄與排在前面的文件優先擁有其輸出；之後輸出重複的文件標記為衝突，
+    不會在處理後才發現結果已被覆寫。
+
+    參數:
+        manifest: BatchManifest
+        jobs: (文件路徑, 輸出相對路徑) 的迭代器
+        output_dir: 輸出資料夾
+
+    回傳:
+        (文件路徑, 輸出相對路徑, 已擁有該輸出的文件或 None) 的列表
+    """
+    owners = {}  # 輸出路徑 → 產生它的文件
+    for record in manifest.records.values():
+        if record["status"] != STATUS_DONE:
+            continue
+        if record.get("output"):
+            claims = _output_claims(record["output"])
+        else:
+            claims = [os.path.normcase(os.path.abspath(path)) for path in record.get("outputs", [])]
+        for claim in claims:
+            owners[claim] = record["path"]
+
+    planned = []
+    for file_path, relative_path in jobs:
+        key = os.path.abspath(file_path)
+        claims = _output_claims(os.path.join(output_dir, relative_path))
+        owner = next((owners[claim] for claim in claims if owners.get(claim, key) != key), None)
+        if owner is None:
+            for claim in claims:
+                owners[claim] = key
+        planned.append((file_path, relative_path, owner))
+    return planned
+
+
+def run_batch(pipeline, jobs, output_dir, manifest_path, max_attempts=DEFAULT_MAX_ATTEMPTS, **options):
+    """依清單執行可中斷、可續跑的批次處理
+
+    開始處理前先寫入 started 記錄，因此在處理中當機的文件也會計入嘗試次數，
+    不會因為同一份文件反覆當機而永遠無法完成批次。所有文件的輸出路徑在處理
+    任何文件之前就先比對（見 plan_jobs），輸出已屬於另一份文件時不處理並計為失敗。
+
+    參數:
+        pipeline: pipeline.Pipeline（以其 fingerprint 判斷設定是否改變）
+        jobs: (文件路徑, 輸出相對路徑) 的迭代器（見 pipeline.iter_input_jobs）
+        output_dir: 輸出資料夾
+        manifest_path: 清單路徑
+        max_attempts: 同一份文件最多處理的次數
+        options: 傳給 Pipeline.process_document 的其他參數
+
+    回傳:
+        {"done": 完成數, "failed": 失敗數, "skipped": 略過數}
+    """
+    manifest = BatchManifest(manifest_path)
+    counts = {"done": 0, "failed": 0, "skipped": 0}
+
+    for file_path, relative_path, owner in plan_jobs(manifest, jobs, output_dir):
+        if owner is not None:
+            counts["failed"] += 1
+            print(f"輸出路徑與 {owner} 重複，未處理: {file_path}")
+            continue
+        try:
+            process, entry = manifest.plan(file_path, pipeline.fingerprint, max_attempts)
+        except OSError as e:
+            counts["failed"] += 1
+            print(f"無法讀取 {file_path}: {str(e)}")
+            continue
+        if not process:
+            counts["skipped"] += 1
+            print(f"略過（{entry}）: {file_path}")
+            continue
+
+        entry["output"] = os.path.abspath(os.path.join(output_dir, relative_path))
+        manifest.append(dict(entry, status=STATUS_STARTED))
+        timer = StageTimer(os.path.basename(file_path))
+        try:
+            result = pipeline.process_document(file_path, output_dir, timer=timer, relative_path=relative_path,
+                                               **options)
+        except Exception as e:
+            counts["failed"] += 1
+            print(f"處理 {file_path} 時發生錯誤（第 {entry['attempts']} 次）: {str(e)}")
+            manifest.append(dict(entry, status=STATUS_FAILED, stages=timer.rounded_stages(), error=str(e),
+                                 traceback="".join(traceback.format_exception(type(e), e, e.__traceback__))))
+            continue
+        counts["done"] += 1
+        print(timer.summary())
+        manifest.append(dict(entry, status=STATUS_DONE, outputs=result.outputs, stages=result.stages))
+    return counts
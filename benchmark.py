@@ -0,0 +1,280 @@
+"""
+Reproducible benchmark suite for the correction and document ingestion code paths.
+
+Synthetic corpora (plain text and .docx files) are generated from a fixed seed,
+every benchmark is timed headlessly, and the results are written as JSON so they
+can be compared against a stored baseline:
+
+    python benchmark.py --output bench_results.json
+    python benchmark.py --quick --baseline bench_results.json --output bench_quick.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import document_reader
+from paragraph_formatter import ParagraphFormatter
+from pipeline import build_pipeline
+from typo_corrector import TypoCorrector, convert_with_protected_words
+
+# 合成語料使用的字元：常用繁體字、常見簡體字與標點
+_TRADITIONAL_CHARS = "的一是在不了有和人這中大為上個國我以要他時來用們生到作地於出就分對成會可主發年動同工也能下過子說產種面而方後多定行學法所民得經"
+_SIMPLIFIED_CHARS = "这个为们来时说发过国会对经学动产种实现点长还书车门问间"
+_PUNCTUATION = "，。、；：「」"
+_PROTECTED_WORDS = ["台積電", "群組", "陽台", "平台", "行政院", "資訊處", "公文系統", "電子簽章"]
+
+TEXT_SIZES = [10 * 1024, 1024 * 1024, 10 * 1024 * 1024, 50 * 1024 * 1024]
+QUICK_TEXT_SIZES = [10 * 1024, 256 * 1024]
+
+DOCX_CORPORA = [
+    # (名稱, 頁數, 表格數, 圖片數, 是否加密)
+    ("docx_10p", 10, 2, 2, False),
+    ("docx_100p", 100, 10, 8, False),
+    ("docx_100p_encrypted", 100, 10, 8, True),
+]
+QUICK_DOCX_CORPORA = [
+    ("docx_5p", 5, 1, 1, False),
+    ("docx_5p_encrypted", 5, 1, 1, True),
+]
+
+# 每頁約 30 個段落
+PARAGRAPHS_PER_PAGE = 30
+BENCHMARK_PASSWORD = "benchmark"
+
+
+def generate_paragraph(rng, min_chars=20, max_chars=120):
+    """產生一個合成段落，混合繁簡字、標點與保護詞彙"""
+    length = rng.randint(min_chars, max_chars)
+    chars = []
+    while len(chars) < length:
+        roll = rng.random()
+        if roll < 0.03:
+            chars.extend(rng.choice(_PROTECTED_WORDS))
+        elif roll < 0.15:
+            chars.append(rng.choice(_SIMPLIFIED_CHARS))
+        elif roll < 0.22:
+            chars.append(rng.choice(_PUNCTUATION))
+        else:
+            chars.append(rng.choice(_TRADITIONAL_CHARS))
+    return "".join(chars)
+
+
+def generate_text(rng, size_bytes):
+    """產生約 size_bytes 位元組（UTF-8）的合成文字，含階層編號段落"""
+    formatter = ParagraphFormatter()
+    lines = []
+    total = 0
+    index = 0
+    while total < size_bytes:
+        level = index % 5
+        line = formatter.format_paragraph(generate_paragraph(rng), level)
+        lines.append(line)
+        total += len(line.encode("utf-8")) + 1
+        index += 1
+    return "\n".join(lines)
+
+
+def generate_image(rng, width=640, height=480):
+    """產生一張隨機色塊的 PNG 圖片"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(20):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(1, width // 2), y0 + rng.randrange(1, height // 2)
+        draw.rectangle([x0, y0, x1, y1], fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def generate_docx(rng, path, pages, tables, images, encrypted=False):
+    """產生合成的 .docx 檔案
+
+    參數:
+        rng: random.Random 實例
+        path: 輸出路徑
+        pages: 頁數（每頁約 PARAGRAPHS_PER_PAGE 個段落）
+        tables: 表格數
+        images: 圖片數
+        encrypted: 是否以 BENCHMARK_PASSWORD 加密
+    """
+    from docx import Document
+    from docx.shared import Inches
+
+    doc = Document()
+    total_paragraphs = pages * PARAGRAPHS_PER_PAGE
+    # 將表格與圖片平均分散在段落之間
+    table_at = {total_paragraphs * (i + 1) // (tables + 1) for i in range(tables)}
+    image_at = {total_paragraphs * (i + 1) // (images + 1) for i in range(images)}
+    for index in range(total_paragraphs):
+        doc.add_paragraph(generate_paragraph(rng))
+        if index in table_at:
+            table = doc.add_table(rows=8, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = generate_paragraph(rng, 4, 12)
+        if index in image_at:
+            doc.add_picture(generate_image(rng), width=Inches(3))
+
+    if not encrypted:
+        doc.save(path)
+        return
+
+    from msoffcrypto.format.ooxml import OOXMLFile
+
+    plain = BytesIO()
+    doc.save(plain)
+    plain.seek(0)
+    with open(path, "wb") as f:
+        OOXMLFile(plain).encrypt(BENCHMARK_PASSWORD, f)
+
+
+def time_call(func, repeat):
+    """執行 func repeat 次並回傳最短耗時（秒）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_result(name, corpus, size_bytes, seconds):
+    """建立單筆結果，包含每秒處理的 MB 數"""
+    return {
+        "name": name,
+        "corpus": corpus,
+        "bytes": size_bytes,
+        "seconds": round(seconds, 6),
+        "mb_per_s": round(size_bytes / (1024 * 1024) / seconds, 3) if seconds > 0 else None,
+    }
+
+
+def run_text_benchmarks(rng, sizes, repeat, corrector, converter):
+    """對合成文字執行校正與段落格式化的效能測試"""
+    formatter = ParagraphFormatter()
+    # 正規化、保護詞彙與轉換融合為一次掃描的標準處理流程
+    pipeline = build_pipeline(converter.convert, _PROTECTED_WORDS)
+    results = []
+    for size in sizes:
+        text = generate_text(rng, size)
+        corpus = f"text_{size // 1024}KB"
+        size_bytes = len(text.encode("utf-8"))
+        lines = text.split("\n")
+
+        benchmarks = [
+            ("TypoCorrector.correct_text", lambda: corrector.correct_text(text)),
+            ("convert_with_protected_words",
+             lambda: convert_with_protected_words(text, _PROTECTED_WORDS, converter.convert)),
+            ("Pipeline.correct", lambda: pipeline.correct(text)),
+            ("ParagraphFormatter.detect_levels", lambda: formatter.detect_levels(lines)),
+            ("ParagraphFormatter.renumber", lambda: formatter.renumber(lines)),
+        ]
+        for name, func in benchmarks:
+            seconds = time_call(func, repeat)
+            results.append(make_result(name, corpus, size_bytes, seconds))
+            print(f"{name:<36} {corpus:<16} {seconds * 1000:10.1f} ms")
+    return results
+
+
+def run_docx_benchmarks(rng, corpora, repeat, work_dir):
+    """對合成 .docx 檔案執行讀取與圖片提取的效能測試"""
+    results = []
+    for corpus, pages, tables, images, encrypted in corpora:
+        path = os.path.join(work_dir, f"{corpus}.docx")
+        generate_docx(rng, path, pages, tables, images, encrypted)
+        size_bytes = os.path.getsize(path)
+        password = BENCHMARK_PASSWORD if encrypted else None
+
+        benchmarks = [("read_word_file", lambda: document_reader.read_word_file(path, password))]
+        if not encrypted:
+            benchmarks.append(("extract_images", lambda: document_reader.extract_images(path)))
+        for name, func in benchmarks:
+            seconds = time_call(func, repeat)
+            results.append(make_result(name, corpus, size_bytes, seconds))
+            print(f"{name:<36} {corpus:<16} {seconds * 1000:10.1f} ms")
+    return results
+
+
+def compare_with_baseline(results, baseline_path, tolerance):
+    """與基準結果比較，回傳退步的項目列表"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    baseline_index = {(r["name"], r["corpus"]): r for r in baseline.get("results", [])}
+
+    regressions = []
+    print(f"\n與基準比較: {baseline_path}")
+    for result in results:
+        reference = baseline_index.get((result["name"], result["corpus"]))
+        if not reference or not reference.get("mb_per_s") or not result["mb_per_s"]:
+            continue
+        ratio = result["mb_per_s"] / reference["mb_per_s"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            flag = "  <-- 退步"
+            regressions.append(result)
+        print(f"{result['name']:<36} {result['corpus']:<16} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    """效能測試主入口點"""
+    parser = argparse.ArgumentParser(description="文字校正工具效能測試")
+    parser.add_argument("--seed", type=int, default=1234, help="合成語料的亂數種子")
+    parser.add_argument("--repeat", type=int, default=3, help="每項測試重複次數（取最短耗時）")
+    parser.add_argument("--quick", action="store_true", help="只使用小型語料")
+    parser.add_argument("--output", default="bench_results.json", help="結果輸出的 JSON 檔案")
+    parser.add_argument("--baseline", help="用於比較的基準結果 JSON 檔案")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="允許的吞吐量下降比例，超過即視為退步")
+    args = parser.parse_args(argv)
+    if args.baseline and (os.path.normcase(os.path.realpath(args.baseline))
+                          == os.path.normcase(os.path.realpath(args.output))):
+        parser.error("--output 不可與 --baseline 相同，否則會覆寫基準結果並與自己比較")
+
+    import opencc
+
+    rng = random.Random(args.seed)
+    corrector = TypoCorrector()
+    corrector.protected_words.update(add=_PROTECTED_WORDS)
+    converter = opencc.OpenCC('s2t')
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run_text_benchmarks(rng, QUICK_TEXT_SIZES if args.quick else TEXT_SIZES,
+                                      args.repeat, corrector, converter)
+        results += run_docx_benchmarks(rng, QUICK_DOCX_CORPORA if args.quick else DOCX_CORPORA,
+                                       args.repeat, work_dir)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "quick": args.quick,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    # 先與基準比較再寫出結果
+    regressions = compare_with_baseline(results, args.baseline, args.tolerance) if args.baseline else []
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    print(f"\n結果已寫入 {args.output}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
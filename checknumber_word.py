@@ -6,6 +6,7 @@ from tkinter import Tk, Label, Button, Text, filedialog, messagebox, Toplevel, E
 from docx import Document
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
+from paragraph_formatter import to_chinese_numeral
 
 class WordDecryptorUI:
     def __init__(self, root):
@@ -104,11 +105,10 @@ class WordDecryptorUI:
         :return: 包含編號的完整內容
         """
         doc = Document(file_stream)
+        resolver = NumberingResolver(doc.part.numbering_part if self._has_numbering(doc) else None)
         content = []
         
-        for para in doc.paragraphs:
-            # 提取段落中的編號信息
-            numbering = self.extract_numbering(para)
+        for numbering, para in resolver.iter_paragraphs(doc.paragraphs):
             if numbering:
                 # 將編號與段落內容結合
                 content.append(f"{numbering} {para.text}")
@@ -117,64 +117,192 @@ class WordDecryptorUI:
         
         return "\n".join(content)
 
-    def extract_numbering(self, paragraph):
+    def _has_numbering(self, doc):
         """
-        從段落中提取編號信息
-        :param paragraph: 段落對象
-        :return: 編號字串（若存在），否則返回 None
+        檢查文件是否包含編號定義部分
+        :param doc: Document 物件
+        :return: 是否有 numbering.xml
         """
-        p = paragraph._element
-        num_pr = p.find(qn('w:numPr'))
-        if num_pr is not None:
-            # 提取編號ID和層級
-            num_id = num_pr.find(qn('w:numId')).attrib.get(qn('w:val'))
-            level = num_pr.find(qn('w:ilvl')).attrib.get(qn('w:val'))
-            
-            # 查找編號定義
-            num_def = self.find_numbering_definition(paragraph.part, num_id)
-            if num_def:
-                # 提取編號格式
-                num_text = self.extract_number_text(num_def, level)
-                return num_text
-        return None
-
-    def find_numbering_definition(self, part, num_id):
+        try:
+            return doc.part.numbering_part is not None
+        except NotImplementedError:
+            # python-docx 在沒有編號部分時會拋出 NotImplementedError
+            return False
+
+
+def _to_letters(number, upper):
+    """將數字轉為 Word 的字母編號（A..Z, AA..ZZ, ...）"""
+    letter = chr(ord('A' if upper else 'a') + (number - 1) % 26)
+    return letter * ((number - 1) // 26 + 1)
+
+
+def _to_roman(number, upper):
+    """將數字轉為羅馬數字"""
+    result = []
+    for value, symbol in _ROMAN_NUMERALS:
+        while number >= value:
+            result.append(symbol)
+            number -= value
+    text = "".join(result)
+    return text if upper else text.lower()
+
+
+_ROMAN_NUMERALS = [
+    (1000, "M"), (900, "CM"), (500, "D"), (400, "CD"), (100, "C"), (90, "XC"),
+    (50, "L"), (40, "XL"), (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I"),
+]
+
+_IDEOGRAPH_TRADITIONAL = "甲乙丙丁戊己庚辛壬癸"
+_IDEOGRAPH_ZODIAC = "子丑寅卯辰巳午未申酉戌亥"
+
+# numFmt → 格式化函數
+_NUMBER_FORMATTERS = {
+    'decimal': str,
+    'decimalZero': lambda n: f"{n:02d}",
+    'upperLetter': lambda n: _to_letters(n, True),
+    'lowerLetter': lambda n: _to_letters(n, False),
+    'upperRoman': lambda n: _to_roman(n, True),
+    'lowerRoman': lambda n: _to_roman(n, False),
+    'taiwaneseCountingThousand': to_chinese_numeral,
+    'taiwaneseCounting': to_chinese_numeral,
+    'chineseCounting': to_chinese_numeral,
+    'chineseCountingThousand': to_chinese_numeral,
+    'ideographDigital': to_chinese_numeral,
+    'chineseLegalSimplified': lambda n: to_chinese_numeral(n, financial=True),
+    'ideographLegalTraditional': lambda n: to_chinese_numeral(n, financial=True),
+    'ideographTraditional': lambda n: _IDEOGRAPH_TRADITIONAL[(n - 1) % 10],
+    'ideographZodiac': lambda n: _IDEOGRAPH_ZODIAC[(n - 1) % 12],
+    'none': lambda n: "",
+}
+
+
+class NumberingResolver:
+    """
+    依文件的 numbering.xml 計算段落的實際編號
+
+    建立時一次性索引 numId → abstractNum → 各層級格式，之後每個段落只需
+    查表與更新計數器，整體成本與文件大小成線性關係。
+    """
+
+    def __init__(self, numbering_part):
+        """
+        :param numbering_part: python-docx 的編號部分（可為 None）
         """
-        查找編號定義
-        :param part: 文件部分
-        :param num_id: 編號ID
-        :return: 編號定義的XML元素
+        self.levels = {}      # (abstractNumId, ilvl) → (start, numFmt, lvlText, lvlRestart)
+        self.num_lists = {}   # numId → (list_key, abstractNumId, {ilvl: startOverride})
+        self.counters = {}    # list_key → {ilvl: 目前計數}
+        if numbering_part is not None:
+            self._index(numbering_part.element)
+
+    def _index(self, numbering):
+        """建立 numId → abstractNum → 層級格式的索引"""
+        for abstract in numbering.iterchildren(qn('w:abstractNum')):
+            abstract_id = abstract.get(qn('w:abstractNumId'))
+            for lvl in abstract.iterchildren(qn('w:lvl')):
+                self.levels[(abstract_id, lvl.get(qn('w:ilvl')))] = self._read_level(lvl)
+
+        for num in numbering.iterchildren(qn('w:num')):
+            num_id = num.get(qn('w:numId'))
+            abstract_ref = num.find(qn('w:abstractNumId'))
+            if abstract_ref is None:
+                continue
+            abstract_id = abstract_ref.get(qn('w:val'))
+            overrides = {}
+            for override in num.iterchildren(qn('w:lvlOverride')):
+                ilvl = override.get(qn('w:ilvl'))
+                lvl = override.find(qn('w:lvl'))
+                if lvl is not None:
+                    # 覆寫整個層級定義時，以 numId 建立專屬的層級格式
+                    self.levels[(f"num:{num_id}", ilvl)] = self._read_level(lvl)
+                start_override = override.find(qn('w:startOverride'))
+                if start_override is not None:
+                    overrides[ilvl] = int(start_override.get(qn('w:val')))
+            # 同一個 abstractNum 的多個 numId 共用計數器，除非有重新起始的覆寫
+            list_key = f"num:{num_id}" if overrides else abstract_id
+            self.num_lists[num_id] = (list_key, abstract_id, overrides)
+
+    def _read_level(self, lvl):
+        """讀取單一 w:lvl 的編號設定"""
+        def value(tag, default):
+            element = lvl.find(qn(tag))
+            return element.get(qn('w:val')) if element is not None else default
+
+        restart = value('w:lvlRestart', None)
+        return (
+            int(value('w:start', '1')),
+            value('w:numFmt', 'decimal'),
+            value('w:lvlText', ''),
+            int(restart) if restart is not None else None,
+        )
+
+    def _level_definition(self, num_id, abstract_id, ilvl):
+        """取得層級定義，優先使用 lvlOverride 中的定義"""
+        return self.levels.get((f"num:{num_id}", ilvl)) or self.levels.get((abstract_id, ilvl))
+
+    def number_for(self, num_id, ilvl):
         """
-        numbering_part = part.numbering_part
-        if numbering_part:
-            num_def = numbering_part.element.find(qn(f'w:num[@w:numId="{num_id}"]'))
-            return num_def
-        return None
+        更新計數器並回傳該段落的編號文字
+        :param num_id: 段落的 numId
+        :param ilvl: 段落的編號層級（字串）
+        :return: 編號字串，若無法解析則返回 None
+        """
+        entry = self.num_lists.get(num_id)
+        if entry is None:
+            return None
+        list_key, abstract_id, overrides = entry
+        definition = self._level_definition(num_id, abstract_id, ilvl)
+        if definition is None:
+            return None
+
+        counters = self.counters.setdefault(list_key, {})
+        level = int(ilvl)
+        start = overrides.get(ilvl, definition[0])
+        counters[level] = counters[level] + 1 if level in counters else start
+
+        # 重設較深層級的計數器（lvlRestart 為 0 時不重設）
+        for deeper in [k for k in counters if k > level]:
+            deeper_definition = self._level_definition(num_id, abstract_id, str(deeper))
+            restart = deeper_definition[3] if deeper_definition else None
+            if restart is None or (restart != 0 and level < restart):
+                del counters[deeper]
+
+        _, num_fmt, lvl_text, _ = definition
+        if num_fmt == 'bullet':
+            return lvl_text
+
+        # 將 lvlText 中的 %1、%2 ... 替換為各層級目前的編號
+        result = lvl_text
+        for placeholder_level in range(level, -1, -1):
+            placeholder = f"%{placeholder_level + 1}"
+            if placeholder not in result:
+                continue
+            placeholder_definition = self._level_definition(num_id, abstract_id, str(placeholder_level))
+            fmt = placeholder_definition[1] if placeholder_definition else 'decimal'
+            count = counters.get(placeholder_level)
+            if count is None:
+                count = placeholder_definition[0] if placeholder_definition else 1
+            formatter = _NUMBER_FORMATTERS.get(fmt, str)
+            result = result.replace(placeholder, formatter(count) if count > 0 else "")
+        return result
 
-    def extract_number_text(self, num_def, level):
+    def iter_paragraphs(self, paragraphs):
         """
-        從編號定義中提取編號文本
-        :param num_def: 編號定義的XML元素
-        :param level: 編號層級
-        :return: 編號字串
+        逐一產生段落及其實際編號
+        :param paragraphs: 段落物件的可迭代對象
+        :return: (編號字串或 None, 段落) 的產生器
         """
-        lvl = num_def.find(qn(f'w:lvl[@w:ilvl="{level}"]'))
-        if lvl is not None:
-            num_fmt = lvl.find(qn('w:numFmt'))
-            if num_fmt is not None:
-                num_fmt_val = num_fmt.attrib.get(qn('w:val'))
-                if num_fmt_val == 'decimal':
-                    return "1."  # 示例：返回數字編號
-                elif num_fmt_val == 'upperLetter':
-                    return "A."  # 示例：返回大寫字母編號
-                elif num_fmt_val == 'lowerLetter':
-                    return "a."  # 示例：返回小寫字母編號
-                elif num_fmt_val == 'upperRoman':
-                    return "I."  # 示例：返回大寫羅馬數字編號
-                elif num_fmt_val == 'lowerRoman':
-                    return "i."  # 示例：返回小寫羅馬數字編號
-                # 其他格式可根據需求擴展
-        return None
+        for paragraph in paragraphs:
+            p_pr = paragraph._element.pPr
+            num_pr = p_pr.find(qn('w:numPr')) if p_pr is not None else None
+            numbering = None
+            if num_pr is not None:
+                num_id_element = num_pr.find(qn('w:numId'))
+                ilvl_element = num_pr.find(qn('w:ilvl'))
+                num_id = num_id_element.get(qn('w:val')) if num_id_element is not None else None
+                ilvl = ilvl_element.get(qn('w:val')) if ilvl_element is not None else '0'
+                if num_id and num_id != '0':
+                    numbering = self.number_for(num_id, ilvl)
+            yield numbering, paragraph
 
 if __name__ == "__main__":
     root = Tk()
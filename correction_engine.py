@@ -0,0 +1,182 @@
+"""
+Module for applying protected words, custom typo fixes and conversion in a single scan.
+"""
+import json
+import os
+import re
+import threading
+
+TYPO_DICTIONARY_FILE = "typo_dictionary.json"
+
+
+def typo_dictionary_path(protected_words_path="protected_words.json"):
+    """取得與詞彙保護表放在同一目錄的錯字字典路徑"""
+    return os.path.join(os.path.dirname(protected_words_path), TYPO_DICTIONARY_FILE)
+
+
+_typo_cache = {}  # 路徑 → (修改時間, 字典)
+_typo_cache_lock = threading.Lock()
+
+
+def load_typo_dictionary(path=TYPO_DICTIONARY_FILE):
+    """讀取錯字字典 {"錯字": "正確寫法", ...}
+
+    檔案未變更時回傳同一個字典物件，讓已編譯的比對引擎可以重複使用。
+
+    參數:
+        path: 錯字字典路徑
+
+    回傳:
+        錯字 → 正確寫法的字典（檔案不存在時為空字典）
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    with _typo_cache_lock:
+        cached = _typo_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("錯字字典格式不正確，應為 {\"錯字\": \"正確寫法\"}")
+        fixes = {wrong: right for wrong, right in data.items()
+                 if isinstance(wrong, str) and isinstance(right, str) and wrong}
+        _typo_cache[path] = (mtime, fixes)
+        return fixes
+
+
+class CorrectionEngine:
+    """將保護詞彙與錯字字典編譯成同一個比對結構，一次掃描完成保護、修正與轉換
+
+    每個位置採最長比對；同一個詞同時是保護詞彙與錯字時以保護優先。
+    """
+
+    def __init__(self, protected_words=(), typo_fixes=None):
+        """編譯比對結構
+
+        參數:
+            protected_words: 保護詞彙（保持原樣且不轉換）
+            typo_fixes: 錯字 → 正確寫法的字典（替換後不再轉換）
+        """
+        # 比對到的詞 → 替換文字；None 表示保持原樣
+        self.replacements = {}
+        for wrong, right in (typo_fixes or {}).items():
+            if wrong:
+                self.replacements[wrong] = right
+        for word in protected_words:
+            if word:
+                self.replacements[word] = None
+
+        # 所有詞的真前綴，用於決定是否繼續延長比對
+        self.prefixes = set()
+        for word in self.replacements:
+            for length in range(1, len(word)):
+                self.prefixes.add(word[:length])
+
+        # 以詞的第一個字元組成的字元類別在 C 層快速跳到可能的比對位置
+        first_chars = {word[0] for word in self.replacements}
+        self.first_char_pattern = re.compile(
+            "[" + "".join(re.escape(char) for char in sorted(first_chars)) + "]") if first_chars else None
+
+    def iter_matches(self, text):
+        """依序產生不重疊的比對結果
+
+        參數:
+            text: 要比對的文字
+
+        回傳:
+            (起始位置, 結束位置, 替換文字或 None) 的迭代器
+        """
+        if self.first_char_pattern is None:
+            return
+        replacements = self.replacements
+        prefixes = self.prefixes
+        search = self.first_char_pattern.search
+        length = len(text)
+        position = 0
+        while True:
+            match = search(text, position)
+            if match is None:
+                return
+            start = match.start()
+            best = 0
+            end = start + 1
+            while end <= length:
+                piece = text[start:end]
+                if piece in replacements:
+                    best = end
+                if piece not in prefixes:
+                    break
+                end += 1
+            if best:
+                yield start, best, replacements[text[start:best]]
+                position = best
+            else:
+                position = start + 1
+
+    def correct(self, text, convert, normalize=None, spans=None):
+        """套用保護詞彙與錯字字典，其餘文字以轉換函數處理
+
+        參數:
+            text: 要校正的文字
+            convert: 轉換函數（例如 OpenCC 的 convert）
+            normalize: 轉換前的正規化函數 normalize(片段, 前一個字元, 後一個字元)（可選）；
+                前後字元是相鄰的保護詞彙或替換後的文字，片段在文字開頭或結尾時為空字串
+            spans: 傳入列表時，依序加入保護詞彙與替換文字在結果中的 (起始位置, 結束位置)
+
+        回傳:
+            校正後的文字
+        """
+        result = []
+        last_end = 0
+        length = 0  # 已輸出文字的長度
+        previous = ""  # 已輸出文字的最後一個字元，作為正規化的前文
+        for start, end, replacement in self.iter_matches(text):
+            kept = text[start:end] if replacement is None else replacement
+            if start > last_end:
+                segment = text[last_end:start]
+                if normalize is not None:
+                    segment = normalize(segment, previous, kept[:1])
+                segment = convert(segment)
+                result.append(segment)
+                length += len(segment)
+                previous = segment[-1:] or previous
+            result.append(kept)
+            if spans is not None:
+                spans.append((length, length + len(kept)))
+            length += len(kept)
+            previous = kept[-1:] or previous
+            last_end = end
+        if last_end < len(text) or not result:
+            segment = text[last_end:]
+            if normalize is not None:
+                segment = normalize(segment, previous, "")
+            result.append(convert(segment))
+        return "".join(result)
+
+
+_engine_cache = None  # (保護詞彙物件, 錯字字典物件, 引擎)
+_engine_cache_lock = threading.Lock()
+
+
+def get_engine(protected_words, typo_fixes=None):
+    """取得已編譯的引擎；傳入的是同一組物件時重複使用上次的結果
+
+    參數:
+        protected_words: 保護詞彙列表
+        typo_fixes: 錯字字典
+
+    回傳:
+        CorrectionEngine
+    """
+    global _engine_cache
+    with _engine_cache_lock:
+        cached = _engine_cache
+        if cached is not None and cached[0] is protected_words and cached[1] is typo_fixes:
+            return cached[2]
+    engine = CorrectionEngine(protected_words, typo_fixes)
+    with _engine_cache_lock:
+        _engine_cache = (protected_words, typo_fixes, engine)
+    return engine
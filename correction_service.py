@@ -0,0 +1,352 @@
+"""
+Local HTTP service exposing the protected-word-aware correction to other tools.
+
+The service binds to localhost only and keeps a pool of worker processes whose
+OpenCC converters and protected words stay loaded between requests:
+
+    python correction_service.py --port 8765
+
+    curl --data-binary @input.txt http://127.0.0.1:8765/correct
+    curl --data-binary @input.docx http://127.0.0.1:8765/correct/docx -o output.docx
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from file_format import sniff_format, is_encrypted_format, FORMAT_DOCX
+from correction_engine import typo_dictionary_path
+from pipeline import correct_text, init_worker, split_paragraph_chunks
+from protected_word_store import store_version
+
+DEFAULT_PORT = 8765
+
+# 請求內容的大小上限
+MAX_BODY_BYTES = 100 * 1024 * 1024
+
+# 回傳 .docx 時每次寫出的位元組數
+STREAM_BYTES = 256 * 1024
+
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def correct_docx_file(source_path, output_path):
+    """在工作程序中輸出校正後的 .docx"""
+    from docx_writer import correct_docx
+
+    correct_docx(source_path, output_path, correct_text)
+
+
+class CorrectionService:
+    """持有常駐的工作程序池，詞彙保護表、其變更日誌或錯字字典更新時重新建立"""
+
+    def __init__(self, workers=None, protected_words_path="protected_words.json"):
+        """初始化服務
+
+        參數:
+            workers: 工作程序數量，預設為 CPU 數量
+            protected_words_path: 詞彙保護表路徑
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.protected_words_path = protected_words_path
+        self._lock = threading.Lock()
+        self._executor = None
+        self._words_version = None
+        self._users = {}  # 程序池 → 使用中的請求數
+
+    def _version(self):
+        """詞彙保護表、變更日誌與錯字字典的修改時間"""
+        try:
+            typo_mtime = os.stat(typo_dictionary_path(self.protected_words_path)).st_mtime_ns
+        except OSError:
+            typo_mtime = None
+        return store_version(self.protected_words_path) + (typo_mtime,)
+
+    def _refresh(self, version):
+        """必要時以新的詞彙建立程序池（呼叫時須持有鎖）
+
+        被替換的程序池仍有請求使用時不關閉，由最後一個請求結束時關閉。
+        """
+        if self._executor is None or version != self._words_version:
+            old_executor = self._executor
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                           initargs=(self.protected_words_path,))
+            # 立即讓每個工作程序完成預熱，第一個請求不必等待
+            for future in [executor.submit(correct_text, "") for _ in range(self.workers)]:
+                future.result()
+            self._executor = executor
+            self._words_version = version
+            if old_executor is not None and not self._users.get(old_executor):
+                old_executor.shutdown(wait=False)
+        return self._executor
+
+    def get_executor(self):
+        """取得工作程序池；詞彙保護表更新後會以新的詞彙重新預熱
+
+        回傳:
+            ProcessPoolExecutor
+        """
+        version = self._version()
+        with self._lock:
+            return self._refresh(version)
+
+    @contextmanager
+    def using_executor(self):
+        """在處理一個請求期間使用同一個程序池，使用中的程序池不會被關閉
+
+        工作程序異常結束而使程序池損壞時，如同詞彙更新一樣以新的程序池
+        取代並預熱，之後的請求不會一直失敗。
+
+        回傳:
+            ProcessPoolExecutor 的 context manager
+        """
+        version = self._version()
+        with self._lock:
+            executor = self._refresh(version)
+            self._users[executor] = self._users.get(executor, 0) + 1
+        try:
+            yield executor
+        except BrokenProcessPool:
+            print("工作程序異常結束，重新建立程序池")
+            with self._lock:
+                if executor is self._executor:
+                    self._executor = None
+                    self._refresh(self._version())
+            raise
+        finally:
+            with self._lock:
+                self._users[executor] -= 1
+                retired = not self._users[executor] and executor is not self._executor
+                if not self._users[executor]:
+                    del self._users[executor]
+            if retired:
+                executor.shutdown(wait=False)
+
+    def iter_corrected_text(self, text):
+        """平行校正各個區塊，並依原順序逐一產生結果
+
+        參數:
+            text: 要校正的文字
+
+        回傳:
+            校正後文字區塊的迭代器
+        """
+        chunks = split_paragraph_chunks(text)
+        with self.using_executor() as executor:
+            if len(chunks) == 1:
+                yield executor.submit(correct_text, chunks[0]).result()
+                return
+            yield from executor.map(correct_text, chunks)
+
+    def correct_docx(self, source_path, output_path):
+        """校正 .docx 並保留格式
+
+        參數:
+            source_path: 上傳的 .docx 暫存路徑
+            output_path: 輸出路徑
+        """
+        with self.using_executor() as executor:
+            executor.submit(correct_docx_file, source_path, output_path).result()
+
+    def shutdown(self):
+        """關閉工作程序池（仍在使用中的舊程序池由最後一個請求結束時關閉）"""
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+            if executor is not None and self._users.get(executor):
+                return
+        if executor is not None:
+            executor.shutdown()
+
+
+class CorrectionRequestHandler(BaseHTTPRequestHandler):
+    """處理校正請求
+
+    GET  /health        服務狀態
+    POST /correct       內容為 UTF-8 文字，回傳校正後的文字（分塊串流）
+    POST /correct/docx  內容為 .docx，回傳保留格式的校正後 .docx
+    """
+
+    protocol_version = "HTTP/1.1"
+    service = None  # 由 create_server 設定
+    response_started = False  # 目前的請求是否已送出狀態與標頭
+
+    def log_message(self, format, *args):
+        """輸出請求記錄"""
+        print(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status, data):
+        """回傳 JSON 內容"""
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        """回傳錯誤訊息"""
+        self._send_json(status, {"error": message})
+
+    def _write_chunk(self, data):
+        """以 chunked 傳輸編碼寫出一個區塊"""
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    def _end_chunks(self):
+        """結束 chunked 傳輸"""
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _read_body(self):
+        """讀取請求內容；沒有 Content-Length（例如分塊上傳）或超過上限時返回 None 並回傳錯誤"""
+        if self.headers.get("Content-Length") is None:
+            self._send_error(411, "請求必須包含 Content-Length")
+            self.close_connection = True
+            return None
+        length = int(self.headers["Content-Length"])
+        if length > MAX_BODY_BYTES:
+            self._send_error(413, f"內容超過上限 {MAX_BODY_BYTES} 位元組")
+            self.close_connection = True
+            return None
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        """處理 GET 請求"""
+        if urlparse(self.path).path == "/health":
+            self._send_json(200, {"status": "ok", "workers": self.service.workers})
+        else:
+            self._send_error(404, "找不到此路徑")
+
+    def do_POST(self):
+        """處理 POST 請求"""
+        path = urlparse(self.path).path
+        if path not in ("/correct", "/correct/docx"):
+            self._send_error(404, "找不到此路徑")
+            return
+
+        body = self._read_body()
+        if body is None:
+            return
+
+        self.response_started = False
+        try:
+            if path == "/correct":
+                self._handle_text(body)
+            else:
+                self._handle_docx(body)
+        except Exception as e:
+            print(f"處理校正請求時發生錯誤: {str(e)}")
+            if self.response_started:
+                # 狀態與標頭已送出，無法再回傳錯誤；不送出結尾區塊直接關閉連線，
+                # 用戶端會收到不完整的回應，而不是被截斷卻看似成功的內容
+                self.close_connection = True
+                return
+            self._send_error(500, f"校正時發生錯誤: {str(e)}")
+
+    def _handle_text(self, body):
+        """校正文字並分塊串流回傳"""
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            self._send_error(400, "內容必須是 UTF-8 文字")
+            return
+
+        results = self.service.iter_corrected_text(text)
+        try:
+            # 先取得第一個區塊，校正失敗時仍可回傳錯誤狀態
+            first = next(results, "")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.response_started = True
+            self._write_chunk(first.encode("utf-8"))
+            for chunk in results:
+                self._write_chunk(chunk.encode("utf-8"))
+            self._end_chunks()
+        finally:
+            # 中途失敗或連線中斷時也立即歸還程序池
+            results.close()
+
+    def _handle_docx(self, body):
+        """校正 .docx 並串流回傳"""
+        with tempfile.TemporaryDirectory() as work_dir:
+            source_path = os.path.join(work_dir, "source.docx")
+            output_path = os.path.join(work_dir, "corrected.docx")
+            with open(source_path, "wb") as f:
+                f.write(body)
+
+            file_format = sniff_format(source_path)
+            if is_encrypted_format(file_format):
+                self._send_error(400, "檔案有密碼保護（encrypted），請先解密")
+                return
+            if file_format != FORMAT_DOCX:
+                self._send_error(415, "只支援 .docx 文件")
+                return
+
+            self.service.correct_docx(source_path, output_path)
+
+            self.send_response(200)
+            self.send_header("Content-Type", DOCX_CONTENT_TYPE)
+            self.send_header("Content-Length", str(os.path.getsize(output_path)))
+            self.end_headers()
+            self.response_started = True
+            with open(output_path, "rb") as f:
+                while True:
+                    data = f.read(STREAM_BYTES)
+                    if not data:
+                        break
+                    self.wfile.write(data)
+
+
+def create_server(port=DEFAULT_PORT, workers=None, protected_words_path="protected_words.json"):
+    """建立只接受本機連線的校正服務
+
+    參數:
+        port: 連接埠
+        workers: 工作程序數量
+        protected_words_path: 詞彙保護表路徑
+
+    回傳:
+        (ThreadingHTTPServer, CorrectionService)
+    """
+    service = CorrectionService(workers, protected_words_path)
+    service.get_executor()  # 啟動時預熱
+
+    handler = type("BoundCorrectionRequestHandler", (CorrectionRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server, service
+
+
+def main(argv=None):
+    """校正服務主入口點"""
+    parser = argparse.ArgumentParser(description="本機文字校正服務")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="連接埠")
+    parser.add_argument("--workers", type=int, help="工作程序數量（預設為 CPU 數量）")
+    parser.add_argument("--protected-words", default="protected_words.json", help="詞彙保護表路徑")
+    args = parser.parse_args(argv)
+
+    server, service = create_server(args.port, args.workers, args.protected_words)
+    print(f"校正服務已啟動: http://127.0.0.1:{args.port}（工作程序 {service.workers} 個）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("停止校正服務")
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Module for reading text and images from Word documents without any GUI dependency.
+"""
+import os
+import tempfile
+from io import BytesIO
+from perf_timer import StageTimer
+from key_cache import session_key_cache, derive_secret_key
+from file_format import sniff_format, is_encrypted_format, FORMAT_DOC, FORMAT_DOCX
+
+# docx2txt、msoffcrypto、python-docx 與 PIL 載入較慢，於首次使用時才匯入
+
+
+def is_password_error(error_message):
+    """檢查錯誤訊息是否與密碼保護相關
+
+    參數:
+        error_message: 錯誤訊息
+
+    回傳:
+        是否為密碼相關錯誤
+    """
+    error_message = error_message.lower()
+    password_keywords = ["password", "encrypted", "保護", "密碼", "加密"]
+    return any(keyword in error_message for keyword in password_keywords)
+
+
+def is_encrypted(file_path, timer=None):
+    """檢查Word檔案是否有密碼保護
+
+    參數:
+        file_path: Word檔案路徑
+        timer: 記錄階段耗時的 StageTimer（可選）
+
+    回傳:
+        是否為加密檔案
+    """
+    timer = timer or StageTimer("is_encrypted")
+    with timer.stage("encryption_check"):
+        # 只讀取檔案開頭與 CFB 目錄判斷，不需建立完整的 msoffcrypto.OfficeFile
+        return is_encrypted_format(sniff_format(file_path))
+
+
+def has_cached_key(file_path):
+    """檢查本次執行期間是否已快取該檔案的解密金鑰
+
+    參數:
+        file_path: Word檔案路徑
+
+    回傳:
+        是否可不輸入密碼直接解密
+    """
+    return session_key_cache.contains(file_path)
+
+
+def decrypt_to_temp_file(file_path, password=None, timer=None, key_cache=session_key_cache):
+    """解密Word檔案並寫入臨時檔案
+
+    優先使用快取的金鑰；沒有快取時先以加密資訊中的驗證碼檢查密碼，
+    密碼錯誤會在解密文件內容前就拋出例外。
+
+    參數:
+        file_path: 加密Word檔案路徑
+        password: 檔案密碼（有快取金鑰時可省略）
+        timer: 記錄階段耗時的 StageTimer（可選）
+        key_cache: 解密金鑰快取（None 表示不使用快取）
+
+    回傳:
+        解密後的臨時檔案路徑（呼叫端負責刪除）
+    """
+    import msoffcrypto  # 用於處理加密的Office文檔
+
+    timer = timer or StageTimer("decrypt")
+
+    # 打開加密檔案
+    with open(file_path, 'rb') as f:
+        file_stream = BytesIO(f.read())
+    ms_file = msoffcrypto.OfficeFile(file_stream)
+
+    with timer.stage("key_derivation"):
+        secret_key = key_cache.get(file_path) if key_cache is not None else None
+        if secret_key is None:
+            if not password:
+                raise msoffcrypto.exceptions.InvalidKeyError("檔案有密碼保護，需要密碼")
+            secret_key = derive_secret_key(ms_file, password)
+            if secret_key is not None and key_cache is not None:
+                key_cache.put(file_path, secret_key)
+
+    # 創建一個臨時檔案來存儲解密後的內容
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
+        temp_path = temp_file.name
+
+    try:
+        with timer.stage("decrypt"):
+            # 使用 msoffcrypto 解密（不支援快取的加密方式直接使用密碼）
+            if secret_key is not None:
+                ms_file.load_key(secret_key=secret_key)
+            else:
+                ms_file.load_key(password=password)
+
+            with open(temp_path, 'wb') as f:
+                ms_file.decrypt(f)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+    return temp_path
+
+
+def read_text(file_path, timer=None):
+    """讀取未加密Word檔案的文字，依檔案開頭的識別位元組選擇讀取方式
+
+    參數:
+        file_path: Word檔案路徑
+        timer: 記錄階段耗時的 StageTimer（可選）
+
+    回傳:
+        檔案內容
+    """
+    import docx2txt  # 用於讀取Word文檔
+    from docx import Document  # 用於更精確地讀取Word文檔格式
+
+    timer = timer or StageTimer("read_text")
+
+    with timer.stage("sniff"):
+        file_format = sniff_format(file_path)
+    if is_encrypted_format(file_format):
+        raise Exception("檔案有密碼保護（encrypted），需要密碼")
+    if file_format == FORMAT_DOC:
+        # Word 97-2003 二進位格式直接從 piece table 讀取文字
+        from legacy_doc_reader import read_doc_text
+        with timer.stage("doc"):
+            return read_doc_text(file_path)
+
+    # 先以 python-docx 依文件順序走訪段落與表格（w:tbl / w:tr / w:tc）
+    try:
+        with timer.stage("python-docx"):
+            doc = Document(file_path)
+            text = extract_text_from_document(doc)
+        if text:
+            return text
+    except Exception as e:
+        print(f"使用 python-docx 處理失敗: {str(e)}")
+
+        # 如果是加密錯誤，直接拋出
+        if is_password_error(str(e)):
+            raise Exception(f"檔案可能有密碼保護: {str(e)}")
+
+    # 讀取失敗或沒有段落文字（例如內容只在文字方塊中）時，改用 docx2txt
+    try:
+        with timer.stage("docx2txt"):
+            return docx2txt.process(file_path)
+    except Exception as docx2txt_e:
+        print(f"使用 docx2txt 處理失敗: {str(docx2txt_e)}")
+
+        # 如果是加密錯誤，直接拋出
+        if is_password_error(str(docx2txt_e)):
+            raise Exception(f"檔案可能有密碼保護: {str(docx2txt_e)}")
+
+        # 如果兩種方法都失敗，則拋出異常
+        raise Exception(f"無法讀取文件: {str(docx2txt_e)}")
+
+
+# WordprocessingML 命名空間與依文件順序讀取文字時使用的標籤
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_TAG_P = _W + "p"
+_TAG_TBL = _W + "tbl"
+_TAG_TR = _W + "tr"
+_TAG_TC = _W + "tc"
+_TAG_SDT = _W + "sdt"
+_TAG_SDT_CONTENT = _W + "sdtContent"
+_TAG_VMERGE = _W + "vMerge"
+_TAG_VAL = _W + "val"
+# 段落中包含 run 的容器（超連結、修訂插入、內容控制項等）
+_RUN_CONTAINERS = {_W + name for name in ("r", "hyperlink", "ins", "smartTag", "sdt", "sdtContent",
+                                          "fldSimple", "customXml")}
+# run 中代表文字的元素；圖片、文字方塊與刪除的修訂不會出現在這裡
+_RUN_TEXT = {_W + "t": None, _W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+
+
+def _iter_block_items(parent):
+    """依文件順序產生段落與表格元素，展開內容控制項（w:sdt）"""
+    for child in parent:
+        if child.tag in (_TAG_P, _TAG_TBL):
+            yield child
+        elif child.tag == _TAG_SDT:
+            content = child.find(_TAG_SDT_CONTENT)
+            if content is not None:
+                yield from _iter_block_items(content)
+
+
+def _paragraph_text(paragraph):
+    """取得段落元素的文字（與 python-docx 的 Paragraph.text 相同的規則）"""
+    parts = []
+
+    def collect(element):
+        for child in element:
+            tag = child.tag
+            if tag in _RUN_TEXT:
+                parts.append(child.text or "" if _RUN_TEXT[tag] is None else _RUN_TEXT[tag])
+            elif tag in _RUN_CONTAINERS:
+                collect(child)
+
+    collect(paragraph)
+    return "".join(parts)
+
+
+def _iter_cells(row):
+    """產生一列中的儲存格元素，展開內容控制項"""
+    for child in row:
+        if child.tag == _TAG_TC:
+            yield child
+        elif child.tag == _TAG_SDT:
+            content = child.find(_TAG_SDT_CONTENT)
+            if content is not None:
+                yield from _iter_cells(content)
+
+
+def _is_merged_continuation(cell):
+    """儲存格是否為垂直合併中延續上一列的部分（內容已由合併的第一格輸出）"""
+    properties = cell.find(_W + "tcPr")
+    if properties is None:
+        return False
+    vmerge = properties.find(_TAG_VMERGE)
+    return vmerge is not None and vmerge.get(_TAG_VAL, "continue") != "restart"
+
+
+def _cell_text(cell):
+    """取得儲存格的文字；儲存格中的巢狀表格以逐列文字表示"""
+    lines = []
+    for item in _iter_block_items(cell):
+        if item.tag == _TAG_P:
+            lines.append(_paragraph_text(item))
+        else:
+            lines.extend(_table_rows(item))
+    return "\n".join(lines)
+
+
+def _table_rows(table):
+    """直接走訪 w:tr / w:tc 取得每一列的文字
+
+    水平合併（gridSpan）的儲存格只有一個 w:tc，垂直合併（vMerge）延續的
+    儲存格會略過，因此合併的內容只出現一次，耗時與儲存格數量成正比。
+
+    參數:
+        table: w:tbl 元素
+
+    回傳:
+        每列以 tab 分隔的文字列表（略過空白列）
+    """
+    rows = []
+    for row in table:
+        if row.tag != _TAG_TR:
+            continue
+        row_text = []
+        for cell in _iter_cells(row):
+            if _is_merged_continuation(cell):
+                continue
+            text = _cell_text(cell).strip()
+            if text:
+                row_text.append(text)
+        if row_text:
+            rows.append("\t".join(row_text))
+    return rows
+
+
+def extract_text_from_document(doc):
+    """從 python-docx Document 物件中依文件順序提取段落與表格文字
+
+    參數:
+        doc: python-docx Document 物件
+
+    回傳:
+        提取的文字
+    """
+    # 提取文本，保留段落格式；表格依其在文件中的位置穿插在段落之間
+    paragraphs = []
+    for item in _iter_block_items(doc.element.body):
+        if item.tag == _TAG_P:
+            text = _paragraph_text(item)
+            if text.strip():  # 忽略空段落
+                paragraphs.append(text)
+        else:
+            paragraphs.extend(_table_rows(item))
+
+    # 使用兩個換行符連接段落，保留格式
+    return '\n\n'.join(paragraphs)
+
+
+def extract_images(file_path, timer=None):
+    """從Word文件中提取圖片
+
+    參數:
+        file_path: Word檔案路徑
+        timer: 記錄階段耗時的 StageTimer（可選）
+
+    回傳:
+        PIL Image 對象列表
+    """
+    from docx import Document
+    from PIL import Image
+
+    timer = timer or StageTimer("extract_images")
+
+    # Word 97-2003 文件的圖片存放在 Data 資料流中，目前不提取
+    if sniff_format(file_path) != FORMAT_DOCX:
+        return []
+
+    with timer.stage("images"):
+        # 使用 python-docx 打開文件
+        doc = Document(file_path)
+
+        # 提取文檔中的所有圖片
+        images = []
+        for rel in doc.part.rels.values():
+            if "image" in rel.target_ref:
+                try:
+                    # 獲取圖片數據並使用 PIL 處理
+                    images.append(Image.open(BytesIO(rel.target_part.blob)))
+                except Exception as e:
+                    print(f"提取圖片時出錯: {str(e)}")
+    return images
+
+
+def read_word_file(file_path, password=None, timer=None):
+    """讀取Word檔案的文字與圖片
+
+    參數:
+        file_path: Word檔案路徑
+        password: 檔案密碼（如果有的話）
+        timer: 記錄階段耗時的 StageTimer（可選）
+
+    回傳:
+        (檔案內容, PIL Image 對象列表)
+    """
+    # 檢查檔案是否存在
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"找不到檔案: {file_path}")
+
+    if not password and not has_cached_key(file_path):
+        return read_text(file_path, timer), extract_images(file_path, timer)
+
+    try:
+        temp_path = decrypt_to_temp_file(file_path, password, timer)
+    except Exception as e:
+        # 如果解密失敗，拋出異常
+        raise Exception(f"解密失敗: {str(e)}")
+    try:
+        return read_text(temp_path, timer), extract_images(temp_path, timer)
+    finally:
+        # 刪除臨時檔案
+        os.unlink(temp_path)
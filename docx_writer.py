@@ -0,0 +1,298 @@
+"""
+Module for writing corrected .docx files by streaming the original package.
+"""
+import codecs
+import copy
+import difflib
+import os
+import re
+import shutil
+import struct
+import zipfile
+
+# 需要校正文字的部分：主文件、頁首與頁尾
+TEXT_PART_PATTERN = re.compile(r"^word/(document|header\d*|footer\d*)\.xml$")
+
+# 每次從 XML 部分讀取的位元組數
+READ_CHUNK_BYTES = 1024 * 1024
+
+# 段落的開始、結束與自我封閉標記（排除 <w:pPr>、<w:proofErr> 等以 w:p 開頭的其他元素）
+_PARAGRAPH_TAG = r"<(?P<close>/?)w:p(?=[\s/>])[^>]*>"
+# <w:t> 文字節點（排除 <w:tab/>、<w:tbl> 等以 w:t 開頭的其他元素與自我封閉的 <w:t/>）
+_TEXT_NODE = r"<w:t(?P<attributes>(?:\s[^>]*[^/>])?)>(?P<text>.*?)</w:t>"
+_PARAGRAPH_TAG_PATTERN = re.compile(_PARAGRAPH_TAG)
+_TOKEN_PATTERN = re.compile(f"{_PARAGRAPH_TAG}|{_TEXT_NODE}", re.DOTALL)
+_ENTITY_PATTERN = re.compile(r"&(#x[0-9a-fA-F]+|#[0-9]+|amp|lt|gt|quot|apos);")
+_ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+
+# zip 一般用途旗標中表示 CRC 與大小寫在資料之後的位元
+_DATA_DESCRIPTOR_FLAG = 0x08
+# zip64 額外欄位的標頭 ID，由寫入時依大小重新產生
+_ZIP64_EXTRA_ID = 0x0001
+# 直接複製壓縮資料時用到的 ZipFile 內部屬性（CPython 的實作細節，不是公開 API）
+_RAW_COPY_ATTRIBUTES = ("fp", "start_dir", "filelist", "NameToInfo")
+
+
+def _unescape(text):
+    """將 XML 文字節點中的實體轉回字元"""
+    if "&" not in text:
+        return text
+
+    def replace(match):
+        entity = match.group(1)
+        if entity.startswith("#x"):
+            return chr(int(entity[2:], 16))
+        if entity.startswith("#"):
+            return chr(int(entity[1:]))
+        return _ENTITIES[entity]
+
+    return _ENTITY_PATTERN.sub(replace, text)
+
+
+def _strip_zip64_extra(extra):
+    """移除額外欄位中的 zip64 區塊"""
+    result = []
+    position = 0
+    while position + 4 <= len(extra):
+        header_id, size = struct.unpack("<HH", extra[position:position + 4])
+        end = position + 4 + size
+        if header_id != _ZIP64_EXTRA_ID:
+            result.append(extra[position:end])
+        position = end
+    return b"".join(result)
+
+
+def _escape(text):
+    """將文字轉為 XML 文字節點可用的格式"""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _distribute(original_parts, corrected):
+    """將校正後的段落文字依原本各個 run 的範圍分配回去
+
+    長度不變時直接依原長度切分；長度改變時以差異比對找出每段變更
+    對應的原始位置，並放入該位置所屬的 run。
+
+    參數:
+        original_parts: 各個 <w:t> 的原始文字
+        corrected: 校正後的整段文字
+
+    回傳:
+        各個 <w:t> 的新文字
+    """
+    original = "".join(original_parts)
+    if len(corrected) == len(original):
+        result = []
+        position = 0
+        for part in original_parts:
+            result.append(corrected[position:position + len(part)])
+            position += len(part)
+        return result
+
+    # 每個原始字元所屬的 run
+    owners = []
+    for index, part in enumerate(original_parts):
+        owners.extend([index] * len(part))
+    last_owner = len(original_parts) - 1
+
+    pieces = [[] for _ in original_parts]
+    matcher = difflib.SequenceMatcher(None, original, corrected, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                pieces[owners[i1 + offset]].append(corrected[j1 + offset])
+        else:
+            owner = owners[i1] if i1 < len(owners) else last_owner
+            pieces[owner].append(corrected[j1:j2])
+    return ["".join(piece) for piece in pieces]
+
+
+def _correct_text_nodes(matches, correct):
+    """以一個段落的所有 <w:t> 文字校正，回傳需要改寫的節點
+
+    參數:
+        matches: 同一段落中各個 <w:t> 的比對結果
+        correct: 校正函數（文字 → 文字）
+
+    回傳:
+        (比對結果, 新的 <w:t> XML) 的列表
+    """
+    original_parts = [_unescape(match.group("text")) for match in matches]
+    original = "".join(original_parts)
+    corrected = correct(original)
+    if corrected == original:
+        return []
+
+    changes = []
+    new_parts = _distribute(original_parts, corrected)
+    for match, old_text, new_text in zip(matches, original_parts, new_parts):
+        if new_text != old_text:
+            attributes = match.group("attributes")
+            # 文字前後有空白時需保留空白
+            if new_text != new_text.strip() and "xml:space" not in attributes:
+                attributes += ' xml:space="preserve"'
+            changes.append((match, f"<w:t{attributes}>{_escape(new_text)}</w:t>"))
+    return changes
+
+
+def correct_paragraph_xml(xml, correct):
+    """校正 XML 片段中各個段落的文字，保留所有格式標記
+
+    每個 <w:t> 屬於包住它的最內層段落；文字方塊（w:txbxContent）等
+    巢狀在段落中的段落以自己的文字校正，不會與外層段落的文字相連。
+
+    參數:
+        xml: 包含一或多個段落的 XML 字串
+        correct: 校正函數（文字 → 文字），以整段文字呼叫，
+                 因此跨越多個 run 的保護詞彙與詞組仍能正確比對
+
+    回傳:
+        校正後的 XML 字串
+    """
+    groups = []
+    open_paragraphs = []
+    for match in _TOKEN_PATTERN.finditer(xml):
+        if match.group("text") is not None:
+            if open_paragraphs:
+                open_paragraphs[-1].append(match)
+            else:
+                groups.append([match])
+        elif match.group("close"):
+            if open_paragraphs:
+                groups.append(open_paragraphs.pop())
+        elif not match.group(0).endswith("/>"):
+            open_paragraphs.append([])
+    groups.extend(open_paragraphs)
+
+    changes = []
+    for matches in groups:
+        if matches:
+            changes.extend(_correct_text_nodes(matches, correct))
+    if not changes:
+        return xml
+
+    result = []
+    last_end = 0
+    for match, new_xml in sorted(changes, key=lambda change: change[0].start()):
+        result.append(xml[last_end:match.start()])
+        result.append(new_xml)
+        last_end = match.end()
+    result.append(xml[last_end:])
+    return "".join(result)
+
+
+def _last_paragraph_end(xml):
+    """找出最後一個最外層段落的結束位置
+
+    參數:
+        xml: 從最外層開始的 XML 字串
+
+    回傳:
+        該段落結束標記之後的位置，沒有完整的最外層段落時為 0
+    """
+    depth = 0
+    end = 0
+    for match in _PARAGRAPH_TAG_PATTERN.finditer(xml):
+        if match.group("close"):
+            depth = max(depth - 1, 0)
+            if not depth:
+                end = match.end()
+        elif not match.group(0).endswith("/>"):
+            depth += 1
+    return end
+
+
+def correct_xml_stream(source, destination, correct):
+    """逐段串流處理 XML 部分，不建立整份文件的 DOM
+
+    參數:
+        source: 可讀取位元組的檔案物件
+        destination: 可寫入位元組的檔案物件
+        correct: 校正函數（文字 → 文字）
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    while True:
+        data = source.read(READ_CHUNK_BYTES)
+        final = not data
+        buffer += decoder.decode(data, final=final)
+
+        # 處理到緩衝區中最後一個完整的最外層段落為止，其餘留待下一次；
+        # 文字方塊內的段落結束時外層段落尚未結束，不能在此切開
+        cut = len(buffer) if final else _last_paragraph_end(buffer)
+        if cut > 0:
+            destination.write(correct_paragraph_xml(buffer[:cut], correct).encode("utf-8"))
+            buffer = buffer[cut:]
+        if final:
+            break
+
+
+def _supports_raw_copy(archive):
+    """ZipFile 是否提供直接複製壓縮資料所需的內部屬性"""
+    return all(hasattr(archive, name) for name in _RAW_COPY_ATTRIBUTES) and hasattr(zipfile, "sizeFileHeader")
+
+
+def _copy_raw_member(source, info, destination):
+    """將 zip 成員的壓縮資料原封不動地寫入輸出，不解壓縮也不重新壓縮
+
+    zipfile 沒有公開的原始複製 API，這裡依 CPython 的實作直接寫入
+    destination.fp，並更新 start_dir、filelist 與 NameToInfo，讓之後的
+    destination.open(..., "w") 與關閉時寫出的中央目錄保持一致。
+    缺少這些屬性時由 correct_docx 改以解壓縮再壓縮的方式複製。
+
+    參數:
+        source: 讀取中的 ZipFile
+        info: 要複製的成員
+        destination: 寫入中的 ZipFile
+    """
+    # 本地標頭的檔名與額外欄位長度可能與中央目錄不同，需從本地標頭讀取
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(zipfile.sizeFileHeader)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    source.fp.seek(name_length + extra_length, os.SEEK_CUR)
+
+    copied = copy.copy(info)
+    # CRC 與大小已知，直接寫在本地標頭，不需要資料描述區
+    copied.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+    copied.extra = _strip_zip64_extra(info.extra)
+    copied.header_offset = destination.fp.tell()
+    destination.fp.write(copied.FileHeader())
+
+    remaining = info.compress_size
+    while remaining:
+        data = source.fp.read(min(remaining, READ_CHUNK_BYTES))
+        if not data:
+            raise zipfile.BadZipFile(f"{info.filename} 的壓縮資料不完整")
+        destination.fp.write(data)
+        remaining -= len(data)
+
+    destination.start_dir = destination.fp.tell()
+    destination.filelist.append(copied)
+    destination.NameToInfo[copied.filename] = copied
+
+
+def correct_docx(source_path, output_path, correct):
+    """輸出校正後的 .docx，保留原始格式、表格與圖片
+
+    只改寫主文件、頁首與頁尾中的 <w:t> 文字節點；其他 zip 成員（圖片、
+    樣式等）直接複製原本的壓縮資料，不解壓縮也不重新壓縮（zipfile 的
+    內部屬性不存在時改為逐塊解壓縮後重新寫入）。
+
+    參數:
+        source_path: 原始 .docx 路徑（未加密）
+        output_path: 輸出 .docx 路徑
+        correct: 校正函數（文字 → 文字）
+    """
+    with zipfile.ZipFile(source_path) as source, \
+            zipfile.ZipFile(output_path, "w", allowZip64=True) as destination:
+        raw_copy = _supports_raw_copy(source) and _supports_raw_copy(destination)
+        for info in source.infolist():
+            is_text_part = TEXT_PART_PATTERN.match(info.filename)
+            if not is_text_part and raw_copy:
+                _copy_raw_member(source, info, destination)
+                continue
+            with source.open(info) as member_in, destination.open(info, "w", force_zip64=info.file_size > 0x7FFFFFFF) as member_out:
+                if is_text_part:
+                    correct_xml_stream(member_in, member_out, correct)
+                else:
+                    shutil.copyfileobj(member_in, member_out, READ_CHUNK_BYTES)
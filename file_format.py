@@ -0,0 +1,57 @@
+"""
+Module for detecting Word document formats from their leading bytes.
+"""
+import struct
+
+# 檔案開頭的識別位元組
+ZIP_MAGIC = b"PK\x03\x04"
+CFB_MAGIC = b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1"
+
+# 偵測結果
+FORMAT_DOCX = "docx"                      # 未加密的 OOXML（zip）
+FORMAT_ENCRYPTED_OOXML = "encrypted_ooxml"  # 以 CFB 容器包裝的加密 OOXML
+FORMAT_DOC = "doc"                        # Word 97-2003 二進位格式
+FORMAT_ENCRYPTED_DOC = "encrypted_doc"    # 有密碼保護的 Word 97-2003
+FORMAT_UNKNOWN = "unknown"
+
+# FIB 中 fEncrypted 旗標（FibBase 偏移 0x0A 的 bit 8）
+_FIB_FLAGS_OFFSET = 0x0A
+_FIB_ENCRYPTED = 0x0100
+
+
+def sniff_format(file_path):
+    """讀取檔案開頭判斷 Word 文件格式，不解析整個文件
+
+    參數:
+        file_path: 檔案路徑
+
+    回傳:
+        FORMAT_* 常數之一
+    """
+    with open(file_path, "rb") as f:
+        header = f.read(len(CFB_MAGIC))
+
+    if header.startswith(ZIP_MAGIC):
+        return FORMAT_DOCX
+    if header != CFB_MAGIC:
+        return FORMAT_UNKNOWN
+
+    import olefile  # msoffcrypto 的相依套件，只讀取 CFB 的目錄
+
+    with olefile.OleFileIO(file_path) as ole:
+        if ole.exists("EncryptionInfo") and ole.exists("EncryptedPackage"):
+            return FORMAT_ENCRYPTED_OOXML
+        if ole.exists("WordDocument"):
+            with ole.openstream("WordDocument") as stream:
+                fib = stream.read(_FIB_FLAGS_OFFSET + 2)
+            if len(fib) == _FIB_FLAGS_OFFSET + 2:
+                flags = struct.unpack_from("<H", fib, _FIB_FLAGS_OFFSET)[0]
+                if flags & _FIB_ENCRYPTED:
+                    return FORMAT_ENCRYPTED_DOC
+            return FORMAT_DOC
+    return FORMAT_UNKNOWN
+
+
+def is_encrypted_format(file_format):
+    """判斷偵測結果是否為加密文件"""
+    return file_format in (FORMAT_ENCRYPTED_OOXML, FORMAT_ENCRYPTED_DOC)
@@ -0,0 +1,272 @@
+"""
+Module for a zoomable image viewer that renders visible tiles from a cached image pyramid.
+"""
+import math
+import threading
+import tkinter as tk
+from collections import OrderedDict
+
+# 金字塔最小層的最長邊不超過此像素數
+MIN_LEVEL_SIZE = 512
+# 每個圖塊在畫布上的邊長（顯示像素），與縮放比例無關
+TILE_SIZE = 256
+# 最多保留的已繪製圖塊數（每塊最多 TILE_SIZE×TILE_SIZE 顯示像素）
+TILE_CACHE_SIZE = 256
+# 縮放範圍（顯示像素 / 原圖像素）
+MAX_SCALE = 8.0
+# 每次滾輪縮放的倍率
+ZOOM_STEP = 1.25
+# 等待金字塔建立時的檢查間隔（毫秒）
+POLL_INTERVAL_MS = 50
+
+
+class ImagePyramid:
+    """在背景建立的多解析度圖片金字塔，第 k 層為原圖縮小 2^k 倍"""
+
+    def __init__(self, image):
+        """開始在背景建立金字塔
+
+        參數:
+            image: PIL Image 對象
+        """
+        self.image = image
+        self.size = image.size
+        self.levels = []
+        self.error = None
+        self.ready = threading.Event()
+        threading.Thread(target=self._build, daemon=True).start()
+
+    def _build(self):
+        """解碼原圖並逐層以 2x2 平均縮小"""
+        try:
+            level = self.image
+            level.load()
+            if level.mode not in ("RGB", "RGBA"):
+                level = level.convert("RGBA" if "transparency" in level.info or "A" in level.getbands() else "RGB")
+            levels = [level]
+            while max(level.size) > MIN_LEVEL_SIZE:
+                level = level.reduce(2)
+                levels.append(level)
+            self.levels = levels
+        except Exception as e:
+            self.error = e
+            print(f"建立圖片金字塔時出錯: {str(e)}")
+        finally:
+            self.ready.set()
+
+    def level_for(self, scale):
+        """取得解析度剛好不低於顯示比例的層
+
+        參數:
+            scale: 顯示比例（顯示像素 / 原圖像素）
+
+        回傳:
+            層的索引
+        """
+        level = 0
+        while level + 1 < len(self.levels) and scale <= 0.5 ** (level + 1):
+            level += 1
+        return level
+
+
+class ImageViewer:
+    """可縮放與拖曳的圖片檢視視窗，只繪製可見範圍內的圖塊"""
+
+    def __init__(self, root, pyramid, title):
+        """建立檢視視窗
+
+        參數:
+            root: 主視窗
+            pyramid: ImagePyramid
+            title: 視窗標題
+        """
+        self.root = root
+        self.pyramid = pyramid
+        self.scale = 1.0
+        self.origin_x = 0.0  # 視窗左上角對應的原圖座標
+        self.origin_y = 0.0
+        self.drag_start = None
+        self.tiles = OrderedDict()  # (層, 圖塊行, 圖塊列) → 目前顯示比例的 PhotoImage
+        self.tiles_scale = None  # 快取中圖塊的顯示比例
+
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("900x700")
+
+        toolbar = tk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=10, pady=(10, 0))
+        tk.Button(toolbar, text="放大", command=lambda: self.zoom(ZOOM_STEP)).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Button(toolbar, text="縮小", command=lambda: self.zoom(1 / ZOOM_STEP)).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Button(toolbar, text="符合視窗", command=self.fit).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Button(toolbar, text="原始大小", command=lambda: self.zoom(1 / self.scale)).pack(side=tk.LEFT)
+        self.status_label = tk.Label(toolbar, text="", anchor=tk.E)
+        self.status_label.pack(side=tk.RIGHT)
+
+        self.canvas = tk.Canvas(self.window, bg="gray20", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.canvas.bind("<Configure>", lambda event: self.render())
+        self.canvas.bind("<ButtonPress-1>", self.on_drag_start)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom(ZOOM_STEP if event.delta > 0 else 1 / ZOOM_STEP,
+                                                                 event.x, event.y))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom(ZOOM_STEP, event.x, event.y))
+        self.canvas.bind("<Button-5>", lambda event: self.zoom(1 / ZOOM_STEP, event.x, event.y))
+
+        tk.Button(self.window, text="關閉", command=self.window.destroy).pack(pady=(0, 10))
+
+        self.wait_for_pyramid(first=True)
+
+    def wait_for_pyramid(self, first=False):
+        """等待背景建立金字塔，完成後以符合視窗的比例顯示"""
+        if not self.window.winfo_exists():
+            return
+        if not self.pyramid.ready.is_set():
+            if first:
+                self.canvas.create_text(10, 10, text="正在準備圖片...", fill="white", anchor=tk.NW)
+            self.window.after(POLL_INTERVAL_MS, self.wait_for_pyramid)
+            return
+        if self.pyramid.error is not None:
+            self.canvas.delete("all")
+            self.canvas.create_text(10, 10, text=f"無法顯示圖片: {str(self.pyramid.error)}",
+                                    fill="white", anchor=tk.NW)
+            return
+        # 視窗尚未完成配置時，等配置完成再計算比例
+        self.window.update_idletasks()
+        self.fit()
+
+    def canvas_size(self):
+        """畫布的寬與高"""
+        return max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height())
+
+    def fit(self):
+        """縮放至整張圖片符合視窗"""
+        if not self.pyramid.levels:
+            return
+        width, height = self.pyramid.size
+        canvas_width, canvas_height = self.canvas_size()
+        self.scale = min(1.0, canvas_width / width, canvas_height / height)
+        self.origin_x = (width - canvas_width / self.scale) / 2
+        self.origin_y = (height - canvas_height / self.scale) / 2
+        self.render()
+
+    def zoom(self, factor, x=None, y=None):
+        """以指定的畫布位置為中心縮放
+
+        參數:
+            factor: 縮放倍率
+            x, y: 縮放中心的畫布座標，預設為畫布中央
+        """
+        if not self.pyramid.levels:
+            return
+        width, height = self.pyramid.size
+        canvas_width, canvas_height = self.canvas_size()
+        min_scale = min(1.0, canvas_width / width, canvas_height / height) / 2
+        new_scale = min(MAX_SCALE, max(min_scale, self.scale * factor))
+        if x is None:
+            x, y = canvas_width / 2, canvas_height / 2
+
+        # 保持縮放中心對應的原圖位置不變
+        image_x = self.origin_x + x / self.scale
+        image_y = self.origin_y + y / self.scale
+        self.scale = new_scale
+        self.origin_x = image_x - x / self.scale
+        self.origin_y = image_y - y / self.scale
+        self.render()
+
+    def on_drag_start(self, event):
+        """記錄拖曳起點"""
+        self.drag_start = (event.x, event.y, self.origin_x, self.origin_y)
+
+    def on_drag(self, event):
+        """拖曳平移圖片"""
+        if self.drag_start is None:
+            return
+        start_x, start_y, origin_x, origin_y = self.drag_start
+        self.origin_x = origin_x - (event.x - start_x) / self.scale
+        self.origin_y = origin_y - (event.y - start_y) / self.scale
+        self.render()
+
+    def display_size(self):
+        """整張圖片在目前顯示比例下的寬與高（顯示像素）"""
+        width, height = self.pyramid.size
+        return max(1, round(width * self.scale)), max(1, round(height * self.scale))
+
+    def get_tile(self, level, column, row):
+        """取得畫布上第 row 列、第 column 行的圖塊（使用快取）
+
+        圖塊以顯示像素切分，不論縮放比例都不超過 TILE_SIZE×TILE_SIZE；
+        顯示比例改變時捨棄舊比例的圖塊。
+
+        參數:
+            level: 金字塔層
+            column: 圖塊行
+            row: 圖塊列
+
+        回傳:
+            PhotoImage
+        """
+        from PIL import Image, ImageTk
+
+        if self.tiles_scale != self.scale:
+            self.tiles.clear()
+            self.tiles_scale = self.scale
+        key = (level, column, row)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            return tile
+
+        source = self.pyramid.levels[level]
+        display_width, display_height = self.display_size()
+        left, top = column * TILE_SIZE, row * TILE_SIZE
+        right, bottom = min(left + TILE_SIZE, display_width), min(top + TILE_SIZE, display_height)
+        # 圖塊在該層的範圍（可含小數），直接由該範圍重新取樣到圖塊大小
+        level_scale = self.scale * (2 ** level)
+        box = (left / level_scale, top / level_scale,
+               min(right / level_scale, source.width), min(bottom / level_scale, source.height))
+        resample = Image.NEAREST if level_scale > 2 else Image.BILINEAR
+        tile = ImageTk.PhotoImage(source.resize((right - left, bottom - top), resample, box=box))
+
+        self.tiles[key] = tile
+        while len(self.tiles) > TILE_CACHE_SIZE:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def render(self):
+        """只繪製可見範圍內的圖塊"""
+        if not self.pyramid.levels:
+            return
+        canvas_width, canvas_height = self.canvas_size()
+        width, height = self.pyramid.size
+
+        # 圖片小於視窗時置中，否則限制在圖片範圍內
+        view_width, view_height = canvas_width / self.scale, canvas_height / self.scale
+        if view_width >= width:
+            self.origin_x = (width - view_width) / 2
+        else:
+            self.origin_x = min(max(0.0, self.origin_x), width - view_width)
+        if view_height >= height:
+            self.origin_y = (height - view_height) / 2
+        else:
+            self.origin_y = min(max(0.0, self.origin_y), height - view_height)
+
+        level = self.pyramid.level_for(self.scale)
+        display_width, display_height = self.display_size()
+
+        # 可見範圍的顯示座標與對應的圖塊範圍
+        offset_x = round(-self.origin_x * self.scale)
+        offset_y = round(-self.origin_y * self.scale)
+        left, top = max(0, -offset_x), max(0, -offset_y)
+        right = min(display_width, canvas_width - offset_x)
+        bottom = min(display_height, canvas_height - offset_y)
+        first_column, last_column = left // TILE_SIZE, math.ceil(right / TILE_SIZE)
+        first_row, last_row = top // TILE_SIZE, math.ceil(bottom / TILE_SIZE)
+
+        self.canvas.delete("all")
+        for row in range(first_row, last_row):
+            for column in range(first_column, last_column):
+                tile = self.get_tile(level, column, row)
+                self.canvas.create_image(offset_x + column * TILE_SIZE, offset_y + row * TILE_SIZE,
+                                         image=tile, anchor=tk.NW)
+
+        self.status_label.config(text=f"{width}×{height}　{self.scale * 100:.0f}%")
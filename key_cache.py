@@ -0,0 +1,174 @@
+"""
+Module for caching derived decryption keys of encrypted Office documents for the session.
+"""
+import atexit
+import hashlib
+import os
+import threading
+from struct import pack
+
+# ECMA-376 Agile 加密中用於衍生各個金鑰的區塊金鑰（MS-OFFCRYPTO 2.3.4.11）
+_BLOCK_KEY_VERIFIER_INPUT = bytes([0xFE, 0xA7, 0xD2, 0x76, 0x3B, 0x4B, 0x9E, 0x79])
+_BLOCK_KEY_VERIFIER_VALUE = bytes([0xD7, 0xAA, 0x0F, 0x6D, 0x30, 0x61, 0x34, 0x4E])
+_BLOCK_KEY_ENCRYPTED_KEY = bytes([0x14, 0x6E, 0x0B, 0xE7, 0xAB, 0xAC, 0xD0, 0xD6])
+
+_HASH_NAMES = {"SHA1": "sha1", "SHA256": "sha256", "SHA384": "sha384", "SHA512": "sha512"}
+
+
+def _new_hash(algorithm, data):
+    """依加密資訊中的雜湊演算法名稱建立雜湊"""
+    return hashlib.new(_HASH_NAMES.get(algorithm.upper(), algorithm.lower()), data)
+
+
+def _decrypt_aes_cbc(data, key, iv):
+    """以 AES-CBC 解密（cryptography 為 msoffcrypto 的相依套件）"""
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    decryptor = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend()).decryptor()
+    return decryptor.update(data) + decryptor.finalize()
+
+
+def _derive_agile_key(info, password):
+    """驗證密碼並衍生 Agile 加密的金鑰
+
+    迭代雜湊（預設 100,000 次）只計算一次，同時用於驗證碼與金鑰，
+    密碼錯誤時不會解密文件內容。
+
+    參數:
+        info: msoffcrypto 解析出的加密資訊
+        password: 密碼
+
+    回傳:
+        解密用的金鑰，密碼錯誤時返回 None
+    """
+    algorithm = info["passwordHashAlgorithm"]
+    salt = info["passwordSalt"]
+    key_bytes = info["passwordKeyBits"] // 8
+
+    h = _new_hash(algorithm, salt + password.encode("UTF-16LE")).digest()
+    for i in range(info["spinValue"]):
+        h = _new_hash(algorithm, pack("<I", i) + h).digest()
+
+    def block_key(block):
+        return _new_hash(algorithm, h + block).digest()[:key_bytes]
+
+    # 先以驗證碼檢查密碼
+    verifier_input = _decrypt_aes_cbc(info["encryptedVerifierHashInput"], block_key(_BLOCK_KEY_VERIFIER_INPUT), salt)
+    verifier_hash = _decrypt_aes_cbc(info["encryptedVerifierHashValue"], block_key(_BLOCK_KEY_VERIFIER_VALUE), salt)
+    actual_hash = _new_hash(algorithm, verifier_input).digest()
+    if verifier_hash[:len(actual_hash)] != actual_hash:
+        return None
+
+    return _decrypt_aes_cbc(info["encryptedKeyValue"], block_key(_BLOCK_KEY_ENCRYPTED_KEY), salt)
+
+
+def derive_secret_key(office_file, password):
+    """驗證密碼並取得解密金鑰
+
+    參數:
+        office_file: msoffcrypto.OfficeFile 物件
+        password: 密碼
+
+    回傳:
+        解密用的金鑰；不支援的加密方式返回 None（呼叫端改用密碼解密）
+    """
+    from msoffcrypto.exceptions import InvalidKeyError
+
+    file_type = getattr(office_file, "type", None)
+    if getattr(office_file, "format", None) != "ooxml" or file_type not in ("agile", "standard"):
+        return None
+
+    if file_type == "agile":
+        secret_key = _derive_agile_key(office_file.info, password)
+    else:
+        from msoffcrypto.method.ecma376_standard import ECMA376Standard
+
+        header = office_file.info["header"]
+        verifier = office_file.info["verifier"]
+        secret_key = ECMA376Standard.makekey_from_password(
+            password, header["algId"], header["algIdHash"], header["providerType"],
+            header["keySize"], verifier["saltSize"], verifier["salt"],
+        )
+        if not ECMA376Standard.verifykey(secret_key, verifier["encryptedVerifier"],
+                                         verifier["encryptedVerifierHash"]):
+            secret_key = None
+
+    if secret_key is None:
+        raise InvalidKeyError("密碼驗證失敗，密碼不正確")
+    return secret_key
+
+
+class KeyCache:
+    """僅存在記憶體中的解密金鑰快取，以檔案識別資訊為鍵，程式結束時清除"""
+
+    def __init__(self):
+        """初始化快取"""
+        self._keys = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def file_identity(file_path):
+        """取得檔案識別資訊（路徑、大小、修改時間），檔案內容改變時識別資訊也會改變
+
+        參數:
+            file_path: 檔案路徑
+
+        回傳:
+            識別資訊 tuple
+        """
+        stat = os.stat(file_path)
+        return (os.path.normcase(os.path.realpath(file_path)), stat.st_size, stat.st_mtime_ns)
+
+    def get(self, file_path):
+        """取得已快取的金鑰
+
+        參數:
+            file_path: 檔案路徑
+
+        回傳:
+            金鑰，未快取時返回 None
+        """
+        try:
+            identity = self.file_identity(file_path)
+        except OSError:
+            return None
+        with self._lock:
+            secret_key = self._keys.get(identity)
+            if secret_key is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return secret_key
+
+    def contains(self, file_path):
+        """檢查檔案是否有快取的金鑰（不影響命中統計）"""
+        try:
+            identity = self.file_identity(file_path)
+        except OSError:
+            return False
+        with self._lock:
+            return identity in self._keys
+
+    def put(self, file_path, secret_key):
+        """快取金鑰
+
+        參數:
+            file_path: 檔案路徑
+            secret_key: 解密金鑰
+        """
+        identity = self.file_identity(file_path)
+        with self._lock:
+            self._keys[identity] = secret_key
+
+    def clear(self):
+        """清除所有快取的金鑰"""
+        with self._lock:
+            self._keys.clear()
+
+
+# 整個程式共用的快取，程式結束時清除
+session_key_cache = KeyCache()
+atexit.register(session_key_cache.clear)
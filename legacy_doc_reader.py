@@ -0,0 +1,142 @@
+"""
+Module for extracting text from Word 97-2003 (.doc) files through the piece table.
+"""
+import struct
+
+# FIB（File Information Block）中使用到的欄位偏移（MS-DOC 2.5）
+_FIB_IDENT = 0xA5EC
+_FIB_FLAGS_OFFSET = 0x0A
+_FIB_WHICH_TABLE = 0x0200   # fWhichTblStm：1 表示使用 1Table
+_FIB_ENCRYPTED = 0x0100     # fEncrypted
+_FIB_CCP_TEXT_OFFSET = 0x4C  # FibRgLw97.ccpText：主文件的字元數
+_FIB_FC_CLX_OFFSET = 0x1A2   # FibRgFcLcb97.fcClx
+_FIB_LCB_CLX_OFFSET = 0x1A6  # FibRgFcLcb97.lcbClx
+
+# Clx 結構中的類型標記
+_CLXT_PRC = 0x01
+_CLXT_PCDT = 0x02
+
+# FcCompressed：bit 30 表示以單一位元組（cp1252）儲存
+_FC_COMPRESSED = 0x40000000
+
+# 特殊字元的轉換：段落、儲存格/列結尾、換行、分頁等
+_SPECIAL_CHARS = str.maketrans({
+    "\r": "\n",
+    "\x07": "\t",    # 儲存格結尾
+    "\x0b": "\n",    # 手動換行
+    "\x0c": "\n",    # 分頁 / 分節
+    "\x1e": "-",     # 不分行連字號
+    "\x1f": "",      # 選擇性連字號
+    "\xa0": " ",
+    "\x01": "",      # 圖片等物件的位置
+    "\x08": "",      # 繪圖物件的位置
+})
+
+
+def _read_stream(ole, name):
+    """讀取 CFB 中的整個資料流"""
+    with ole.openstream(name) as stream:
+        return stream.read()
+
+
+def _find_piece_table(table, fc_clx, lcb_clx):
+    """在 Clx 中略過 Prc 並找到 PlcPcd（piece table）
+
+    參數:
+        table: 表格資料流內容
+        fc_clx: Clx 的起始位置
+        lcb_clx: Clx 的長度
+
+    回傳:
+        PlcPcd 的位元組內容
+    """
+    position = fc_clx
+    end = fc_clx + lcb_clx
+    while position < end:
+        clxt = table[position]
+        if clxt == _CLXT_PRC:
+            size = struct.unpack_from("<H", table, position + 1)[0]
+            position += 3 + size
+        elif clxt == _CLXT_PCDT:
+            size = struct.unpack_from("<I", table, position + 1)[0]
+            return table[position + 5:position + 5 + size]
+        else:
+            break
+    raise ValueError("找不到文件的 piece table")
+
+
+def _strip_field_codes(text):
+    """移除欄位代碼（\\x13 代碼 \\x14 結果 \\x15），只保留顯示的結果"""
+    if "\x13" not in text:
+        return text
+    result = []
+    depth = 0           # 目前所在的欄位層數
+    in_code = []        # 各層是否仍在欄位代碼區段
+    for char in text:
+        if char == "\x13":
+            depth += 1
+            in_code.append(True)
+        elif char == "\x14" and depth:
+            in_code[-1] = False
+        elif char == "\x15" and depth:
+            depth -= 1
+            in_code.pop()
+        elif not any(in_code):
+            result.append(char)
+    return "".join(result)
+
+
+def read_doc_text(file_path):
+    """讀取 Word 97-2003 文件的主文字
+
+    依 FIB 找到表格資料流中的 piece table，並依各 piece 的位置與編碼
+    從 WordDocument 資料流取出文字，不需要 Word 或其他轉換工具。
+
+    參數:
+        file_path: .doc 檔案路徑（或可供 olefile 開啟的檔案物件）
+
+    回傳:
+        文件文字
+    """
+    import olefile  # msoffcrypto 的相依套件
+
+    with olefile.OleFileIO(file_path) as ole:
+        word_document = _read_stream(ole, "WordDocument")
+        ident, = struct.unpack_from("<H", word_document, 0)
+        if ident != _FIB_IDENT:
+            raise ValueError("不是有效的 Word 97-2003 文件")
+
+        flags, = struct.unpack_from("<H", word_document, _FIB_FLAGS_OFFSET)
+        if flags & _FIB_ENCRYPTED:
+            raise ValueError("檔案有密碼保護（encrypted），需要先解密")
+
+        ccp_text, = struct.unpack_from("<i", word_document, _FIB_CCP_TEXT_OFFSET)
+        fc_clx, = struct.unpack_from("<I", word_document, _FIB_FC_CLX_OFFSET)
+        lcb_clx, = struct.unpack_from("<I", word_document, _FIB_LCB_CLX_OFFSET)
+
+        table_name = "1Table" if flags & _FIB_WHICH_TABLE else "0Table"
+        table = _read_stream(ole, table_name)
+
+    plc_pcd = _find_piece_table(table, fc_clx, lcb_clx)
+    # PlcPcd：n+1 個 CP（各 4 位元組）後接 n 個 Pcd（各 8 位元組）
+    piece_count = (len(plc_pcd) - 4) // 12
+    cps = struct.unpack_from(f"<{piece_count + 1}I", plc_pcd, 0)
+    pcd_offset = (piece_count + 1) * 4
+
+    parts = []
+    remaining = ccp_text
+    for index in range(piece_count):
+        if remaining <= 0:
+            break
+        char_count = min(cps[index + 1] - cps[index], remaining)
+        fc, = struct.unpack_from("<I", plc_pcd, pcd_offset + index * 8 + 2)
+        if fc & _FC_COMPRESSED:
+            start = (fc & ~_FC_COMPRESSED) // 2
+            parts.append(word_document[start:start + char_count].decode("cp1252", errors="replace"))
+        else:
+            start = fc
+            parts.append(word_document[start:start + char_count * 2].decode("utf-16-le", errors="replace"))
+        remaining -= char_count
+
+    text = _strip_field_codes("".join(parts))
+    return text.translate(_SPECIAL_CHARS).strip()
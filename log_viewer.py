@@ -0,0 +1,551 @@
+"""
+Module for a paged, searchable log viewer backed by a memory-mapped line index.
+"""
+import mmap
+import os
+import re
+import tkinter as tk
+from array import array
+from bisect import bisect_right
+from tkinter import ttk, messagebox
+
+# 日誌每筆記錄的開頭格式：2025-03-30 12:00:00 - ERROR - 訊息
+_LINE_PATTERN = re.compile(
+    rb"(?:(\d{4})-(\d\d)-(\d\d) \d\d:\d\d:\d\d - ([A-Z]+) - )?[^\n]*\n"
+)
+
+LEVEL_CODES = {b"DEBUG": 1, b"INFO": 2, b"WARNING": 3, b"ERROR": 4, b"CRITICAL": 5}
+LEVEL_NAMES = {"全部": 0, "INFO": 2, "WARNING": 3, "ERROR": 4, "CRITICAL": 5}
+
+# 每次建立索引處理的位元組數，分批進行以免阻塞介面
+INDEX_CHUNK_BYTES = 4 * 1024 * 1024
+# 每頁顯示的行數
+PAGE_LINES = 200
+# 檢查日誌是否增長的間隔（毫秒）
+REFRESH_INTERVAL_MS = 1000
+
+
+class LogIndex:
+    """以記憶體映射讀取日誌檔案並建立行位移索引"""
+
+    def __init__(self, path):
+        """初始化索引（尚未建立，需呼叫 index_more 或 refresh）
+
+        參數:
+            path: 日誌檔案路徑
+        """
+        self.path = path
+        self.file = None
+        self.map = None
+        self.mapped_size = 0
+        self.reset()
+
+    def reset(self):
+        """清除索引資料"""
+        self.offsets = array("Q", [0])  # 每行的起始位移，最後一個元素為已索引的結尾
+        self.levels = array("B")        # 每行所屬記錄的等級代碼（續行沿用前一筆）
+        self.dates = array("I")         # 每行所屬記錄的日期（yyyymmdd，0 表示未知）
+        self.date_set = set()
+        self.current_level = 0
+        self.current_date = 0
+
+    @property
+    def line_count(self):
+        """已索引的行數"""
+        return len(self.offsets) - 1
+
+    @property
+    def indexed_bytes(self):
+        """已索引的位元組數"""
+        return self.offsets[-1]
+
+    @property
+    def complete(self):
+        """是否已索引到映射範圍的結尾（不含未完成的最後一行）"""
+        return self.map is None or self.map.find(b"\n", self.indexed_bytes) == -1
+
+    def _remap(self):
+        """重新映射檔案以涵蓋目前的檔案大小"""
+        size = os.path.getsize(self.path)
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is None:
+            self.file = open(self.path, "rb")
+        self.mapped_size = size
+        if size > 0:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """關閉映射與檔案"""
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def refresh(self):
+        """檢查檔案大小變化：增長時擴大映射，縮小（被輪替或清空）時重建索引
+
+        回傳:
+            檔案是否有變化
+        """
+        size = os.path.getsize(self.path)
+        if size == self.mapped_size and self.file is not None:
+            return False
+        if size < self.indexed_bytes:
+            self.reset()
+        self._remap()
+        return True
+
+    def index_more(self, max_bytes=INDEX_CHUNK_BYTES):
+        """為下一段內容建立索引
+
+        參數:
+            max_bytes: 本次最多處理的位元組數
+
+        回傳:
+            本次新增的行數
+        """
+        if self.file is None:
+            self._remap()
+        if self.map is None:
+            return 0
+
+        start = self.indexed_bytes
+        end = min(start + max_bytes, self.mapped_size)
+        if end < self.mapped_size:
+            # 延伸到該段最後一個完整行的結尾
+            newline = self.map.find(b"\n", end)
+            end = self.mapped_size if newline == -1 else newline + 1
+
+        offsets_append = self.offsets.append
+        levels_append = self.levels.append
+        dates_append = self.dates.append
+        level = self.current_level
+        date = self.current_date
+        added = 0
+        for match in _LINE_PATTERN.finditer(self.map, start, end):
+            if match.group(4) is not None:
+                level = LEVEL_CODES.get(match.group(4), 0)
+                date = int(match.group(1) + match.group(2) + match.group(3))
+                self.date_set.add(date)
+            offsets_append(match.end())
+            levels_append(level)
+            dates_append(date)
+            added += 1
+        self.current_level = level
+        self.current_date = date
+        return added
+
+    def get_line(self, line_number):
+        """取得指定行的文字
+
+        參數:
+            line_number: 行號（從 0 開始）
+
+        回傳:
+            該行文字（不含換行）
+        """
+        data = self.map[self.offsets[line_number]:self.offsets[line_number + 1]]
+        return data.rstrip(b"\r\n").decode("utf-8", errors="replace")
+
+    def line_at_offset(self, offset):
+        """取得包含指定位移的行號"""
+        return bisect_right(self.offsets, offset) - 1
+
+    def filter_lines(self, min_level=0, date=0, start=0):
+        """依等級與日期篩選行
+
+        參數:
+            min_level: 最低等級代碼（0 表示不篩選）
+            date: 日期（yyyymmdd，0 表示不篩選）
+            start: 起始行號，只篩選此行之後（例如新索引）的行
+
+        回傳:
+            符合條件的行號陣列
+        """
+        levels = self.levels
+        dates = self.dates
+        if date:
+            return array("Q", (i for i in range(start, len(levels)) if levels[i] >= min_level and dates[i] == date))
+        return array("Q", (i for i in range(start, len(levels)) if levels[i] >= min_level))
+
+    def search(self, term, from_line):
+        """從指定行開始向後搜尋文字
+
+        參數:
+            term: 搜尋文字
+            from_line: 起始行號
+
+        回傳:
+            找到的行號，找不到時返回 None
+        """
+        if not term or self.map is None or from_line >= self.line_count:
+            return None
+        position = self.map.find(term.encode("utf-8"), self.offsets[from_line], self.indexed_bytes)
+        if position == -1:
+            return None
+        return self.line_at_offset(position)
+
+
+class LogViewer:
+    """分頁顯示日誌的視窗，只繪製目前可見的行"""
+
+    def __init__(self, root, log_dir="logs"):
+        """建立日誌檢視視窗
+
+        參數:
+            root: 主視窗
+            log_dir: 日誌目錄
+        """
+        self.root = root
+        self.log_dir = log_dir
+        self.index = None
+        self.view = None       # 篩選後的行號陣列；None 表示顯示所有行
+        self.view_lines = 0    # view 已篩選到的索引行數
+        self.top = 0           # 目前頁面第一行在 view 中的位置
+        self.follow = False    # 位於結尾時跟隨新增的內容
+        self.search_line = 0   # 下一次搜尋的起始行
+        self.after_id = None
+
+        self.window = tk.Toplevel(root)
+        self.window.title("錯誤日誌檢視")
+        self.window.geometry("800x500")
+        self.window.transient(root)  # 設為主視窗的子視窗
+        self.window.grab_set()  # 模態視窗
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.frame = tk.Frame(self.window, padx=10, pady=10)
+        self.frame.pack(fill=tk.BOTH, expand=True)
+
+        # 獲取日誌檔案列表
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        log_files = self.list_log_files()
+
+        if not log_files:
+            tk.Label(self.frame, text="沒有找到錯誤日誌檔案。").pack(pady=20)
+            tk.Button(self.frame, text="關閉", command=self.close).pack(pady=10)
+            return
+
+        self.create_widgets(log_files)
+        self.open_log()
+
+    def list_log_files(self):
+        """列出日誌目錄中的錯誤日誌檔案（最新的排在前面）"""
+        log_files = [f for f in os.listdir(self.log_dir) if f.startswith("error_log_") and f.endswith(".log")]
+        log_files.sort(reverse=True)
+        return log_files
+
+    def create_widgets(self, log_files):
+        """建立檢視視窗的元件"""
+        # 日誌檔案下拉選單與篩選條件
+        toolbar = tk.Frame(self.frame)
+        toolbar.pack(fill=tk.X, pady=(0, 5))
+
+        tk.Label(toolbar, text="日誌檔案:").pack(side=tk.LEFT)
+        self.selected_log = tk.StringVar(value=log_files[0])
+        self.log_combo = ttk.Combobox(toolbar, textvariable=self.selected_log, values=log_files,
+                                      width=28, state="readonly")
+        self.log_combo.pack(side=tk.LEFT, padx=(0, 10))
+        self.log_combo.bind("<<ComboboxSelected>>", lambda event: self.open_log())
+
+        tk.Label(toolbar, text="等級:").pack(side=tk.LEFT)
+        self.level_var = tk.StringVar(value="全部")
+        level_combo = ttk.Combobox(toolbar, textvariable=self.level_var, values=list(LEVEL_NAMES),
+                                   width=10, state="readonly")
+        level_combo.pack(side=tk.LEFT, padx=(0, 10))
+        level_combo.bind("<<ComboboxSelected>>", lambda event: self.apply_filter())
+
+        tk.Label(toolbar, text="日期:").pack(side=tk.LEFT)
+        self.date_var = tk.StringVar(value="全部")
+        self.date_combo = ttk.Combobox(toolbar, textvariable=self.date_var, values=["全部"],
+                                       width=12, state="readonly")
+        self.date_combo.pack(side=tk.LEFT)
+        self.date_combo.bind("<<ComboboxSelected>>", lambda event: self.apply_filter())
+
+        # 搜尋列
+        search_bar = tk.Frame(self.frame)
+        search_bar.pack(fill=tk.X, pady=(0, 5))
+        tk.Label(search_bar, text="搜尋:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(search_bar, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        # 輸入時即從目前位置搜尋，按 Enter 搜尋下一個
+        search_entry.bind("<KeyRelease>", self.on_search_typed)
+        search_entry.bind("<Return>", lambda event: self.search_next())
+        tk.Button(search_bar, text="下一個", command=self.search_next).pack(side=tk.LEFT)
+
+        # 日誌內容顯示區域（只放目前頁面的行）
+        text_frame = tk.Frame(self.frame)
+        text_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 5))
+        self.scrollbar = tk.Scrollbar(text_frame, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_text = tk.Text(text_frame, wrap=tk.NONE)
+        self.log_text.pack(fill=tk.BOTH, expand=True)
+        self.log_text.tag_configure("match", background="yellow", foreground="black")
+        self.log_text.bind("<Configure>", lambda event: self.render() if self.index else None)
+        self.log_text.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.log_text.bind("<Button-4>", lambda event: self.scroll_lines(-3))
+        self.log_text.bind("<Button-5>", lambda event: self.scroll_lines(3))
+        self.log_text.bind("<Prior>", lambda event: self.scroll_lines(-self.visible_lines()))
+        self.log_text.bind("<Next>", lambda event: self.scroll_lines(self.visible_lines()))
+
+        # 狀態與按鈕區域
+        button_frame = tk.Frame(self.frame)
+        button_frame.pack(fill=tk.X)
+        self.status_label = tk.Label(button_frame, text="", anchor=tk.W)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(button_frame, text="刪除日誌", command=self.delete_log).pack(side=tk.LEFT, padx=(0, 10))
+        tk.Button(button_frame, text="關閉", command=self.close).pack(side=tk.RIGHT)
+
+    def open_log(self):
+        """開啟選取的日誌檔案並開始建立索引"""
+        self.close_index()
+        selected_file = self.selected_log.get()
+        if not selected_file:
+            return
+        try:
+            self.index = LogIndex(os.path.join(self.log_dir, selected_file))
+            self.index.refresh()
+        except Exception as e:
+            self.index = None
+            self.show_message(f"無法讀取日誌檔案: {str(e)}")
+            return
+        self.view = None
+        self.top = 0
+        self.search_line = 0
+        self.date_combo.config(values=["全部"])
+        self.date_var.set("全部")
+        self.after_id = self.window.after_idle(self.index_step)
+
+    def close_index(self):
+        """停止背景更新並釋放目前的索引"""
+        if self.after_id is not None:
+            self.window.after_cancel(self.after_id)
+            self.after_id = None
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    def index_step(self):
+        """分批建立索引；完成後定期檢查檔案是否增長"""
+        self.after_id = None
+        if self.index is None:
+            return
+        try:
+            if self.index.complete and self.index.refresh() is False:
+                # 已完整索引且檔案沒有變化，稍後再檢查
+                self.after_id = self.window.after(REFRESH_INTERVAL_MS, self.index_step)
+                return
+            added = self.index.index_more()
+        except Exception as e:
+            self.show_message(f"無法讀取日誌檔案: {str(e)}")
+            return
+
+        if added:
+            self.update_dates()
+            if self.view is not None:
+                self.extend_filter(added)
+            elif self.follow:
+                self.top = max(0, self.index.line_count - self.visible_lines())
+            self.render()
+        elif self.index.line_count == 0:
+            self.show_message("日誌檔案為空。")
+
+        delay = 1 if not self.index.complete else REFRESH_INTERVAL_MS
+        self.after_id = self.window.after(delay, self.index_step)
+
+    def update_dates(self):
+        """更新日期篩選選單"""
+        dates = sorted(self.index.date_set, reverse=True)
+        values = ["全部"] + [f"{d // 10000:04d}-{d // 100 % 100:02d}-{d % 100:02d}" for d in dates]
+        if len(values) != len(self.date_combo.cget("values")):
+            self.date_combo.config(values=values)
+
+    def filter_criteria(self):
+        """目前選取的 (最低等級代碼, 日期)"""
+        min_level = LEVEL_NAMES.get(self.level_var.get(), 0)
+        date_text = self.date_var.get()
+        date = int(date_text.replace("-", "")) if date_text != "全部" else 0
+        return min_level, date
+
+    def extend_filter(self, added):
+        """只篩選新索引的行並加入目前的檢視；索引重建（檔案被輪替或清空）時重新篩選
+
+        參數:
+            added: 本次新增的索引行數
+        """
+        min_level, date = self.filter_criteria()
+        start = self.index.line_count - added
+        if start == self.view_lines:
+            self.view.extend(self.index.filter_lines(min_level, date, start))
+        else:
+            self.view = self.index.filter_lines(min_level, date)
+        self.view_lines = self.index.line_count
+
+    def apply_filter(self):
+        """依等級與日期篩選要顯示的行"""
+        if self.index is None:
+            return
+        min_level, date = self.filter_criteria()
+        if min_level == 0 and date == 0:
+            self.view = None
+        else:
+            self.view = self.index.filter_lines(min_level, date)
+        self.view_lines = self.index.line_count
+        self.top = 0
+        self.render()
+
+    def total_lines(self):
+        """目前檢視（篩選後）的行數"""
+        if self.index is None:
+            return 0
+        return self.index.line_count if self.view is None else len(self.view)
+
+    def visible_lines(self):
+        """文字區域可容納的行數"""
+        height = self.log_text.winfo_height()
+        line_height = max(1, self.log_text.tk.call("font", "metrics", self.log_text.cget("font"), "-linespace"))
+        return max(1, min(PAGE_LINES, height // line_height))
+
+    def render(self, highlight_line=None):
+        """只繪製目前頁面可見的行"""
+        total = self.total_lines()
+        page = self.visible_lines()
+        self.top = max(0, min(self.top, total - page))
+        end = min(total, self.top + page)
+
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.delete(1.0, tk.END)
+        lines = []
+        for position in range(self.top, end):
+            line_number = position if self.view is None else self.view[position]
+            lines.append(self.index.get_line(line_number))
+        self.log_text.insert(tk.END, "\n".join(lines))
+
+        # 標示搜尋結果
+        term = self.search_var.get()
+        if highlight_line is not None and term:
+            row = highlight_line - self.top + 1
+            column = lines[highlight_line - self.top].find(term)
+            if column >= 0:
+                self.log_text.tag_add("match", f"{row}.{column}", f"{row}.{column + len(term)}")
+        self.log_text.config(state=tk.DISABLED)
+
+        if total:
+            self.scrollbar.set(self.top / total, end / total)
+        else:
+            self.scrollbar.set(0, 1)
+        self.follow = end >= total
+        state = "" if self.index.complete else "（索引中）"
+        self.status_label.config(text=f"第 {self.top + 1}-{end} 行，共 {total} 行{state}")
+
+    def scroll_lines(self, count):
+        """捲動指定行數"""
+        self.top = max(0, self.top + count)
+        self.render()
+        return "break"
+
+    def on_scrollbar(self, action, *args):
+        """處理捲動條事件"""
+        total = self.total_lines()
+        if action == "moveto":
+            self.top = int(float(args[0]) * total)
+        elif action == "scroll":
+            amount = int(args[0])
+            step = self.visible_lines() if args[1] == "pages" else 1
+            self.top += amount * step
+        self.top = max(0, self.top)
+        self.render()
+
+    def on_mouse_wheel(self, event):
+        """處理滑鼠滾輪事件"""
+        return self.scroll_lines(-3 if event.delta > 0 else 3)
+
+    def view_position(self, line_number):
+        """將行號轉換為目前檢視中的位置，不在檢視中時返回 None"""
+        if self.view is None:
+            return line_number
+        position = bisect_right(self.view, line_number) - 1
+        if position >= 0 and self.view[position] == line_number:
+            return position
+        return None
+
+    def find_from(self, start_line):
+        """從指定行開始尋找符合目前篩選條件的搜尋結果"""
+        term = self.search_var.get()
+        line = start_line
+        while True:
+            line = self.index.search(term, line)
+            if line is None:
+                return None, None
+            position = self.view_position(line)
+            if position is not None:
+                return line, position
+            line += 1
+
+    def on_search_typed(self, event):
+        """輸入搜尋文字時從目前位置開始搜尋"""
+        if event.keysym in ("Return", "Up", "Down", "Left", "Right"):
+            return
+        if self.index is None:
+            return
+        current = self.top if self.view is None else (self.view[self.top] if self.total_lines() else 0)
+        self.show_search_result(*self.find_from(current))
+
+    def search_next(self):
+        """搜尋下一個結果，到結尾時從頭開始"""
+        if self.index is None:
+            return
+        line, position = self.find_from(self.search_line)
+        if line is None and self.search_line > 0:
+            line, position = self.find_from(0)
+        self.show_search_result(line, position)
+
+    def show_search_result(self, line, position):
+        """捲動到搜尋結果並加以標示"""
+        if line is None:
+            self.status_label.config(text="找不到符合的內容")
+            return
+        self.search_line = line + 1
+        self.top = max(0, position - self.visible_lines() // 2)
+        self.render(highlight_line=position)
+
+    def show_message(self, message):
+        """在文字區域顯示訊息"""
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.delete(1.0, tk.END)
+        self.log_text.insert(tk.END, message)
+        self.log_text.config(state=tk.DISABLED)
+
+    def delete_log(self):
+        """刪除目前選取的日誌檔案"""
+        selected_file = self.selected_log.get()
+        if not selected_file:
+            return
+
+        if messagebox.askyesno("確認刪除", f"確定要刪除日誌檔案 {selected_file} 嗎？"):
+            try:
+                # 刪除前先釋放記憶體映射
+                self.close_index()
+                os.remove(os.path.join(self.log_dir, selected_file))
+                # 更新日誌檔案列表
+                log_files = self.list_log_files()
+                self.log_combo.config(values=log_files)
+
+                if log_files:
+                    self.selected_log.set(log_files[0])
+                    self.open_log()
+                else:
+                    self.selected_log.set("")
+                    self.show_message("沒有找到錯誤日誌檔案。")
+            except Exception as e:
+                messagebox.showerror("錯誤", f"無法刪除日誌檔案: {str(e)}")
+
+    def close(self):
+        """關閉檢視視窗"""
+        self.close_index()
+        self.window.destroy()
@@ -4,59 +4,176 @@ import json
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
 import threading
-import docx2txt  # 用於讀取Word文檔
-import msoffcrypto  # 用於處理加密的Office文檔
 import io
 from io import BytesIO
-import opencc  # 用於中文文字轉換和校正
 import tempfile
-from docx import Document  # 用於更精確地讀取Word文檔格式
-from PIL import Image, ImageTk
-from PIL import Image
 import datetime
 import traceback
 import logging
+import time
+from perf_timer import StageTimer, profile_call
+from log_viewer import LogViewer
+from image_viewer import ImagePyramid, ImageViewer
+from metrics_log import setup_metrics_logging, start_queue_listener, log_event, peak_memory_bytes
+import document_reader
+from key_cache import session_key_cache
+from correction_engine import load_typo_dictionary
+from ngram_model import MODEL_FILE, NgramModel, ContextCorrector, load_confusion_sets
+from text_normalizer import NORMALIZATION_RULES
+from pipeline import build_pipeline
+from protected_word_store import ProtectedWordStore
+from protected_words_dialog import ProtectedWordsDialog
+
+# docx2txt、msoffcrypto、opencc、python-docx 與 PIL 載入較慢，
+# 改為在首次使用時才匯入，並於視窗繪製後在背景執行緒預先載入
+
+# 啟動到第一次繪製視窗的時間預算（毫秒），超過時記錄警告
+STARTUP_BUDGET_MS = 500
+
+# 大型文件分段載入到文字區域時每段的字元數
+LOAD_CHUNK_CHARS = 64 * 1024
+# 超過此字元數的文字先校正可見範圍附近的段落，其餘依與可見範圍的距離在背景校正
+VIEWPORT_FIRST_CHARS = 256 * 1024
+# 可見範圍優先校正時每個區塊的行數
+CORRECTION_BLOCK_LINES = 200
+
+# 設定此環境變數時，每份文件的處理都會以 cProfile 分析並存到日誌目錄
+PROFILE_ENV_VAR = "TEXTTOOL_PROFILE"
 
 class TextCorrectionTool:
     """文字校正工具主類別"""
-    def __init__(self, root):
+    def __init__(self, root, startup_timer=None):
         """初始化應用程式
         
         參數:
             root: tkinter的根視窗
+            startup_timer: 啟動計時器（可選），用於記錄啟動各階段耗時
         """
         self.root = root
+        self.startup_timer = startup_timer or StageTimer("startup")
         self.root.title("文字校正工具")
         self.root.geometry("900x600")  # 設定視窗大小為900x600
         self.root.resizable(False, False)  # 禁止調整視窗大小
         
         # 設定錯誤日誌
         self.setup_error_logging()
+        self.startup_timer.mark("logging")
         
         # 載入詞彙保護表
         self.protected_words = self.load_protected_words()
         
         # 載入設定
         self.settings = self.load_settings()
-        
-        # 初始化OpenCC轉換器
-        try:
-            # 使用簡體到繁體的轉換
-            self.converter = opencc.OpenCC('s2t')  # 將簡體字轉為繁體字
-        except Exception as e:
-            messagebox.showerror("錯誤", f"無法初始化OpenCC轉換器: {str(e)}")
-            self.converter = None
+        self.startup_timer.mark("settings")
+        
+        # OpenCC轉換器於背景預熱完成後才可用
+        self.converter = None
+        self.warm_up_done = False
+        self.pending_after_warm_up = []  # 預熱期間排隊的操作
+        
+        # 文件處理的階段計時與效能分析
+        self.document_timer = None  # 目前文件的 StageTimer
+        self.document_size = None  # 目前文件的大小（位元組）
+        self.source_document_path = None  # 目前載入的 Word 檔案，另存 .docx 時以其保留格式
+        self.profile_all_documents = bool(os.environ.get(PROFILE_ENV_VAR))
+        self.profile_next_document = tk.BooleanVar(value=False)
+        self.profile_prefix = None  # 正在分析的文件的 .prof 檔名前綴
+        
+        # 分段載入文字的狀態
+        self.loading_text = False  # 載入期間暫停 <<Modified>> 觸發的整份縮進調整
+        self.load_generation = 0  # 開始新的載入時遞增，用於取消舊的載入
+        
+        # 可見範圍優先校正的狀態
+        self.correcting_text = False  # 校正結果逐區塊套用期間暫停整份縮進調整
+        self.correction_generation = 0  # 開始新的校正或載入時遞增，用於取消舊的校正
+        self.viewport_block = 0  # 目前可見範圍中央所在的區塊，由捲動事件更新
+        self.context_corrector = None  # 首次使用上下文校正時載入 n-gram 模型
         
         self.create_widgets()  # 創建UI元件
         self.setup_drag_drop()  # 設置拖放功能
+        # 以標題列關閉視窗時同樣清除金鑰並壓縮詞彙保護表
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
+        self.startup_timer.mark("widgets")
         
         # 圖片相關變數
         self.images = []  # 存儲原始圖片
         self.image_refs = []  # 存儲 Tkinter PhotoImage 引用
+        self.image_pyramids = {}  # 圖片索引 → 開啟過的圖片的多解析度金字塔
         self.download_path = os.path.join(os.path.expanduser("~"), "Downloads")  # 預設下載路徑
         
         # 應用深色模式設定
         self.apply_theme()
+        self.startup_timer.mark("theme")
+        
+        # 視窗繪製完成後再開始背景預熱
+        self.root.after_idle(self.on_first_paint)
+    
+    def on_first_paint(self):
+        """視窗首次繪製後記錄啟動耗時，並開始背景預熱"""
+        self.root.update_idletasks()
+        self.startup_timer.mark("first_paint")
+        summary = self.startup_timer.summary()
+        print(f"啟動耗時: {summary}")
+        log_event("startup", total_ms=round(self.startup_timer.total_ms, 1),
+                  stages=self.startup_timer.rounded_stages(), peak_memory_bytes=peak_memory_bytes())
+        if self.startup_timer.total_ms > STARTUP_BUDGET_MS:
+            logging.warning(f"啟動時間超過預算 {STARTUP_BUDGET_MS}ms: {summary}")
+        
+        threading.Thread(target=self._warm_up_thread, daemon=True).start()
+    
+    def _warm_up_thread(self):
+        """在背景匯入較慢的模組並建立OpenCC轉換器"""
+        warm_up_timer = StageTimer("warm_up")
+        converter = None
+        error = None
+        try:
+            import opencc  # 用於中文文字轉換和校正
+            # 使用簡體到繁體的轉換
+            converter = opencc.OpenCC('s2t')  # 將簡體字轉為繁體字
+            converter.convert("预热")  # 預先載入轉換字典
+            warm_up_timer.mark("opencc")
+        except Exception as e:
+            error = e
+        
+        try:
+            import docx2txt  # 用於讀取Word文檔
+            import msoffcrypto  # 用於處理加密的Office文檔
+            from docx import Document  # 用於更精確地讀取Word文檔格式
+            from PIL import Image, ImageTk
+            warm_up_timer.mark("parsers")
+        except Exception as e:
+            print(f"預先載入模組時發生錯誤: {str(e)}")
+        
+        print(f"預熱耗時: {warm_up_timer.summary()}")
+        log_event("warm_up", total_ms=round(warm_up_timer.total_ms, 1),
+                  stages=warm_up_timer.rounded_stages(), ok=error is None)
+        # 更新UI必須在主執行緒中進行
+        self.root.after(0, self._finish_warm_up, converter, error)
+    
+    def _finish_warm_up(self, converter, error):
+        """預熱完成後設定轉換器並執行排隊中的操作
+        
+        參數:
+            converter: 建立好的OpenCC轉換器（失敗時為None）
+            error: 建立轉換器時發生的錯誤（成功時為None）
+        """
+        self.converter = converter
+        self.warm_up_done = True
+        if error is not None:
+            messagebox.showerror("錯誤", f"無法初始化OpenCC轉換器: {str(error)}")
+        
+        pending, self.pending_after_warm_up = self.pending_after_warm_up, []
+        for callback in pending:
+            callback()
+    
+    def quit(self):
+        """清除本次執行快取的解密金鑰、壓縮詞彙保護表後離開程式"""
+        session_key_cache.clear()
+        try:
+            self.protected_words.close()
+        except Exception as e:
+            print(f"壓縮詞彙保護表時發生錯誤: {str(e)}")
+        self.root.quit()
     
     def setup_error_logging(self):
         """設定錯誤日誌記錄"""
@@ -68,13 +185,19 @@ class TextCorrectionTool:
         # 設定日誌檔案名稱（包含日期）
         log_file = os.path.join(log_dir, f"error_log_{datetime.datetime.now().strftime('%Y%m%d')}.log")
         
-        # 配置日誌記錄器
-        logging.basicConfig(
-            filename=log_file,
-            level=logging.ERROR,
-            format='%(asctime)s - %(levelname)s - %(message)s',
+        # 配置日誌記錄器（INFO 等級用於記錄處理階段耗時）
+        # 經由佇列交給背景執行緒寫檔，避免檔案 I/O 阻塞 Tk 主迴圈與工作執行緒
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        ))
+        root_logger = logging.getLogger()
+        root_logger.setLevel(logging.INFO)
+        start_queue_listener(root_logger, file_handler)
+        
+        # 結構化效能記錄（每個事件一行 JSON，依大小與時間輪替）
+        setup_metrics_logging(log_dir)
         
         # 設定未捕獲異常的處理器
         def handle_exception(exc_type, exc_value, exc_traceback):
@@ -106,13 +229,19 @@ class TextCorrectionTool:
         file_menu.add_command(label="開啟", command=self.open_file)
         file_menu.add_command(label="儲存", command=self.save_file)
         file_menu.add_separator()
-        file_menu.add_command(label="離開", command=self.root.quit)
+        file_menu.add_command(label="離開", command=self.quit)
         
         # 編輯選單
         edit_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="編輯", menu=edit_menu)
         edit_menu.add_command(label="校正文字", command=self.correct_text)
         edit_menu.add_command(label="管理保護詞彙", command=self.manage_protected_words)
+        self.context_correction_var = tk.BooleanVar(value=self.settings["context_correction"])
+        edit_menu.add_checkbutton(label="依上下文校正易混淆字", variable=self.context_correction_var,
+                                  command=self.toggle_context_correction)
+        self.normalize_text_var = tk.BooleanVar(value=self.settings["normalize_text"])
+        edit_menu.add_checkbutton(label="校正前正規化全形半形與空白", variable=self.normalize_text_var,
+                                  command=self.toggle_normalize_text)
         
         # 設定選單
         settings_menu = tk.Menu(menubar, tearoff=0)
@@ -124,6 +253,7 @@ class TextCorrectionTool:
         view_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="檢視", menu=view_menu)
         view_menu.add_command(label="錯誤日誌", command=self.view_error_logs)
+        view_menu.add_checkbutton(label="分析下一份文件的效能", variable=self.profile_next_document)
         
         # 主框架，分為上下兩部分
         main_frame = tk.Frame(self.root)
@@ -142,7 +272,7 @@ class TextCorrectionTool:
         self.text_area = tk.Text(text_frame, 
                                font=(self.settings["font_family"], self.settings["font_size"]),
                                wrap=tk.WORD,  # 啟用自動換行
-                               yscrollcommand=y_scrollbar.set)
+                               yscrollcommand=self.on_text_scroll)
         self.text_area.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # 設置縮進，使換行後的文字對齊前一行的第一個字
@@ -153,6 +283,7 @@ class TextCorrectionTool:
         
         # 設置滾動條的命令
         y_scrollbar.config(command=self.text_area.yview)
+        self.y_scrollbar = y_scrollbar
         
         # 圖片顯示區域框架 (900x120)
         self.image_frame = tk.Frame(main_frame, width=900, height=120, bg="white")
@@ -191,6 +322,17 @@ class TextCorrectionTool:
         self.status_bar = tk.Label(self.root, text="就緒", bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
     
+    def on_text_scroll(self, first, last):
+        """更新滾動條，並記錄可見範圍中央的區塊供背景校正調整順序
+        
+        參數:
+            first: 可見範圍的起始比例
+            last: 可見範圍的結束比例
+        """
+        self.y_scrollbar.set(first, last)
+        center_line = int(self.text_area.index(f"@0,{self.text_area.winfo_height() // 2}").split(".")[0])
+        self.viewport_block = (center_line - 1) // CORRECTION_BLOCK_LINES
+    
     def on_image_container_configure(self, event):
         """當圖片容器大小變化時，更新畫布的滾動區域"""
         self.image_canvas.configure(scrollregion=self.image_canvas.bbox("all"))
@@ -342,40 +484,28 @@ class TextCorrectionTool:
                 
             # 更新狀態欄
             self.status_bar.config(text=f"正在處理檔案: {os.path.basename(file_path)}")
+            self.start_document_timer(file_path)
             
             # 嘗試處理Word檔案
             try:
                 # 先嘗試檢查文件是否加密
                 try:
-                    with open(file_path, 'rb') as f:
-                        try:
-                            office_file = msoffcrypto.OfficeFile(f)
-                            if office_file.is_encrypted():
-                                print("檔案已加密，需要密碼")
-                                # 文件已加密，直接調用密碼處理方法
-                                self.handle_password_protected_file(file_path)
-                                return
-                        except Exception as e:
-                            print(f"檢查加密狀態時發生錯誤: {str(e)}")
-                            # 繼續嘗試普通處理
+                    if document_reader.is_encrypted(file_path, self.document_timer):
+                        print("檔案已加密，需要密碼")
+                        # 文件已加密，直接調用密碼處理方法
+                        self.handle_password_protected_file(file_path)
+                        return
                 except Exception as e:
-                    print(f"開啟檔案時發生錯誤: {str(e)}")
+                    print(f"檢查加密狀態時發生錯誤: {str(e)}")
                     # 繼續嘗試普通處理
                 
                 # 嘗試不使用密碼處理
                 text = self.process_word_file(file_path)
                 
-                # 如果成功處理，更新文字區域
+                # 如果成功處理，分段更新文字區域（同時調整縮進），完成後自動校正文字
                 if text:
-                    self.text_area.delete(1.0, tk.END)
-                    self.text_area.insert(tk.END, text)
                     self.status_bar.config(text=f"已載入檔案: {os.path.basename(file_path)}")
-                    
-                    # 調整縮進
-                    self.adjust_indentation()
-                    
-                    # 自動校正文字
-                    self.correct_text()
+                    self.load_text(text, on_done=self.correct_text)
                 
             except Exception as e:
                 # 檢查是否為加密文件的錯誤
@@ -394,8 +524,64 @@ class TextCorrectionTool:
             self.status_bar.config(text=f"處理拖放檔案時發生錯誤: {str(e)}")
             messagebox.showerror("錯誤", f"處理拖放檔案時發生錯誤: {str(e)}")
     
+    def start_document_timer(self, file_path):
+        """為新的文件建立階段計時器
+        
+        參數:
+            file_path: Word檔案路徑
+        """
+        self.document_timer = StageTimer(os.path.basename(file_path))
+        try:
+            self.document_size = os.path.getsize(file_path)
+        except OSError:
+            self.document_size = None
+    
+    def finish_document_timer(self):
+        """將目前文件的階段耗時摘要顯示在狀態欄並寫入日誌"""
+        if self.document_timer is None:
+            return
+        timer = self.document_timer
+        summary = timer.summary()
+        self.document_timer = None
+        print(f"處理耗時: {summary}")
+        logging.info(f"處理耗時: {summary}")
+        log_event("document", file=timer.name, size_bytes=self.document_size,
+                  chars=len(self.text_area.get(1.0, tk.END)) - 1,
+                  total_ms=round(timer.total_ms, 1), stages=timer.rounded_stages(),
+                  key_cache_hits=session_key_cache.hits, key_cache_misses=session_key_cache.misses,
+                  peak_memory_bytes=peak_memory_bytes())
+        self.status_bar.config(text=f"文字校正完成 - {summary}")
+    
+    def _profile_path(self, prefix, stage):
+        """產生 .prof 檔案的路徑（與日誌放在同一目錄）"""
+        return os.path.join("logs", f"{prefix}_{stage}.prof")
+    
     def process_word_file(self, file_path, password=None):
-        """處理Word檔案
+        """處理Word檔案，並依設定記錄階段耗時或進行效能分析
+        
+        參數:
+            file_path: Word檔案路徑
+            password: 檔案密碼（如果有的話）
+            
+        回傳:
+            檔案內容
+        """
+        file_name = os.path.basename(file_path)
+        if self.document_timer is None or self.document_timer.name != file_name:
+            self.start_document_timer(file_path)
+        
+        # 環境變數或選單開關啟用時，以 cProfile 分析此文件的處理
+        if self.profile_all_documents or self.profile_next_document.get():
+            self.profile_next_document.set(False)
+            self.profile_prefix = f"profile_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            return profile_call(self._profile_path(self.profile_prefix, "load"),
+                                self._load_word_file, file_path, password)
+        
+        self.profile_prefix = None
+        return self._load_word_file(file_path, password)
+    
+    def _load_word_file(self, file_path, password=None):
+        """讀取Word檔案的文字並提取圖片
         
         參數:
             file_path: Word檔案路徑
@@ -410,36 +596,22 @@ class TextCorrectionTool:
         
         # 清空之前的圖片
         self.clear_images()
+        self.source_document_path = file_path
         
-        # 如果提供了密碼，嘗試解密檔案
-        if password:
+        # 如果提供了密碼或本次執行已快取金鑰，嘗試解密檔案
+        if password or document_reader.has_cached_key(file_path):
             try:
-                # 創建一個臨時檔案來存儲解密後的內容
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
-                    temp_path = temp_file.name
-                
-                # 打開加密檔案
-                with open(file_path, 'rb') as f:
-                    file_bytes = f.read()
-                
-                # 創建一個 BytesIO 對象
-                file_stream = BytesIO(file_bytes)
-                
-                # 使用 msoffcrypto 解密
-                ms_file = msoffcrypto.OfficeFile(file_stream)
-                ms_file.load_key(password=password)
-                
-                with open(temp_path, 'wb') as f:
-                    ms_file.decrypt(f)
-                
-                # 處理解密後的檔案
-                text = self._process_unencrypted_file(temp_path)
-                
-                # 提取圖片
-                self.extract_images_from_docx(temp_path)
-                
-                # 刪除臨時檔案
-                os.unlink(temp_path)
+                # 解密到臨時檔案
+                temp_path = document_reader.decrypt_to_temp_file(file_path, password, self.document_timer)
+                try:
+                    # 處理解密後的檔案
+                    text = self._process_unencrypted_file(temp_path)
+                    
+                    # 提取圖片
+                    self.extract_images_from_docx(temp_path)
+                finally:
+                    # 刪除臨時檔案
+                    os.unlink(temp_path)
                 
                 return text
             except Exception as e:
@@ -463,33 +635,7 @@ class TextCorrectionTool:
         回傳:
             檔案內容
         """
-        # 先嘗試使用 docx2txt
-        try:
-            text = docx2txt.process(file_path)
-            if text:
-                return text
-        except Exception as e:
-            print(f"使用 docx2txt 處理失敗: {str(e)}")
-            
-            # 如果是加密錯誤，直接拋出
-            if self._is_password_error(str(e)):
-                raise Exception(f"檔案可能有密碼保護: {str(e)}")
-        
-        # 如果 docx2txt 失敗，嘗試使用 python-docx
-        try:
-            doc = Document(file_path)
-            text = self._extract_text_from_document(doc)
-            if text:
-                return text
-        except Exception as docx_e:
-            print(f"使用 python-docx 處理失敗: {str(docx_e)}")
-            
-            # 如果是加密錯誤，直接拋出
-            if self._is_password_error(str(docx_e)):
-                raise Exception(f"檔案可能有密碼保護: {str(docx_e)}")
-            
-            # 如果兩種方法都失敗，則拋出異常
-            raise Exception(f"無法讀取文件: {str(docx_e)}")
+        return document_reader.read_text(file_path, self.document_timer)
     
     def _is_password_error(self, error_message):
         """檢查錯誤訊息是否與密碼保護相關
@@ -500,37 +646,7 @@ class TextCorrectionTool:
         回傳:
             是否為密碼相關錯誤
         """
-        error_message = error_message.lower()
-        password_keywords = ["password", "encrypted", "保護", "密碼", "加密"]
-        return any(keyword in error_message for keyword in password_keywords)
-    
-    def _extract_text_from_document(self, doc):
-        """從 python-docx Document 物件中提取文字
-        
-        參數:
-            doc: python-docx Document 物件
-            
-        回傳:
-            提取的文字
-        """
-        # 提取文本，保留段落格式
-        paragraphs = []
-        for para in doc.paragraphs:
-            if para.text.strip():  # 忽略空段落
-                paragraphs.append(para.text)
-        
-        # 提取表格內容
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = []
-                for cell in row.cells:
-                    if cell.text.strip():
-                        row_text.append(cell.text.strip())
-                if row_text:
-                    paragraphs.append('\t'.join(row_text))
-        
-        # 使用兩個換行符連接段落，保留格式
-        return '\n\n'.join(paragraphs)
+        return document_reader.is_password_error(error_message)
     
     def extract_images_from_docx(self, file_path):
         """從Word文件中提取圖片
@@ -539,33 +655,21 @@ class TextCorrectionTool:
             file_path: Word檔案路徑
         """
         try:
-            # 使用 python-docx 打開文件
-            doc = Document(file_path)
-            
             # 提取文檔中的所有圖片
-            image_index = 0
-            for rel in doc.part.rels.values():
-                if "image" in rel.target_ref:
-                    try:
-                        # 獲取圖片數據
-                        image_data = rel.target_part.blob
-                        
-                        # 使用 PIL 處理圖片
-                        image = Image.open(BytesIO(image_data))
-                        
-                        # 保存圖片到列表中
-                        self.images.append(image)
-                        
-                        # 顯示圖片
-                        self.display_image(image, image_index)
-                        
-                        image_index += 1
-                    except Exception as e:
-                        print(f"提取圖片時出錯: {str(e)}")
+            images = document_reader.extract_images(file_path, self.document_timer)
+            
+            timer = self.document_timer or StageTimer("thumbnails")
+            with timer.stage("thumbnails"):
+                for image_index, image in enumerate(images):
+                    # 保存圖片到列表中
+                    self.images.append(image)
+                    
+                    # 顯示圖片
+                    self.display_image(image, image_index)
             
             # 更新狀態欄
-            if image_index > 0:
-                self.status_bar.config(text=f"已提取 {image_index} 張圖片")
+            if images:
+                self.status_bar.config(text=f"已提取 {len(images)} 張圖片")
             
         except Exception as e:
             print(f"提取圖片時出錯: {str(e)}")
@@ -578,6 +682,8 @@ class TextCorrectionTool:
             image: PIL Image 對象
             index: 圖片索引
         """
+        from PIL import Image, ImageTk
+        
         # 計算縮放後的圖片大小，最大高度為 100 像素
         max_height = 100
         width, height = image.size
@@ -607,66 +713,25 @@ class TextCorrectionTool:
         image_label.bind("<Button-1>", lambda event, img=image, idx=index: self.show_full_image(img, idx))
     
     def show_full_image(self, image, index):
-        """顯示原始大小的圖片
+        """以可縮放與拖曳的檢視視窗顯示圖片
+        
+        第一次開啟時才在背景建立多解析度金字塔，之後重複使用。
         
         參數:
             image: PIL Image 對象
             index: 圖片索引
         """
-        # 創建新視窗
-        image_window = tk.Toplevel(self.root)
-        image_window.title(f"圖片 {index + 1}")
-        
-        # 獲取圖片原始大小
-        width, height = image.size
-        
-        # 限制最大顯示尺寸
-        max_width = 800
-        max_height = 600
-        
-        if width > max_width or height > max_height:
-            # 計算縮放比例
-            width_ratio = max_width / width if width > max_width else 1
-            height_ratio = max_height / height if height > max_height else 1
-            ratio = min(width_ratio, height_ratio)
-            
-            # 縮放圖片
-            new_width = int(width * ratio)
-            new_height = int(height * ratio)
-            display_image = image.resize((new_width, new_height), Image.LANCZOS)
-        else:
-            display_image = image
-            new_width = width
-            new_height = height
-        
-        # 設置視窗大小
-        window_width = new_width + 20
-        window_height = new_height + 20
-        
-        # 居中顯示
-        screen_width = image_window.winfo_screenwidth()
-        screen_height = image_window.winfo_screenheight()
-        x = (screen_width - window_width) // 2
-        y = (screen_height - window_height) // 2
-        image_window.geometry(f"{window_width}x{window_height}+{x}+{y}")
-        
-        # 轉換為 Tkinter 可用的格式
-        tk_image = ImageTk.PhotoImage(display_image)
-        
-        # 創建標籤來顯示圖片
-        image_label = tk.Label(image_window, image=tk_image)
-        image_label.image = tk_image  # 保存引用
-        image_label.pack(padx=10, pady=10)
-        
-        # 添加關閉按鈕
-        close_button = tk.Button(image_window, text="關閉", command=image_window.destroy)
-        close_button.pack(pady=5)
+        pyramid = self.image_pyramids.get(index)
+        if pyramid is None or pyramid.image is not image:
+            pyramid = self.image_pyramids[index] = ImagePyramid(image)
+        ImageViewer(self.root, pyramid, f"圖片 {index + 1}")
     
     def clear_images(self):
         """清空圖片區域"""
         # 清空圖片列表
         self.images = []
         self.image_refs = []
+        self.image_pyramids = {}
         
         # 清空圖片容器
         for widget in self.image_container.winfo_children():
@@ -720,15 +785,10 @@ class TextCorrectionTool:
                 self.status_bar.config(text=f"選擇的檔案: {file_path}")
                 text = self.process_word_file(file_path)
                 if text:
-                    self.text_area.delete(1.0, tk.END)
-                    self.text_area.insert(tk.END, text)
                     self.status_bar.config(text=f"已載入檔案: {os.path.basename(file_path)}")
-                
-                # 調整縮進
-                self.adjust_indentation()
-                
-                # 自動校正文字
-                self.correct_text()
+                    
+                    # 分段載入並調整縮進，完成後自動校正文字
+                    self.load_text(text, on_done=self.correct_text)
                 
         except Exception as e:
             print(f"開啟檔案錯誤: {str(e)}")
@@ -744,16 +804,68 @@ class TextCorrectionTool:
         )
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    text = self.text_area.get(1.0, tk.END)
-                    f.write(text)
+                if file_path.lower().endswith(".docx"):
+                    self._save_docx(file_path)
+                else:
+                    with open(file_path, 'w', encoding='utf-8') as f:
+                        text = self.text_area.get(1.0, tk.END)
+                        f.write(text)
                 self.status_bar.config(text=f"已儲存到: {os.path.basename(file_path)}")
             except Exception as e:
                 self.status_bar.config(text="儲存檔案時出錯")
                 messagebox.showerror("錯誤", f"無法儲存檔案: {str(e)}")
     
+    def _save_docx(self, file_path):
+        """另存為 .docx
+        
+        目前載入的是 .docx 時，以串流方式校正原始文件的文字節點，保留格式、
+        表格與圖片（文字區域中的手動修改不會寫入）；否則以文字區域內容建立新文件。
+        
+        參數:
+            file_path: 輸出路徑
+        """
+        source_path = self.source_document_path
+        if source_path and os.path.exists(source_path) and self.converter:
+            from file_format import sniff_format, FORMAT_DOCX, FORMAT_ENCRYPTED_OOXML
+            from docx_writer import correct_docx
+            
+            source_format = sniff_format(source_path)
+            if source_format in (FORMAT_DOCX, FORMAT_ENCRYPTED_OOXML):
+                pipeline = self._correction_pipeline(self.protected_words.words(), load_typo_dictionary())
+                correct = pipeline.paragraph_function()
+                
+                if source_format == FORMAT_DOCX:
+                    correct_docx(source_path, file_path, correct)
+                else:
+                    # 加密文件以本次執行快取的金鑰解密後輸出（輸出檔不加密）
+                    temp_path = document_reader.decrypt_to_temp_file(source_path)
+                    try:
+                        correct_docx(temp_path, file_path, correct)
+                    finally:
+                        os.unlink(temp_path)
+                return
+        
+        from docx import Document
+        
+        document = Document()
+        for line in self.text_area.get(1.0, tk.END).rstrip("\n").split("\n"):
+            document.add_paragraph(line)
+        document.save(file_path)
+    
     def correct_text(self):
         """校正文字內容"""
+        # 文字仍在分段載入或套用校正結果時，待完成後再校正
+        if self.loading_text or self.correcting_text:
+            self.status_bar.config(text="文字載入中，請稍候再進行校正")
+            return
+        
+        # 預熱尚未完成時，將校正排入佇列，待轉換器就緒後執行
+        if not self.warm_up_done:
+            if self.correct_text not in self.pending_after_warm_up:
+                self.pending_after_warm_up.append(self.correct_text)
+            self.status_bar.config(text="正在載入校正引擎，完成後將自動校正...")
+            return
+        
         # 檢查OpenCC轉換器是否正確初始化
         if not self.converter:
             self.status_bar.config(text="OpenCC轉換器未正確初始化，無法進行校正")
@@ -763,8 +875,20 @@ class TextCorrectionTool:
         # 獲取文字內容
         text = self.text_area.get(1.0, tk.END)
         
-        # 在背景執行校正，避免UI凍結
-        threading.Thread(target=self._correct_text_thread, args=(text,)).start()
+        # 大型文字先校正可見範圍，其餘在背景依與可見範圍的距離校正
+        target, args = self._correct_text_thread, (text,)
+        if len(text) > VIEWPORT_FIRST_CHARS:
+            self.correction_generation += 1
+            self.correcting_text = True
+            target, args = self._viewport_correction_thread, (text, self.correction_generation)
+        
+        # 在背景執行校正，避免UI凍結；分析中的文件也一併分析校正階段
+        if self.profile_prefix:
+            profile_path = self._profile_path(self.profile_prefix, "correct")
+            self.profile_prefix = None
+            threading.Thread(target=profile_call, args=(profile_path, target) + args).start()
+        else:
+            threading.Thread(target=target, args=args).start()
     
     def _correct_text_thread(self, text):
         """在背景執行文字校正的執行緒
@@ -775,54 +899,14 @@ class TextCorrectionTool:
         try:
             print("開始文字校正執行緒")
             
-            # 載入保護詞彙
-            protected_words = self.load_protected_words()
-            print(f"已載入保護詞彙: {protected_words}")
+            # 取得保護詞彙（排序後的快照，不受對話框中的同時修改影響）
+            protected_words = self.protected_words.words()
+            typo_fixes = load_typo_dictionary()
+            print(f"已載入保護詞彙: {len(protected_words)} 個，錯字字典: {len(typo_fixes)} 個")
             
-            # 創建一個暫時字典來保存保護詞彙的位置
-            protected_positions = {}
-            
-            # 找出所有保護詞彙在文本中的位置
-            for word in protected_words:
-                start_pos = 0
-                while True:
-                    pos = text.find(word, start_pos)
-                    if pos == -1:
-                        break
-                    protected_positions[pos] = (pos + len(word), word)
-                    start_pos = pos + 1
-            
-            print(f"找到 {len(protected_positions)} 個保護詞彙位置")
-            
-            # 如果沒有保護詞彙，直接轉換整個文本
-            if not protected_positions:
-                corrected_text = self.converter.convert(text)
-            else:
-                # 分段處理文本，保護特定詞彙
-                result = []
-                last_end = 0
-                
-                # 按位置排序保護區域
-                positions = sorted(protected_positions.keys())
-                
-                for start in positions:
-                    end, word = protected_positions[start]
-                    
-                    # 轉換保護詞彙前的文本
-                    if start > last_end:
-                        segment = text[last_end:start]
-                        result.append(self.converter.convert(segment))
-                    
-                    # 添加保護詞彙（不轉換）
-                    result.append(word)
-                    last_end = end
-                
-                # 處理最後一個保護詞彙之後的文本
-                if last_end < len(text):
-                    segment = text[last_end:]
-                    result.append(self.converter.convert(segment))
-                
-                corrected_text = ''.join(result)
+            # 正規化、保護詞彙與轉換融合為一次掃描，各階段耗時記錄在文件的計時器
+            timer = self.document_timer or StageTimer("correct")
+            corrected_text = self._correction_pipeline(protected_words, typo_fixes).correct(text, timer)
             
             print(f"校正完成，轉換後文字長度: {len(corrected_text)}")
             
@@ -834,116 +918,187 @@ class TextCorrectionTool:
             self.root.after(0, lambda: self.status_bar.config(text=f"校正文字時發生錯誤: {str(e)}"))
             self.root.after(0, lambda: messagebox.showerror("錯誤", f"校正文字時發生錯誤: {str(e)}"))
     
+    def _viewport_correction_thread(self, text, generation):
+        """依與可見範圍的距離逐區塊校正，每完成一個區塊即交由主執行緒套用
+        
+        每次挑選下一個區塊時都重新讀取可見範圍，因此捲動後會優先校正新的位置。
+        
+        參數:
+            text: 要校正的文字
+            generation: 校正代號，與目前不同時表示已被取代
+        """
+        try:
+            protected_words = self.protected_words.words()
+            typo_fixes = load_typo_dictionary()
+            timer = self.document_timer or StageTimer("correct")
+            correct = self._correction_pipeline(protected_words, typo_fixes).paragraph_function(timer)
+            
+            # Text 元件的內容結尾固定有一個換行，不屬於文件
+            if text.endswith("\n"):
+                text = text[:-1]
+            lines = text.split("\n")
+            block_count = (len(lines) + CORRECTION_BLOCK_LINES - 1) // CORRECTION_BLOCK_LINES
+            done = [False] * block_count
+            print(f"開始可見範圍優先校正: {block_count} 個區塊")
+            
+            for completed in range(1, block_count + 1):
+                if generation != self.correction_generation:
+                    return
+                
+                # 從可見範圍中央往前後尋找最近的未校正區塊
+                center = min(max(self.viewport_block, 0), block_count - 1)
+                for distance in range(block_count):
+                    if center + distance < block_count and not done[center + distance]:
+                        index = center + distance
+                        break
+                    if center - distance >= 0 and not done[center - distance]:
+                        index = center - distance
+                        break
+                done[index] = True
+                
+                first = index * CORRECTION_BLOCK_LINES
+                original = "\n".join(lines[first:first + CORRECTION_BLOCK_LINES])
+                corrected = correct(original)
+                
+                # 更新UI必須在主執行緒中進行
+                self.root.after(0, self._apply_corrected_block, generation, first + 1, original, corrected,
+                                completed, block_count)
+        except Exception as e:
+            print(f"校正文字時發生錯誤: {str(e)}")
+            self.root.after(0, self._cancel_viewport_correction, generation)
+            self.root.after(0, lambda: self.status_bar.config(text=f"校正文字時發生錯誤: {str(e)}"))
+            self.root.after(0, lambda: messagebox.showerror("錯誤", f"校正文字時發生錯誤: {str(e)}"))
+    
+    def _apply_corrected_block(self, generation, first_line, original, corrected, completed, block_count):
+        """以校正結果取代文字區域中的一個區塊，並重新調整該區塊的縮進
+        
+        參數:
+            generation: 校正代號
+            first_line: 區塊第一行的行號（從 1 開始）
+            original: 區塊的原始文字
+            corrected: 區塊校正後的文字
+            completed: 已完成的區塊數
+            block_count: 區塊總數
+        """
+        if generation != self.correction_generation:
+            return
+        
+        timer = self.document_timer or StageTimer("insert")
+        start_time = time.perf_counter()
+        if corrected != original:
+            last_line = first_line + original.count("\n")
+            start, end = f"{first_line}.0", f"{last_line}.end"
+            # 使用者已修改此區塊時保留修改，不套用校正結果
+            if self.text_area.get(start, end) == original:
+                self.text_area.delete(start, end)
+                self.text_area.insert(start, corrected)
+                previous_line = self.text_area.get(f"{first_line - 1}.0", f"{first_line - 1}.end") if first_line > 1 else ""
+                self._apply_indentation(corrected.split("\n"), first_line, previous_line)
+                self.text_area.edit_modified(False)
+        timer.add("insert", (time.perf_counter() - start_time) * 1000)
+        
+        if completed < block_count:
+            self.status_bar.config(text=f"正在校正文字... {completed * 100 // block_count}%")
+            return
+        
+        self.correcting_text = False
+        self.status_bar.config(text="文字校正完成")
+        self.finish_document_timer()
+    
+    def _cancel_viewport_correction(self, generation):
+        """停止可見範圍優先校正
+        
+        參數:
+            generation: 要停止的校正代號
+        """
+        if generation == self.correction_generation:
+            self.correction_generation += 1
+            self.correcting_text = False
+    
+    def toggle_context_correction(self):
+        """切換是否在轉換後依上下文校正易混淆字"""
+        self.settings["context_correction"] = self.context_correction_var.get()
+        self.save_settings()
+        if self.settings["context_correction"] and not os.path.exists(MODEL_FILE):
+            messagebox.showinfo("提示", f"找不到 n-gram 模型 {MODEL_FILE}，請先以 ngram_model.py 由文件資料夾訓練模型")
+    
+    def toggle_normalize_text(self):
+        """切換是否在轉換前正規化全形半形字元、控制字元與空白"""
+        self.settings["normalize_text"] = self.normalize_text_var.get()
+        self.save_settings()
+    
+    def _correction_pipeline(self, protected_words, typo_fixes):
+        """依設定建立校正使用的處理流程
+        
+        依設定在轉換前正規化文字，並在啟用上下文校正且模型存在時，轉換後再依前後文評分。
+        保護詞彙與錯字字典比對到的範圍不會正規化或轉換。
+        
+        參數:
+            protected_words: 保護詞彙列表
+            typo_fixes: 錯字字典
+        
+        回傳:
+            Pipeline
+        """
+        context_corrector = None
+        if self.settings.get("context_correction") and os.path.exists(MODEL_FILE):
+            if self.context_corrector is None:
+                try:
+                    self.context_corrector = ContextCorrector(NgramModel(MODEL_FILE), load_confusion_sets())
+                except Exception as e:
+                    print(f"載入 n-gram 模型時發生錯誤: {str(e)}")
+            context_corrector = self.context_corrector
+        
+        rules = ()
+        if self.settings.get("normalize_text"):
+            rules = tuple(self.settings.get("normalization_rules", NORMALIZATION_RULES))
+        try:
+            return build_pipeline(self.converter.convert, protected_words, typo_fixes, rules, context_corrector)
+        except ValueError as e:
+            print(f"正規化設定錯誤，改用預設規則: {str(e)}")
+            return build_pipeline(self.converter.convert, protected_words, typo_fixes, NORMALIZATION_RULES,
+                                  context_corrector)
+    
     def _update_text_area(self, corrected_text):
         """更新文字區域的內容
         
         參數:
             corrected_text: 校正後的文字
         """
-        self.text_area.delete(1.0, tk.END)
-        self.text_area.insert(tk.END, corrected_text)
-        self.status_bar.config(text="文字校正完成")
+        timer = self.document_timer or StageTimer("insert")
+        start = time.perf_counter()
+        
+        def on_done():
+            timer.add("insert", (time.perf_counter() - start) * 1000)
+            self.status_bar.config(text="文字校正完成")
+            self.finish_document_timer()
+        
+        self.load_text(corrected_text, on_done=on_done)
     
     def load_protected_words(self):
         """載入詞彙保護表
         
         回傳:
-            詞彙保護列表
+            ProtectedWordStore（快照加上變更日誌）
         """
         try:
-            # 檢查檔案是否存在
-            if not os.path.exists("protected_words.json"):
-                # 如果不存在，創建一個空的詞彙保護表
-                with open("protected_words.json", "w", encoding="utf-8") as f:
-                    json.dump({"protected_words": []}, f, ensure_ascii=False, indent=4)
-                return []
-            
-            # 讀取詞彙保護表
-            with open("protected_words.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-                
-            # 確保 protected_words 鍵存在
-            if "protected_words" not in data:
-                return []
-                
-            return data["protected_words"]
+            return ProtectedWordStore("protected_words.json")
         except Exception as e:
             print(f"載入詞彙保護表時發生錯誤: {str(e)}")
             messagebox.showerror("錯誤", f"無法載入詞彙保護表: {str(e)}")
-            return []
+            # 只保存在記憶體中，避免覆寫無法讀取的檔案
+            return ProtectedWordStore()
     
     def save_protected_words(self):
-        """儲存詞彙保護表"""
-        # 儲存詞彙保護表
+        """將詞彙保護表壓縮成排序後的快照"""
         try:
-            with open('protected_words.json', 'w', encoding='utf-8') as f:
-                json.dump(self.protected_words, f, ensure_ascii=False, indent=4)
+            self.protected_words.compact()
         except Exception as e:
             messagebox.showerror("錯誤", f"無法儲存詞彙保護表: {str(e)}")
     
     def manage_protected_words(self):
         """管理保護詞彙的視窗"""
-        # 創建一個新視窗來管理保護詞彙
-        manage_window = tk.Toplevel(self.root)
-        manage_window.title("管理保護詞彙")
-        manage_window.geometry("400x500")
-        
-        # 創建一個框架
-        frame = tk.Frame(manage_window)
-        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # 添加標籤
-        tk.Label(frame, text="保護詞彙列表:").pack(anchor=tk.W)
-        
-        # 添加列表框和滾動條
-        list_frame = tk.Frame(frame)
-        list_frame.pack(fill=tk.BOTH, expand=True)
-        
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        words_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set)
-        words_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.config(command=words_listbox.yview)
-        
-        # 填充列表框
-        for word in self.protected_words:
-            words_listbox.insert(tk.END, word)
-        
-        # 添加輸入欄位和按鈕
-        input_frame = tk.Frame(frame)
-        input_frame.pack(fill=tk.X, pady=5)
-        
-        tk.Label(input_frame, text="新增詞彙:").pack(side=tk.LEFT)
-        word_entry = tk.Entry(input_frame)
-        word_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        
-        # 添加按鈕
-        buttons_frame = tk.Frame(frame)
-        buttons_frame.pack(fill=tk.X)
-        
-        def add_word():
-            """添加新詞彙到保護列表"""
-            word = word_entry.get().strip()
-            if word and word not in self.protected_words:
-                self.protected_words.append(word)
-                words_listbox.insert(tk.END, word)
-                word_entry.delete(0, tk.END)
-                self.save_protected_words()
-        
-        def remove_word():
-            """從保護列表中移除選中的詞彙"""
-            selection = words_listbox.curselection()
-            if selection:
-                index = selection[0]
-                word = words_listbox.get(index)
-                words_listbox.delete(index)
-                self.protected_words.remove(word)
-                self.save_protected_words()
-        
-        tk.Button(buttons_frame, text="添加", command=add_word).pack(side=tk.LEFT, padx=5)
-        tk.Button(buttons_frame, text="刪除", command=remove_word).pack(side=tk.LEFT, padx=5)
-        tk.Button(buttons_frame, text="關閉", command=manage_window.destroy).pack(side=tk.RIGHT, padx=5)
+        ProtectedWordsDialog(self.root, self.protected_words)
 
     def open_text_settings(self):
         """開啟文字格式設定視窗"""
@@ -1021,7 +1176,10 @@ class TextCorrectionTool:
         default_settings = {
             "font_family": "新細明體",
             "font_size": 12,
-            "dark_mode": False  # 預設為淺色模式
+            "dark_mode": False,  # 預設為淺色模式
+            "context_correction": False,  # 依 n-gram 模型校正易混淆字（需要 ngram_model.bin）
+            "normalize_text": True,  # 轉換前正規化全形半形字元、控制字元與空白
+            "normalization_rules": list(NORMALIZATION_RULES)  # 啟用的正規化規則
         }
         
         try:
@@ -1106,11 +1264,97 @@ class TextCorrectionTool:
         # 應用主題到狀態欄
         self.status_bar.configure(bg=bg_color, fg=fg_color)
     
+    def load_text(self, text, on_done=None):
+        """將文字載入文字區域；大型文字分段插入，先顯示開頭讓使用者可立即閱讀
+        
+        參數:
+            text: 要載入的文字
+            on_done: 全部載入完成後呼叫的函數（可選）
+        """
+        # 取消尚未完成的載入與校正
+        self.load_generation += 1
+        self.correction_generation += 1
+        self.correcting_text = False
+        self.loading_text = True
+        self.text_area.delete(1.0, tk.END)
+        self._load_text_chunk(text, 0, 1, "", self.load_generation, on_done)
+    
+    def _load_text_chunk(self, text, start, line_number, previous_line, generation, on_done):
+        """插入一段文字並調整該段的縮進，再排程下一段
+        
+        參數:
+            text: 完整文字
+            start: 本段在文字中的起始位置
+            line_number: 本段第一行的行號（從 1 開始）
+            previous_line: 本段之前的最後一行（用於判斷縮進）
+            generation: 載入代號，與目前不同時表示已被新的載入取代
+            on_done: 全部載入完成後呼叫的函數
+        """
+        if generation != self.load_generation:
+            return
+        
+        # 在換行處切段，避免把一行拆成兩段
+        end = len(text)
+        if end - start > LOAD_CHUNK_CHARS:
+            newline = text.find('\n', start + LOAD_CHUNK_CHARS)
+            if newline != -1:
+                end = newline + 1
+        chunk = text[start:end]
+        self.text_area.insert(tk.END, chunk)
+        
+        # 最後一段以外，最後一個元素是下一段的開頭，不在本段處理
+        lines = chunk.split('\n')
+        finished = end >= len(text)
+        complete_lines = lines if finished else lines[:-1]
+        self._apply_indentation(complete_lines, line_number, previous_line)
+        
+        if not finished:
+            self.status_bar.config(text=f"正在載入文字... {end * 100 // len(text)}%")
+            self.root.after(1, self._load_text_chunk, text, end, line_number + len(complete_lines),
+                            complete_lines[-1], generation, on_done)
+            return
+        
+        self.text_area.edit_modified(False)
+        self.loading_text = False
+        if on_done:
+            on_done()
+    
+    def _apply_indentation(self, lines, first_line_number, previous_line=""):
+        """為一組連續的行設置縮進標籤
+        
+        參數:
+            lines: 行文字列表
+            first_line_number: 第一行的行號（從 1 開始）
+            previous_line: 第一行之前的那一行（沒有則為空字串）
+        """
+        for offset, line in enumerate(lines):
+            # 跳過空行，且前一行不為空時才設置縮進
+            if line.strip() and previous_line.strip():
+                # 獲取當前行與前一行第一個非空白字符的位置
+                first_char_pos = len(line) - len(line.lstrip())
+                prev_first_char_pos = len(previous_line) - len(previous_line.lstrip())
+                
+                # 如果當前行是前一行的換行部分（由自動換行產生）
+                # 這裡需要根據實際情況調整判斷邏輯
+                if first_char_pos == 0 and prev_first_char_pos > 0:
+                    # 相同縮進共用一個標籤，避免每行建立一個標籤
+                    tag_name = f"indent_{prev_first_char_pos}"
+                    self.text_area.tag_configure(tag_name, lmargin1=prev_first_char_pos)
+                    
+                    # 應用標籤到當前行
+                    line_index = first_line_number + offset
+                    self.text_area.tag_add(tag_name, f"{line_index}.0", f"{line_index}.{len(line)}")
+            previous_line = line
+    
     def adjust_indentation(self, event=None):
         """調整文字縮進，使換行後的文字對齊前一行的第一個字"""
         # 重置修改標誌，避免無限循環
         self.text_area.edit_modified(False)
         
+        # 分段載入或逐區塊套用校正結果時由各段自行調整縮進
+        if self.loading_text or self.correcting_text:
+            return
+        
         # 獲取所有文字
         content = self.text_area.get("1.0", tk.END)
         
@@ -1119,30 +1363,7 @@ class TextCorrectionTool:
             return
         
         # 處理每個段落
-        lines = content.split('\n')
-        for i in range(len(lines)):
-            # 跳過空行
-            if not lines[i].strip():
-                continue
-                
-            # 獲取當前行第一個非空白字符的位置
-            first_char_pos = len(lines[i]) - len(lines[i].lstrip())
-            
-            # 如果不是第一行且前一行不為空，設置縮進
-            if i > 0 and lines[i-1].strip():
-                prev_first_char_pos = len(lines[i-1]) - len(lines[i-1].lstrip())
-                
-                # 如果當前行是前一行的換行部分（由自動換行產生）
-                # 這裡需要根據實際情況調整判斷邏輯
-                if first_char_pos == 0 and len(lines[i]) > 0:
-                    # 設置縮進標籤
-                    tag_name = f"indent_{i}"
-                    self.text_area.tag_configure(tag_name, lmargin1=prev_first_char_pos)
-                    
-                    # 應用標籤到當前行
-                    line_start = f"{i+1}.0"
-                    line_end = f"{i+1}.{len(lines[i])}"
-                    self.text_area.tag_add(tag_name, line_start, line_end)
+        self._apply_indentation(content.split('\n'), 1)
 
     def adjust_text_formatting(self, event=None):
         """調整文字格式，包括縮進和對齊"""
@@ -1155,21 +1376,19 @@ class TextCorrectionTool:
         參數:
             file_path: 加密Word檔案的路徑
         """
-        # 處理有密碼保護的檔案
-        password = self.ask_password()
-        if password:
+        # 本次執行已成功開啟過的檔案直接使用快取的金鑰，不再詢問密碼
+        if document_reader.has_cached_key(file_path):
+            password = None
+        else:
+            password = self.ask_password()
+        if password or document_reader.has_cached_key(file_path):
             try:
                 # 使用密碼解密檔案
                 text = self.process_word_file(file_path, password)
-                self.text_area.delete(1.0, tk.END)
-                self.text_area.insert(tk.END, text)
                 self.status_bar.config(text=f"已載入加密檔案: {os.path.basename(file_path)}")
                 
-                # 調整縮進
-                self.adjust_indentation()
-                
-                # 自動校正文字
-                self.correct_text()
+                # 分段載入並調整縮進，完成後自動校正文字
+                self.load_text(text, on_done=self.correct_text)
             except Exception as e:
                 messagebox.showerror("錯誤", f"解密失敗，密碼可能不正確: {str(e)}")
                 self.status_bar.config(text=f"解密失敗: {os.path.basename(file_path)}")
@@ -1257,109 +1476,14 @@ class TextCorrectionTool:
             messagebox.showerror("錯誤", f"無法記錄錯誤: {str(e)}\n原始錯誤: {error_message}")
     
     def view_error_logs(self):
-        """檢視錯誤日誌"""
-        # 創建錯誤日誌視窗
-        log_window = tk.Toplevel(self.root)
-        log_window.title("錯誤日誌檢視")
-        log_window.geometry("800x500")
-        log_window.transient(self.root)  # 設為主視窗的子視窗
-        log_window.grab_set()  # 模態視窗
-        
-        # 創建框架
-        frame = tk.Frame(log_window, padx=10, pady=10)
-        frame.pack(fill=tk.BOTH, expand=True)
-        
-        # 日誌檔案列表
-        tk.Label(frame, text="選擇日誌檔案:").pack(anchor=tk.W, pady=(0, 5))
-        
-        # 獲取日誌檔案列表
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-            
-        log_files = [f for f in os.listdir(log_dir) if f.startswith("error_log_") and f.endswith(".log")]
-        log_files.sort(reverse=True)  # 最新的日誌檔案排在前面
-        
-        if not log_files:
-            tk.Label(frame, text="沒有找到錯誤日誌檔案。").pack(pady=20)
-            tk.Button(frame, text="關閉", command=log_window.destroy).pack(pady=10)
-            return
-            
-        # 日誌檔案下拉選單
-        selected_log = tk.StringVar(value=log_files[0] if log_files else "")
-        log_combo = ttk.Combobox(frame, textvariable=selected_log, values=log_files, width=40, state="readonly")
-        log_combo.pack(anchor=tk.W, pady=(0, 10))
-        
-        # 日誌內容顯示區域
-        tk.Label(frame, text="日誌內容:").pack(anchor=tk.W, pady=(0, 5))
-        
-        # 添加滾動條
-        scrollbar = tk.Scrollbar(frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # 日誌內容文字區域
-        log_text = tk.Text(frame, wrap=tk.WORD, yscrollcommand=scrollbar.set)
-        log_text.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-        scrollbar.config(command=log_text.yview)
-        
-        # 更新日誌內容的函數
-        def update_log_content(*args):
-            log_text.delete(1.0, tk.END)  # 清空文字區域
-            selected_file = selected_log.get()
-            
-            if not selected_file:
-                return
-                
-            try:
-                with open(os.path.join(log_dir, selected_file), "r", encoding="utf-8") as f:
-                    content = f.read()
-                    if content:
-                        log_text.insert(tk.END, content)
-                    else:
-                        log_text.insert(tk.END, "日誌檔案為空。")
-            except Exception as e:
-                log_text.insert(tk.END, f"無法讀取日誌檔案: {str(e)}")
-        
-        # 綁定選擇事件
-        log_combo.bind("<<ComboboxSelected>>", update_log_content)
-        
-        # 按鈕區域
-        button_frame = tk.Frame(frame)
-        button_frame.pack(fill=tk.X, pady=(10, 0))
-        
-        # 刪除日誌按鈕
-        def delete_log():
-            selected_file = selected_log.get()
-            if not selected_file:
-                return
-                
-            if messagebox.askyesno("確認刪除", f"確定要刪除日誌檔案 {selected_file} 嗎？"):
-                try:
-                    os.remove(os.path.join(log_dir, selected_file))
-                    # 更新日誌檔案列表
-                    log_files = [f for f in os.listdir(log_dir) if f.startswith("error_log_") and f.endswith(".log")]
-                    log_files.sort(reverse=True)
-                    log_combo.config(values=log_files)
-                    
-                    if log_files:
-                        selected_log.set(log_files[0])
-                        update_log_content()
-                    else:
-                        selected_log.set("")
-                        log_text.delete(1.0, tk.END)
-                        log_text.insert(tk.END, "沒有找到錯誤日誌檔案。")
-                except Exception as e:
-                    messagebox.showerror("錯誤", f"無法刪除日誌檔案: {str(e)}")
-        
-        tk.Button(button_frame, text="刪除日誌", command=delete_log).pack(side=tk.LEFT, padx=(0, 10))
-        tk.Button(button_frame, text="關閉", command=log_window.destroy).pack(side=tk.RIGHT)
-        
-        # 初始顯示第一個日誌檔案的內容
-        update_log_content()
+        """檢視錯誤日誌（分頁顯示，不會一次載入整個檔案）"""
+        LogViewer(self.root, "logs")
 
 def main():
     """程式主入口點"""
     try:
+        startup_timer = StageTimer("startup")
+        
         # 嘗試使用 TkinterDnD2 創建支援拖放的根視窗
         try:
             from tkinterdnd2 import TkinterDnD, DND_FILES
@@ -1370,8 +1494,9 @@ def main():
             # 退回使用普通的 Tk
             root = tk.Tk()
             print("使用普通 Tk 初始化根視窗")
+        startup_timer.mark("tk_root")
         
-        app = TextCorrectionTool(root)
+        app = TextCorrectionTool(root, startup_timer)
         root.mainloop()
     except Exception as e:
         print(f"程式執行錯誤: {str(e)}")
@@ -0,0 +1,201 @@
+"""
+Module for structured, non-blocking logging of performance metrics as JSON lines.
+"""
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+METRICS_LOGGER_NAME = "metrics"
+METRICS_FILE_NAME = "metrics.jsonl"
+
+# 輪替設定：單一檔案超過大小上限或存在超過時間上限即輪替
+METRICS_MAX_BYTES = 5 * 1024 * 1024
+METRICS_MAX_AGE_SECONDS = 24 * 60 * 60
+METRICS_BACKUP_COUNT = 14
+
+# 已啟動的 QueueListener，程式結束時停止並寫出佇列中剩餘的記錄
+_listeners = []
+
+
+class JsonLineFormatter(logging.Formatter):
+    """將每筆記錄格式化為一行 JSON 物件"""
+
+    def format(self, record):
+        """格式化記錄
+
+        參數:
+            record: logging.LogRecord
+
+        回傳:
+            JSON 字串（不含換行）
+        """
+        event = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "event": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        event.update(getattr(record, "fields", {}))
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def _first_record_time(path):
+    """取得日誌檔第一筆記錄的時間
+
+    參數:
+        path: 日誌檔案路徑
+
+    回傳:
+        epoch 秒數，檔案不存在、為空或第一行無法解析時返回 None
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            first_line = f.readline()
+        return datetime.datetime.fromisoformat(json.loads(first_line)["ts"]).timestamp()
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+class SizeAndAgeRotatingFileHandler(RotatingFileHandler):
+    """依檔案大小或存在時間輪替的檔案處理器"""
+
+    def __init__(self, filename, max_bytes, max_age_seconds, backup_count, encoding="utf-8"):
+        """初始化處理器
+
+        參數:
+            filename: 日誌檔案路徑
+            max_bytes: 單一檔案大小上限（位元組）
+            max_age_seconds: 單一檔案存在時間上限（秒）
+            backup_count: 保留的舊檔案數量
+            encoding: 檔案編碼
+        """
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.max_age_seconds = max_age_seconds
+        # 重新啟動時沿用既有檔案的第一筆記錄時間；st_ctime 在 Linux 上是 inode 變更時間，每次寫入都會更新
+        first_record_time = _first_record_time(self.baseFilename)
+        self.opened_at = time.time() if first_record_time is None else first_record_time
+
+    def shouldRollover(self, record):
+        """判斷是否需要輪替"""
+        if super().shouldRollover(record):
+            return True
+        return time.time() - self.opened_at >= self.max_age_seconds and os.path.exists(self.baseFilename)
+
+    def doRollover(self):
+        """輪替檔案並重設開啟時間"""
+        super().doRollover()
+        self.opened_at = time.time()
+
+
+def start_queue_listener(logger, handler):
+    """讓 logger 經由佇列寫出，實際的檔案 I/O 由背景執行緒處理
+
+    參數:
+        logger: 要設定的 logging.Logger
+        handler: 實際寫出記錄的處理器
+
+    回傳:
+        已啟動的 QueueListener
+    """
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    if not _listeners:
+        atexit.register(stop_listeners)
+    _listeners.append(listener)
+    return listener
+
+
+def stop_listeners():
+    """停止所有 QueueListener，確保佇列中的記錄都已寫出"""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def setup_metrics_logging(log_dir="logs"):
+    """設定結構化效能記錄（logs/metrics.jsonl）
+
+    參數:
+        log_dir: 日誌目錄
+
+    回傳:
+        metrics logger
+    """
+    logger = logging.getLogger(METRICS_LOGGER_NAME)
+    if logger.handlers:
+        return logger
+
+    os.makedirs(log_dir, exist_ok=True)
+    handler = SizeAndAgeRotatingFileHandler(
+        os.path.join(log_dir, METRICS_FILE_NAME),
+        METRICS_MAX_BYTES,
+        METRICS_MAX_AGE_SECONDS,
+        METRICS_BACKUP_COUNT,
+    )
+    handler.setFormatter(JsonLineFormatter())
+
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # 效能記錄不寫入錯誤日誌
+    start_queue_listener(logger, handler)
+    return logger
+
+
+def peak_memory_bytes():
+    """取得程序的記憶體使用高峰
+
+    回傳:
+        位元組數，無法取得時返回 None
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以位元組為單位，Linux 以 KB 為單位
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+
+    try:
+        # Windows：透過 GetProcessMemoryInfo 取得 PeakWorkingSetSize
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except Exception:
+        pass
+    return None
+
+
+def log_event(event, **fields):
+    """寫出一筆結構化效能記錄
+
+    參數:
+        event: 事件名稱（例如 "document"）
+        **fields: 事件欄位（文件大小、階段耗時、快取命中等）
+    """
+    logging.getLogger(METRICS_LOGGER_NAME).info(event, extra={"fields": fields})
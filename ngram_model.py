@@ -0,0 +1,286 @@
+"""
+Context-aware correction of confusable characters with a compact character n-gram model.
+
+The model file is a flat, memory-mappable array of sorted 64-bit n-gram hashes
+followed by one quantized log-probability byte per hash. A model is trained
+offline from a folder of documents:
+
+    python ngram_model.py 語料資料夾 --output ngram_model.bin
+"""
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from bisect import bisect_left
+from collections import Counter
+
+MODEL_FILE = "ngram_model.bin"
+CONFUSION_FILE = "confusion_sets.json"
+
+# 常見的同音或形近誤用字組；可在 confusion_sets.json 中以相同格式自訂
+DEFAULT_CONFUSION_SETS = [
+    ["在", "再"],
+    ["的", "得", "地"],
+    ["做", "作"],
+    ["那", "哪"],
+    ["已", "以"],
+    ["即", "既"],
+    ["象", "像"],
+    ["須", "需"],
+    ["坐", "座"],
+    ["帳", "賬"],
+]
+
+_MAGIC = b"NGRM"
+_VERSION = 1
+# 檔頭：識別碼、版本、階數、n-gram 數量、量化比例
+_HEADER = struct.Struct("<4sHHQf")
+
+DEFAULT_ORDER = 3
+# -log10 機率的量化比例（每單位 1/32），最大可表示約 -7.97
+QUANT_SCALE = 32.0
+# 未出現的單字元使用的 log10 機率
+UNSEEN_LOG_PROB = -8.0
+# stupid backoff 每退一階的 log10 懲罰（約為乘以 0.4）
+BACKOFF_PENALTY = math.log10(0.4)
+# 候選字的分數需比原字高出此值（log10）才替換，避免過度修改
+DEFAULT_MARGIN = 1.0
+# 快取的 n-gram 分數數量上限，超過時清空
+SCORE_CACHE_SIZE = 200000
+
+
+def ngram_key(ngram):
+    """以 64 位元雜湊表示 n-gram（跨程序穩定，與 Python 內建 hash 不同）"""
+    return int.from_bytes(hashlib.blake2b(ngram.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def train_model(texts, output_path, order=DEFAULT_ORDER, min_count=2):
+    """由文字語料訓練字元 n-gram 模型並寫成可記憶體映射的檔案
+
+    參數:
+        texts: 文字的迭代器
+        output_path: 模型輸出路徑
+        order: 最高階數
+        min_count: 二階以上的 n-gram 至少出現的次數
+
+    回傳:
+        寫入的 n-gram 數量
+    """
+    counts = [Counter() for _ in range(order + 1)]
+    for text in texts:
+        # 以非文字字元分段，n-gram 不跨越段落與標點
+        for segment in re.split(r"[\s\W]+", text):
+            for n in range(1, order + 1):
+                counter = counts[n]
+                for i in range(len(segment) - n + 1):
+                    counter[segment[i:i + n]] += 1
+
+    total = sum(counts[1].values())
+    table = {}
+    for n in range(1, order + 1):
+        for ngram, count in counts[n].items():
+            if n > 1 and count < min_count:
+                continue
+            history = counts[n - 1][ngram[:-1]] if n > 1 else total
+            log_prob = math.log10(count / history)
+            quantized = min(255, int(round(-log_prob * QUANT_SCALE)))
+            key = ngram_key(ngram)
+            # 雜湊碰撞時保留較高的機率
+            if key not in table or quantized < table[key]:
+                table[key] = quantized
+
+    keys = sorted(table)
+    with open(output_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, order, len(keys), QUANT_SCALE))
+        f.write(struct.pack(f"<{len(keys)}Q", *keys))
+        f.write(bytes(table[key] for key in keys))
+    return len(keys)
+
+
+class NgramModel:
+    """以記憶體映射讀取的 n-gram 模型，不需要將整個模型載入記憶體"""
+
+    def __init__(self, path):
+        """開啟模型檔案
+
+        參數:
+            path: 模型路徑
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.order, self.count, self.scale = _HEADER.unpack_from(self.map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.map.close()
+            raise ValueError("不是有效的 n-gram 模型檔案")
+        keys_start = _HEADER.size
+        values_start = keys_start + self.count * 8
+        self.keys = memoryview(self.map)[keys_start:values_start].cast("Q")
+        self.values = memoryview(self.map)[values_start:values_start + self.count]
+        self._scores = {}  # n-gram → 分數，文件中重複的前後文不必重新查詢
+
+    def log_prob(self, ngram):
+        """查詢 n-gram 的 log10 條件機率，未收錄時返回 None"""
+        key = ngram_key(ngram)
+        index = bisect_left(self.keys, key)
+        if index < self.count and self.keys[index] == key:
+            return -self.values[index] / self.scale
+        return None
+
+    def score(self, ngram):
+        """以 stupid backoff 計算最後一個字在前文之後出現的 log10 分數（使用快取）"""
+        cached = self._scores.get(ngram)
+        if cached is None:
+            if len(self._scores) >= SCORE_CACHE_SIZE:
+                self._scores.clear()
+            cached = self._scores[ngram] = self._backoff_score(ngram)
+        return cached
+
+    def _backoff_score(self, ngram):
+        """以 stupid backoff 計算分數"""
+        penalty = 0.0
+        while len(ngram) > 1:
+            log_prob = self.log_prob(ngram)
+            if log_prob is not None:
+                return penalty + log_prob
+            ngram = ngram[1:]
+            penalty += BACKOFF_PENALTY
+        log_prob = self.log_prob(ngram)
+        return penalty + (UNSEEN_LOG_PROB if log_prob is None else log_prob)
+
+    def close(self):
+        """釋放記憶體映射"""
+        self.keys.release()
+        self.values.release()
+        self.map.close()
+
+
+def load_confusion_sets(path=CONFUSION_FILE):
+    """讀取易混淆字組，檔案不存在時使用內建的字組
+
+    參數:
+        path: confusion_sets.json 路徑，格式為 [["在", "再"], ...]
+
+    回傳:
+        字組列表
+    """
+    if not os.path.exists(path):
+        return DEFAULT_CONFUSION_SETS
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [[char for char in group if isinstance(char, str) and len(char) == 1]
+            for group in data if isinstance(group, list)]
+
+
+class ContextCorrector:
+    """在轉換之後，依前後文從易混淆字組中挑選最可能的字"""
+
+    def __init__(self, model, confusion_sets=None, margin=DEFAULT_MARGIN):
+        """初始化
+
+        參數:
+            model: NgramModel
+            confusion_sets: 易混淆字組列表
+            margin: 候選字需高出原字的 log10 分數
+        """
+        self.model = model
+        self.margin = margin
+        self.candidates = {}
+        for group in confusion_sets or DEFAULT_CONFUSION_SETS:
+            for char in group:
+                self.candidates[char] = [other for other in group if other != char]
+        self.pattern = re.compile(
+            "[" + "".join(re.escape(char) for char in sorted(self.candidates)) + "]") if self.candidates else None
+
+    def _local_score(self, text, position, char):
+        """計算把指定位置換成 char 後，包含該位置的所有 n-gram 分數總和"""
+        order = self.model.order
+        start = max(0, position - order + 1)
+        end = min(len(text), position + order)
+        window = text[start:position] + char + text[position + 1:end]
+        center = position - start
+        total = 0.0
+        for last in range(center, len(window)):
+            total += self.model.score(window[max(0, last - order + 1):last + 1])
+        return total
+
+    def rescore(self, text, spans=()):
+        """只在易混淆字的位置評分並替換
+
+        對整行轉換後的文字評分，保護詞彙與錯字替換的範圍不修改，但仍作為相鄰字的前後文。
+
+        參數:
+            text: 已轉換的文字
+            spans: 不修改的 (起始位置, 結束位置) 範圍，依位置排序
+
+        回傳:
+            校正後的文字
+        """
+        if self.pattern is None or not text:
+            return text
+        chars = None
+        skipped = iter(spans)
+        span = next(skipped, None)
+        for match in self.pattern.finditer(text):
+            position = match.start()
+            while span is not None and span[1] <= position:
+                span = next(skipped, None)
+            if span is not None and span[0] <= position:
+                continue
+            original = match.group()
+            best_char = original
+            best_score = self._local_score(text, position, original) + self.margin
+            for candidate in self.candidates[original]:
+                score = self._local_score(text, position, candidate)
+                if score > best_score:
+                    best_char, best_score = candidate, score
+            if best_char != original:
+                if chars is None:
+                    chars = list(text)
+                chars[position] = best_char
+        return text if chars is None else "".join(chars)
+
+
+def iter_corpus_texts(folder):
+    """讀取資料夾中所有 .docx、.doc 與 .txt 的文字"""
+    import document_reader
+
+    for directory, _, files in os.walk(folder):
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            lower = name.lower()
+            try:
+                if lower.endswith(".txt"):
+                    with open(path, "r", encoding="utf-8") as f:
+                        yield f.read()
+                elif lower.endswith((".docx", ".doc")) and not name.startswith("~$"):
+                    yield document_reader.read_text(path)
+                else:
+                    continue
+                print(f"已讀取: {path}")
+            except Exception as e:
+                print(f"略過無法讀取的檔案 {path}: {str(e)}")
+
+
+def main(argv=None):
+    """訓練 n-gram 模型的主入口點"""
+    parser = argparse.ArgumentParser(description="由文件資料夾訓練上下文校正用的 n-gram 模型")
+    parser.add_argument("folder", help="語料資料夾（.docx、.doc、.txt）")
+    parser.add_argument("--output", default=MODEL_FILE, help="模型輸出路徑")
+    parser.add_argument("--order", type=int, default=DEFAULT_ORDER, help="最高階數")
+    parser.add_argument("--min-count", type=int, default=2, help="二階以上 n-gram 的最少出現次數")
+    args = parser.parse_args(argv)
+
+    count = train_model(iter_corpus_texts(args.folder), args.output, args.order, args.min_count)
+    size = os.path.getsize(args.output)
+    print(f"模型已寫入 {args.output}：{count} 個 n-gram，{size / 1024 / 1024:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
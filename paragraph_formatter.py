@@ -1,6 +1,120 @@
 """
 Module for handling paragraph formatting based on predefined hierarchical levels.
 """
+import re
+from typing import NamedTuple
+
+# 所有層級標記共用的單一編譯樣式，以具名群組區分層級（l0 ~ l4）
+# 數字後必須接分隔符號（、．. 或空白）或行尾，避免「一般」「十分」等被誤判
+_NUMERAL_0 = "[壹貳參肆伍陸柒捌玖拾佰仟萬億零]+"
+_NUMERAL_1 = "[一二三四五六七八九十百千萬億零〇]+"
+_MARKER_PATTERN = re.compile(
+    r"[ \t\u3000]*(?:"
+    r"(?P<l0>" + _NUMERAL_0 + r"(?:[、．.](?!\d)|(?=[ \t\u3000]|$)))"
+    r"|(?P<l1>" + _NUMERAL_1 + r"(?:[、．.](?!\d)|(?=[ \t\u3000]|$)))"
+    r"|(?P<l2>[(（]" + _NUMERAL_1 + r"[)）])"
+    r"|(?P<l3>\d+[.．](?!\d))"
+    r"|(?P<l4>[(（]\d+[)）])"
+    r")[ \t\u3000]*"
+)
+_GROUP_LEVELS = {"l0": 0, "l1": 1, "l2": 2, "l3": 3, "l4": 4}
+
+# 中文數字的字元與位數單位（一般寫法與大寫寫法）
+_DIGITS = {
+    False: "零一二三四五六七八九",
+    True: "零壹貳參肆伍陸柒捌玖",
+}
+_SMALL_UNITS = {
+    False: ("", "十", "百", "千"),
+    True: ("", "拾", "佰", "仟"),
+}
+_LARGE_UNITS = ("", "萬", "億", "兆")
+
+# 預先計算的數字表，涵蓋一般文件的編號範圍；超出範圍時才即時計算
+_NUMERAL_TABLE_SIZE = 1000
+
+
+def _section_numeral(n, financial):
+    """Convert 0 < n < 10000 to Chinese numerals without the leading 一 rule"""
+    digits = _DIGITS[financial]
+    units = _SMALL_UNITS[financial]
+    parts = []
+    pending_zero = False
+    for position in range(3, -1, -1):
+        digit = n // (10 ** position) % 10
+        if digit == 0:
+            if parts:
+                pending_zero = True
+            continue
+        if pending_zero:
+            parts.append(digits[0])
+            pending_zero = False
+        parts.append(digits[digit] + units[position])
+    return "".join(parts)
+
+
+def _build_numeral(n, financial):
+    """Convert a positive integer to Chinese numerals (十一, 二十三, 拾壹, ...)"""
+    sections = []
+    while n:
+        sections.append(n % 10000)
+        n //= 10000
+    parts = []
+    zero = _DIGITS[financial][0]
+    for index in range(len(sections) - 1, -1, -1):
+        section = sections[index]
+        if section == 0:
+            continue
+        # 前一節有值且本節不足千位時需補「零」，例如 一萬零五
+        if parts and (section < 1000 or sections[index + 1] == 0) and parts[-1] != zero:
+            parts.append(zero)
+        parts.append(_section_numeral(section, financial) + _LARGE_UNITS[index])
+    text = "".join(parts)
+    # 最高一節為十至十九時省略開頭的「一」：十一、拾壹、十萬
+    if 10 <= sections[-1] < 20:
+        text = text[1:]
+    return text
+
+
+_NUMERAL_TABLES = {
+    financial: [""] + [_build_numeral(n, financial) for n in range(1, _NUMERAL_TABLE_SIZE)]
+    for financial in (False, True)
+}
+
+
+def to_chinese_numeral(n, financial=False):
+    """
+    Convert a positive integer to its Chinese numeral representation
+    
+    Args:
+        n (int): The number to convert (must be at least 1)
+        financial (bool): Use the financial form (壹, 貳, 拾, ...) instead of 一, 二, 十, ...
+        
+    Returns:
+        str: The Chinese numeral, e.g. 十一, 二十三, 一百零一 or 拾壹
+    """
+    if n < 1:
+        raise ValueError("Number must be at least 1")
+    if n < _NUMERAL_TABLE_SIZE:
+        return _NUMERAL_TABLES[financial][n]
+    return _build_numeral(n, financial)
+
+
+class LevelMatch(NamedTuple):
+    """
+    Result of level detection for a single line
+
+    Attributes:
+        level (int): The detected level (0-4) or -1 if no marker is present
+        marker_start (int): Offset of the first marker character in the line
+        marker_end (int): Offset just past the marker (including its delimiter)
+        content_start (int): Offset of the first content character after the marker
+    """
+    level: int
+    marker_start: int
+    marker_end: int
+    content_start: int
+
 
 class ParagraphFormatter:
     """
@@ -59,21 +173,34 @@ class ParagraphFormatter:
             self.level_counters[level] = 1
         
         # Format based on level
+        return self._format_marker(level, idx + 1)
+    
+    def _format_marker(self, level, number):
+        """
+        Format the marker for the given level and 1-based number
+        
+        Args:
+            level (int): The level of the marker (0-4)
+            number (int): The 1-based item number
+            
+        Returns:
+            str: The formatted marker
+        """
         if level == 0:
-            # Level 0: 壹, 貳, 參, 肆, ...
-            return self.level_0_chars[idx % len(self.level_0_chars)]
+            # Level 0: 壹, 貳, 參, 肆, ..., 拾壹, ...
+            return to_chinese_numeral(number, financial=True)
         elif level == 1:
-            # Level 1: 一, 二, 三, 四, 五, ...
-            return self.level_1_chars[idx % len(self.level_1_chars)]
+            # Level 1: 一, 二, 三, 四, 五, ..., 十一, ...
+            return to_chinese_numeral(number)
         elif level == 2:
             # Level 2: (一), (二), (三), (四), (五), ...
-            return self.level_2_format.format(self.level_1_chars[idx % len(self.level_1_chars)])
+            return self.level_2_format.format(to_chinese_numeral(number))
         elif level == 3:
             # Level 3: 1., 2., 3., 4., 5., ...
-            return self.level_3_format.format(idx + 1)
+            return self.level_3_format.format(number)
         else:  # level == 4
             # Level 4: (1), (2), (3), (4), (5), ...
-            return self.level_4_format.format(idx + 1)
+            return self.level_4_format.format(number)
     
     def get_current_marker(self, level):
         """
@@ -116,6 +243,32 @@ class ParagraphFormatter:
             return ""
         return self.level_indents[level]
     
+    def detect_levels(self, lines):
+        """
+        Detect the levels of a whole document in a single linear pass
+        
+        Args:
+            lines (iterable of str): The lines to analyze
+            
+        Returns:
+            list of LevelMatch: One entry per line with its level, the marker span
+            and the offset at which the content starts. Lines without a marker get
+            level -1, an empty marker span and the offset of their first non-blank
+            character.
+        """
+        match = _MARKER_PATTERN.match
+        results = []
+        append = results.append
+        for line in lines:
+            m = match(line)
+            if m is None:
+                content_start = len(line) - len(line.lstrip())
+                append(LevelMatch(-1, content_start, content_start, content_start))
+            else:
+                group = m.lastgroup
+                append(LevelMatch(_GROUP_LEVELS[group], m.start(group), m.end(group), m.end()))
+        return results
+    
     def detect_level(self, line):
         """
         Attempt to detect the level of a line based on its format
@@ -127,52 +280,49 @@ class ParagraphFormatter:
             int: The detected level (0-4) or -1 if no level format is detected
             str: The content after the marker, or the original line if no marker is detected
         """
-        line = line.strip()
-        content = line
-        level = -1
-        
-        # Check for level 0: 壹, 貳, 參, 肆, ...
-        if any(line.startswith(char) for char in self.level_0_chars):
-            level = 0
-            # Find the first space after the marker
-            space_idx = line.find(' ')
-            if space_idx > 0:
-                content = line[space_idx+1:]
-            
-        # Check for level 1: 一, 二, 三, 四, 五, ...
-        elif any(line.startswith(char) for char in self.level_1_chars):
-            level = 1
-            # Find the first space after the marker
-            space_idx = line.find(' ')
-            if space_idx > 0:
-                content = line[space_idx+1:]
-            
-        # Check for level 2: (一), (二), (三), (四), (五), ...
-        elif any(line.startswith(f"({char})") for char in self.level_1_chars):
-            level = 2
-            # Find the first space after the marker
-            space_idx = line.find(' ')
-            if space_idx > 0:
-                content = line[space_idx+1:]
-            
-        # Check for level 3: 1., 2., 3., 4., 5., ...
-        elif line and line[0].isdigit() and line.find('.') > 0:
-            level = 3
-            # Find the first space after the marker
-            space_idx = line.find(' ')
-            if space_idx > 0:
-                content = line[space_idx+1:]
+        result = self.detect_levels((line,))[0]
+        return result.level, line[result.content_start:].strip()
+    
+    def renumber(self, document_lines, resume=False):
+        """
+        Recompute the markers of every numbered line in a document in one pass
+        
+        Each level keeps its own counter; a marker at a given level resets the
+        counters of all deeper levels. The original brackets and delimiters
+        (e.g. 、 or full-width parentheses) and all other text are kept as-is.
+        
+        Args:
+            document_lines (iterable of str): The lines of the document
+            resume (bool): Continue from the current counters instead of starting
+                at zero, so a document can be renumbered in consecutive chunks
             
-        # Check for level 4: (1), (2), (3), (4), (5), ...
-        elif line and line.startswith('(') and line.find(')') > 0:
-            try:
-                int(line[1:line.find(')')])
-                level = 4
-                # Find the first space after the marker
-                space_idx = line.find(' ')
-                if space_idx > 0:
-                    content = line[space_idx+1:]
-            except ValueError:
-                pass
-                
-        return level, content
+        Returns:
+            list of str: The lines with renumbered markers
+        """
+        lines = list(document_lines)
+        counters = list(self.level_counters) if resume else [0, 0, 0, 0, 0]
+        result = []
+        append = result.append
+        for line, (level, marker_start, marker_end, _) in zip(lines, self.detect_levels(lines)):
+            if level < 0:
+                append(line)
+                continue
+            counters[level] += 1
+            for i in range(level + 1, 5):
+                counters[i] = 0
+            marker = line[marker_start:marker_end]
+            number = counters[level]
+            if level <= 1:
+                delimiter = marker[len(marker.rstrip("、．.")):]
+                marker = to_chinese_numeral(number, financial=(level == 0)) + delimiter
+            elif level == 2:
+                marker = marker[0] + to_chinese_numeral(number) + marker[-1]
+            elif level == 3:
+                marker = str(number) + marker[-1]
+            else:
+                marker = marker[0] + str(number) + marker[-1]
+            append(line[:marker_start] + marker + line[marker_end:])
+        
+        # 同步逐行編號用的計數器，讓後續的 get_next_marker 接續編號
+        self.level_counters = counters
+        return result
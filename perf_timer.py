@@ -0,0 +1,92 @@
+"""
+Module for lightweight timing of processing stages and on-demand profiling.
+"""
+import cProfile
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """記錄各處理階段耗時的計時器"""
+
+    def __init__(self, name):
+        """初始化計時器
+
+        參數:
+            name: 計時器名稱（例如 "startup" 或檔案名稱）
+        """
+        self.name = name
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.stages = {}  # 階段名稱 → 累計毫秒（同名階段會累加）
+
+    def add(self, stage, elapsed_ms):
+        """累加階段耗時"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+
+    def mark(self, stage):
+        """記錄自上一個標記以來的耗時
+
+        參數:
+            stage: 階段名稱
+
+        回傳:
+            該階段耗時（毫秒）
+        """
+        now = time.perf_counter()
+        elapsed_ms = (now - self.last) * 1000
+        self.add(stage, elapsed_ms)
+        self.last = now
+        return elapsed_ms
+
+    @contextmanager
+    def stage(self, stage):
+        """以 with 區塊記錄一個階段的耗時
+
+        參數:
+            stage: 階段名稱
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.add(stage, (now - start) * 1000)
+            self.last = now
+
+    @property
+    def total_ms(self):
+        """所有階段耗時的總和（毫秒）"""
+        return sum(self.stages.values())
+
+    def rounded_stages(self):
+        """回傳各階段耗時（毫秒，取到小數第一位），用於結構化記錄"""
+        return {stage: round(ms, 1) for stage, ms in self.stages.items()}
+
+    def summary(self):
+        """產生各階段耗時的摘要字串
+
+        回傳:
+            例如 "startup 412ms (widgets 120ms, theme 3ms)"
+        """
+        parts = ", ".join(f"{stage} {ms:.0f}ms" for stage, ms in self.stages.items())
+        return f"{self.name} {self.total_ms:.0f}ms ({parts})"
+
+
+def profile_call(output_path, func, *args, **kwargs):
+    """在 cProfile 下執行函數，並將結果存為 .prof 檔案
+
+    參數:
+        output_path: .prof 檔案的輸出路徑
+        func: 要執行的函數
+        *args, **kwargs: 傳給函數的參數
+
+    回傳:
+        函數的回傳值
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(output_path)
+        print(f"效能分析結果已儲存至 {output_path}")
@@ -0,0 +1,593 @@
+"""
+GUI-independent document processing pipeline.
+
+A document goes through decrypt → extract → normalize → protect → convert →
+format → emit. Text flows between stages as paragraph chunks, and adjacent
+stateless stages are fused into a single pass per chunk. Every stage records
+its own time in a StageTimer:
+
+    python pipeline.py 文件.docx 資料夾 --output 輸出資料夾
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from typing import NamedTuple
+
+import document_reader
+from batch_manifest import DEFAULT_MAX_ATTEMPTS, run_batch, settings_fingerprint
+from correction_engine import get_engine, load_typo_dictionary, typo_dictionary_path
+from file_format import sniff_format, FORMAT_DOCX
+from paragraph_formatter import ParagraphFormatter
+from perf_timer import StageTimer
+from protected_word_store import ProtectedWordStore
+from text_normalizer import NORMALIZATION_RULES, TextNormalizer
+
+# 長文字依段落切成約此大小的區塊在各階段之間傳遞
+CHUNK_CHARS = 64 * 1024
+
+# 批次處理支援的檔案類型
+SUPPORTED_EXTENSIONS = (".docx", ".doc", ".txt")
+
+
+def split_paragraph_chunks(text, chunk_chars=CHUNK_CHARS):
+    """在換行處將文字切成區塊，保護詞彙與詞組不會被切開
+
+    參數:
+        text: 要切分的文字
+        chunk_chars: 每個區塊的約略字元數
+
+    回傳:
+        文字區塊列表，依序串接即為原文
+    """
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_chars
+        if end < len(text):
+            newline = text.find("\n", end)
+            end = len(text) if newline == -1 else newline + 1
+        chunks.append(text[start:end])
+        start = end
+    return chunks
+
+
+class SegmentStage:
+    """只處理保護詞彙與錯字以外片段的階段（例如正規化與轉換），func(文字) → 文字"""
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+
+class NormalizeStage:
+    """在保護階段之前、只處理保護詞彙與錯字以外片段的階段，func(片段, 前一個字元, 後一個字元) → 片段
+
+    前後字元是相鄰的保護詞彙或替換後的文字（不會被修改），讓依前後文判斷的規則
+    （例如行尾空白與中文字旁的標點）在保護詞彙旁與沒有保護時結果相同。
+    """
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+
+class ProtectStage:
+    """以保護詞彙與錯字字典分段，比對到的範圍保持原樣或替換，其餘片段交給相鄰的片段階段"""
+
+    def __init__(self, protected_words=(), typo_fixes=None, name="protect"):
+        self.name = name
+        self.engine = get_engine(protected_words, typo_fixes)
+
+
+class MaskedStage:
+    """在保護階段之後處理整段文字、但不修改保護詞彙與錯字替換範圍的階段（例如上下文校正）
+
+    func(文字, 範圍列表) → 文字，範圍列表為 (起始位置, 結束位置)；不可改變文字長度。
+    保護詞彙仍作為相鄰文字的前後文，不會因為在保護詞彙處分段而失去前後文。
+    """
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+
+class ParagraphStage:
+    """不保存狀態、逐區塊處理整段文字的階段，func(文字) → 文字"""
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+
+class StreamStage:
+    """需要跨區塊保存狀態的階段（例如重新編號），func(區塊迭代器) → 區塊迭代器
+
+    每次執行都會重新呼叫 func，狀態不會帶到下一份文件。
+    """
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+
+def renumber_stream(chunks):
+    """依文件順序重新計算各層級的編號，編號跨區塊延續"""
+    formatter = ParagraphFormatter()
+    for chunk in chunks:
+        yield "\n".join(formatter.renumber(chunk.split("\n"), resume=True))
+
+
+def _chain(funcs):
+    """將多個 文字 → 文字 的函數串成一個"""
+    if not funcs:
+        return lambda text: text
+    if len(funcs) == 1:
+        return funcs[0]
+
+    def run(text):
+        for func in funcs:
+            text = func(text)
+        return text
+    return run
+
+
+def _chain_normalize(funcs):
+    """將多個 (片段, 前一個字元, 後一個字元) → 片段 的函數串成一個"""
+    def run(text, before, after):
+        for func in funcs:
+            text = func(text, before, after)
+        return text
+    return run
+
+
+def _timed(name, func, timer):
+    """記錄函數耗時的包裝"""
+    add = timer.add
+    perf_counter = time.perf_counter
+
+    def run(*args):
+        start = perf_counter()
+        result = func(*args)
+        add(name, (perf_counter() - start) * 1000)
+        return result
+    return run
+
+
+def _timed_exclusive(name, func, timer):
+    """記錄函數耗時，但扣除其中其他階段已記錄的時間"""
+    def run(*args):
+        base = timer.total_ms
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        timer.add(name, elapsed - (timer.total_ms - base))
+        return result
+    return run
+
+
+def _timed_stream(stage, chunks, timer):
+    """執行串流階段，只記錄該階段本身的耗時（前面階段的時間由各自記錄）"""
+    output = iter(stage.func(chunks))
+    next_chunk = _timed_exclusive(stage.name, next, timer)
+    while True:
+        try:
+            yield next_chunk(output)
+        except StopIteration:
+            return
+
+
+class DocumentResult(NamedTuple):
+    """
+    處理一份文件的結果
+
+    Attributes:
+        outputs (list of str): 寫出的檔案路徑
+        stages (dict): 各階段耗時（毫秒）
+    """
+    outputs: list
+    stages: dict
+
+
+class Pipeline:
+    """由可替換的階段組成、不依賴視窗的處理流程
+
+    相鄰的正規化、片段階段與保護階段融合為一次掃描（保護詞彙以外的片段依序經過各正規化與
+    片段階段，正規化另外取得相鄰的保護詞彙作為前後文），之後的遮蔽階段再處理整段轉換後的
+    文字並略過保護範圍。
+    相鄰的段落階段再串成一個逐區塊函數，因此區塊在各階段之間不會另外產生完整的中間字串。
+    串流階段之間與之後仍以迭代器逐區塊傳遞。
+    """
+
+    def __init__(self, stages, fingerprint=None):
+        """建立處理流程
+
+        參數:
+            stages: 依序執行的階段列表（建立後不可變更）
+            fingerprint: 會影響結果的設定指紋，批次續跑時用來判斷是否需要重新處理
+        """
+        self.stages = tuple(stages)
+        self.fingerprint = fingerprint
+        self._has_stream = any(isinstance(stage, StreamStage) for stage in self.stages)
+        self._untimed_function = None  # 不記錄耗時的逐區塊函數，首次使用時建立
+
+    def _fuse(self, group, timer):
+        """將相鄰的正規化、片段、保護與段落階段融合為一個逐區塊函數"""
+        steps = []
+        normalizers = []
+        segments = []
+        masked = []
+        protect = None
+
+        def flush():
+            nonlocal normalizers, segments, masked, protect
+            if protect is None and not segments and not normalizers and not masked:
+                return
+            funcs = [_timed(stage.name, stage.func, timer) if timer is not None else stage.func for stage in segments]
+            convert = _chain(funcs)
+            normalize = None
+            if normalizers:
+                funcs = [_timed(stage.name, stage.func, timer) if timer is not None else stage.func
+                         for stage in normalizers]
+                normalize = funcs[0] if len(funcs) == 1 else _chain_normalize(funcs)
+            masked_funcs = [_timed(stage.name, stage.func, timer) if timer is not None else stage.func
+                            for stage in masked]
+            if protect is None and normalize is None and not masked_funcs:
+                steps.append(convert)
+            elif protect is None:
+                def step(text, convert=convert, normalize=normalize, masked_funcs=masked_funcs):
+                    if normalize is not None:
+                        text = normalize(text, "", "")
+                    text = convert(text)
+                    for func in masked_funcs:
+                        text = func(text, ())
+                    return text
+                steps.append(step)
+            elif masked_funcs:
+                correct = protect.engine.correct
+
+                def step(text, correct=correct, convert=convert, normalize=normalize, masked_funcs=masked_funcs):
+                    # 轉換後的整段文字交給遮蔽階段，保護詞彙與替換文字的範圍由掃描時記錄
+                    spans = []
+                    text = correct(text, convert, normalize, spans)
+                    for func in masked_funcs:
+                        text = func(text, spans)
+                    return text
+                steps.append(_timed_exclusive(protect.name, step, timer) if timer is not None else step)
+            else:
+                correct = protect.engine.correct
+                step = lambda text, correct=correct, convert=convert, normalize=normalize: correct(
+                    text, convert, normalize)
+                steps.append(_timed_exclusive(protect.name, step, timer) if timer is not None else step)
+            normalizers, segments, masked, protect = [], [], [], None
+
+        for stage in group:
+            if isinstance(stage, NormalizeStage):
+                # 正規化必須在保護階段之前，已有保護或片段階段時另外融合
+                if protect is not None or segments or masked:
+                    flush()
+                normalizers.append(stage)
+            elif isinstance(stage, SegmentStage):
+                if masked:
+                    flush()
+                segments.append(stage)
+            elif isinstance(stage, MaskedStage):
+                masked.append(stage)
+            elif isinstance(stage, ProtectStage):
+                if protect is not None or masked:
+                    flush()
+                protect = stage
+            else:
+                flush()
+                steps.append(_timed(stage.name, stage.func, timer) if timer is not None else stage.func)
+        flush()
+        return _chain(steps)
+
+    def _units(self, timer):
+        """將階段分成融合後的逐區塊函數與串流階段"""
+        units = []
+        group = []
+        for stage in self.stages:
+            if isinstance(stage, StreamStage):
+                if group:
+                    units.append(self._fuse(group, timer))
+                    group = []
+                units.append(stage)
+            else:
+                group.append(stage)
+        if group:
+            units.append(self._fuse(group, timer))
+        return units
+
+    def plan(self):
+        """描述融合後的執行方式，例如 ["normalize+protect+convert", "format"]"""
+        plan = []
+        names = []
+        for stage in self.stages:
+            if isinstance(stage, StreamStage):
+                if names:
+                    plan.append("+".join(names))
+                    names = []
+                plan.append(stage.name)
+            else:
+                names.append(stage.name)
+        if names:
+            plan.append("+".join(names))
+        return plan
+
+    def paragraph_function(self, timer=None):
+        """取得不含串流階段的逐區塊函數（例如給 docx_writer 逐段校正使用）
+
+        參數:
+            timer: 記錄各階段耗時的 StageTimer（可選）
+
+        回傳:
+            文字 → 文字的函數
+        """
+        if timer is None:
+            if self._untimed_function is None:
+                self._untimed_function = self._fuse(
+                    [stage for stage in self.stages if not isinstance(stage, StreamStage)], None)
+            return self._untimed_function
+        return self._fuse([stage for stage in self.stages if not isinstance(stage, StreamStage)], timer)
+
+    def process(self, chunks, timer=None):
+        """逐區塊執行所有階段
+
+        參數:
+            chunks: 文字區塊的迭代器
+            timer: 記錄各階段耗時的 StageTimer（可選）
+
+        回傳:
+            處理後文字區塊的迭代器
+        """
+        iterator = iter(chunks)
+        for unit in self._units(timer):
+            if isinstance(unit, StreamStage):
+                iterator = _timed_stream(unit, iterator, timer) if timer is not None else iter(unit.func(iterator))
+            else:
+                iterator = map(unit, iterator)
+        return iterator
+
+    def correct(self, text, timer=None):
+        """處理一段文字
+
+        參數:
+            text: 要處理的文字
+            timer: 記錄各階段耗時的 StageTimer（可選）
+
+        回傳:
+            處理後的文字
+        """
+        if not self._has_stream:
+            return self.paragraph_function(timer)(text)
+        return "".join(self.process([text], timer))
+
+    def process_document(self, file_path, output_dir, password=None, timer=None, write_images=True,
+                         relative_path=None):
+        """讀取、校正並輸出一份文件
+
+        輸出檔名保留原本的副檔名，避免同名的 .doc、.docx 與 .txt 互相覆寫：report.docx
+        輸出 report.docx.txt；.docx 另外輸出保留格式的 report.docx.docx（只套用非串流階段），
+        圖片存放在 report.docx_images/（每次重新建立，不會留下上次多出的圖片）。
+
+        參數:
+            file_path: 文件路徑（.docx、.doc 或 UTF-8 的 .txt）
+            output_dir: 輸出資料夾
+            password: 加密文件的密碼（有快取金鑰時可省略）
+            timer: 記錄各階段耗時的 StageTimer（可選）
+            write_images: 是否輸出文件中的圖片
+            relative_path: 輸出在 output_dir 中的相對路徑（含原副檔名），預設為檔名；
+                處理資料夾時傳入文件在資料夾中的相對路徑，子資料夾中的同名文件才不會互相覆寫
+
+        回傳:
+            DocumentResult
+        """
+        name = os.path.basename(file_path)
+        timer = timer or StageTimer(name)
+        base = os.path.join(output_dir, relative_path or name)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        outputs = []
+
+        source_path = file_path
+        temp_path = None
+        images = []
+        try:
+            if file_path.lower().endswith(".txt"):
+                with timer.stage("extract"):
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        text = f.read()
+            else:
+                if document_reader.is_encrypted(file_path, timer):
+                    if not password and not document_reader.has_cached_key(file_path):
+                        raise ValueError("檔案有密碼保護（encrypted），無法自動處理")
+                    # 解密與讀取的各步驟由 document_reader 記錄在同一個計時器
+                    temp_path = document_reader.decrypt_to_temp_file(file_path, password, timer)
+                    source_path = temp_path
+                text = document_reader.read_text(source_path, timer)
+                if write_images:
+                    images = document_reader.extract_images(source_path, timer)
+
+            text_path = f"{base}.txt"
+            if os.path.abspath(text_path) == os.path.abspath(file_path):
+                raise ValueError("輸出檔不可覆寫 .txt 原始檔")
+            write = _timed_exclusive("emit", lambda path, chunks: self._write_text(path, chunks), timer)
+            write(text_path, self.process(split_paragraph_chunks(text), timer))
+            outputs.append(text_path)
+
+            if sniff_format(source_path) == FORMAT_DOCX:
+                from docx_writer import correct_docx
+
+                docx_path = f"{base}.docx"
+                _timed_exclusive("emit", correct_docx, timer)(source_path, docx_path, self.paragraph_function(timer))
+                outputs.append(docx_path)
+
+            if write_images:
+                with timer.stage("emit"):
+                    image_dir = f"{base}_images"
+                    # 清除上次的圖片，圖片數量減少時才不會留下舊檔案
+                    shutil.rmtree(image_dir, ignore_errors=True)
+                    if images:
+                        os.makedirs(image_dir)
+                    for i, image in enumerate(images):
+                        image_path = os.path.join(image_dir, f"image_{i + 1}.png")
+                        image.save(image_path)
+                        outputs.append(image_path)
+        finally:
+            if temp_path is not None:
+                os.unlink(temp_path)
+
+        return DocumentResult(outputs, timer.rounded_stages())
+
+    @staticmethod
+    def _write_text(path, chunks):
+        """逐區塊寫出文字"""
+        with open(path, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+
+def build_pipeline(convert, protected_words=(), typo_fixes=None, normalization_rules=NORMALIZATION_RULES,
+                   context_corrector=None, renumber=False, fingerprint=None):
+    """以標準的階段建立處理流程：normalize → protect → convert → context → format
+
+    參數:
+        convert: 轉換函數（例如 OpenCC 的 convert）
+        protected_words: 保護詞彙
+        typo_fixes: 錯字字典
+        normalization_rules: 啟用的正規化規則，空的時候不正規化
+        context_corrector: ngram_model.ContextCorrector（可選）
+        renumber: 是否重新計算段落編號
+        fingerprint: 設定指紋（見 batch_manifest.settings_fingerprint）
+
+    回傳:
+        Pipeline
+    """
+    stages = []
+    if normalization_rules:
+        stages.append(NormalizeStage("normalize", TextNormalizer(normalization_rules).normalize))
+    stages.append(ProtectStage(protected_words, typo_fixes))
+    stages.append(SegmentStage("convert", convert))
+    if context_corrector is not None:
+        stages.append(MaskedStage("context", context_corrector.rescore))
+    if renumber:
+        stages.append(StreamStage("format", renumber_stream))
+    return Pipeline(stages, fingerprint)
+
+
+def load_pipeline(protected_words_path="protected_words.json", normalization_rules=NORMALIZATION_RULES,
+                  renumber=False):
+    """建立使用 OpenCC 簡轉繁、詞彙保護表與錯字字典的處理流程（批次與背景程序使用）
+
+    參數:
+        protected_words_path: 詞彙保護表路徑，錯字字典放在同一目錄
+        normalization_rules: 啟用的正規化規則
+        renumber: 是否重新計算段落編號
+
+    回傳:
+        Pipeline
+    """
+    import opencc
+
+    converter = opencc.OpenCC('s2t')
+    protected_words = ProtectedWordStore(protected_words_path).words()
+    typo_fixes = load_typo_dictionary(typo_dictionary_path(protected_words_path))
+    fingerprint = settings_fingerprint(conversion="s2t", protected_words=protected_words, typo_fixes=typo_fixes,
+                                       normalization_rules=sorted(normalization_rules), renumber=renumber)
+    return build_pipeline(converter.convert, protected_words, typo_fixes, normalization_rules, renumber=renumber,
+                          fingerprint=fingerprint)
+
+
+# 工作程序中常駐的處理流程（由 init_worker 建立）
+_worker_pipeline = None
+
+
+def init_worker(protected_words_path="protected_words.json"):
+    """工作程序啟動時建立一次處理流程（轉換器、保護詞彙與錯字字典），作為程序池的 initializer"""
+    global _worker_pipeline
+    _worker_pipeline = load_pipeline(protected_words_path)
+
+
+def worker_pipeline():
+    """取得工作程序中由 init_worker 建立的處理流程"""
+    return _worker_pipeline
+
+
+def correct_text(text):
+    """以工作程序中常駐的處理流程校正文字，保護特定詞彙並修正錯字"""
+    return _worker_pipeline.correct(text)
+
+
+def iter_input_files(paths, exclude=None):
+    """展開檔案與資料夾（含子資料夾）中支援的文件
+
+    參數:
+        paths: 檔案或資料夾路徑
+        exclude: 略過的資料夾（例如位於輸入資料夾中的輸出資料夾）
+    """
+    exclude = os.path.abspath(exclude) if exclude else None
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, subdirectories, files in os.walk(path):
+                if exclude is not None:
+                    subdirectories[:] = [name for name in subdirectories
+                                         if os.path.abspath(os.path.join(directory, name)) != exclude]
+                for name in sorted(files):
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS) and not name.startswith(("~$", ".")):
+                        yield os.path.join(directory, name)
+        else:
+            yield path
+
+
+def iter_input_jobs(paths, exclude=None):
+    """展開輸入並決定每份文件輸出的相對路徑
+
+    資料夾中的文件輸出到「資料夾名稱/子資料夾/檔名」，直接指定的檔案只使用檔名，
+    因此不同子資料夾中的同名文件不會輸出到同一個位置。
+
+    參數:
+        paths: 檔案或資料夾路徑
+        exclude: 略過的資料夾
+
+    回傳:
+        (文件路徑, 輸出相對路徑) 的迭代器
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            parent = os.path.dirname(os.path.abspath(path))
+            for file_path in iter_input_files([path], exclude):
+                yield file_path, os.path.relpath(os.path.abspath(file_path), parent)
+        else:
+            yield path, os.path.basename(path)
+
+
+def main(argv=None):
+    """批次處理主入口點"""
+    parser = argparse.ArgumentParser(description="不開啟視窗，批次校正文件")
+    parser.add_argument("inputs", nargs="+", help="文件或資料夾（.docx、.doc、.txt）")
+    parser.add_argument("--output", required=True, help="輸出資料夾")
+    parser.add_argument("--protected-words", default="protected_words.json", help="詞彙保護表路徑")
+    parser.add_argument("--no-normalize", action="store_true", help="不正規化全形半形字元與空白")
+    parser.add_argument("--renumber", action="store_true", help="重新計算段落編號")
+    parser.add_argument("--no-images", action="store_true", help="不輸出文件中的圖片")
+    parser.add_argument("--manifest", help="批次清單路徑（預設為輸出資料夾中的 manifest.jsonl）")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="同一份文件失敗後最多重試到第幾次")
+    args = parser.parse_args(argv)
+
+    pipeline = load_pipeline(args.protected_words, () if args.no_normalize else NORMALIZATION_RULES,
+                             args.renumber)
+    print(f"處理流程: {' → '.join(pipeline.plan())}")
+
+    # 依清單略過已完成的文件；內容或設定改變的文件重新處理，失敗的文件重試到上限為止
+    manifest_path = args.manifest or os.path.join(args.output, "manifest.jsonl")
+    jobs = iter_input_jobs(args.inputs, exclude=args.output)
+    counts = run_batch(pipeline, jobs, args.output, manifest_path, args.max_attempts,
+                       write_images=not args.no_images)
+    print(f"完成 {counts['done']} 份，失敗 {counts['failed']} 份，略過 {counts['skipped']} 份")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Module for storing protected words in a set-backed index with an append-only journal.
+"""
+import json
+import os
+import tempfile
+import threading
+from bisect import bisect_left, insort
+
+# 日誌累積到此筆數時自動壓縮為快照
+COMPACT_THRESHOLD = 1000
+# 變更筆數不超過此數時，直接更新已排序的列表而不重新排序
+INCREMENTAL_SORT_LIMIT = 64
+
+_ADD = "+"
+_REMOVE = "-"
+
+
+def read_snapshot(path):
+    """讀取詞彙保護表快照，同時接受列表與 {"protected_words": [...]} 兩種格式
+
+    參數:
+        path: 快照路徑
+
+    回傳:
+        詞彙列表（檔案不存在時為空列表）
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("protected_words", [])
+    if not isinstance(data, list):
+        raise ValueError("詞彙保護表格式不正確")
+    return [word for word in data if isinstance(word, str) and word]
+
+
+def write_snapshot(path, words):
+    """以排序後的列表原子性地寫出快照
+
+    先寫到同一目錄的暫存檔並同步到磁碟，再以 os.replace 取代原檔，
+    寫入途中當機也不會留下損壞的檔案。
+
+    參數:
+        path: 快照路徑
+        words: 詞彙（任意可迭代物件）
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".protected_words_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(sorted(words), f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def store_version(path):
+    """取得快照與變更日誌的修改時間，用於偵測其他程序寫入的變更
+
+    參數:
+        path: 快照路徑
+
+    回傳:
+        (快照修改時間, 日誌修改時間)，不存在的檔案為 None
+    """
+    version = []
+    for file_path in (path, f"{path}.journal"):
+        try:
+            version.append(os.stat(file_path).st_mtime_ns)
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+class ProtectedWordStore:
+    """以集合保存的詞彙保護表
+
+    成員檢查為 O(1)；每次新增或刪除只在日誌檔（快照路徑加上 .journal）
+    附加一行，日誌累積一定筆數或關閉時才壓縮成排序後的快照。
+    """
+
+    def __init__(self, path=None, compact_threshold=COMPACT_THRESHOLD):
+        """載入快照並重播日誌
+
+        參數:
+            path: 快照路徑；為 None 時只存在記憶體中
+            compact_threshold: 日誌累積到此筆數時自動壓縮
+        """
+        self.path = path
+        self.journal_path = f"{path}.journal" if path else None
+        self.compact_threshold = compact_threshold
+        self._words = set()
+        self._sorted = None  # 排序後的詞彙，變更時失效
+        self._journal_entries = 0
+        self._lock = threading.RLock()
+        if path:
+            self.load()
+
+    def load(self):
+        """從磁碟重新載入快照與日誌"""
+        with self._lock:
+            self._words = set(read_snapshot(self.path))
+            self._sorted = None
+            self._journal_entries = 0
+            if not os.path.exists(self.journal_path):
+                return
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op, word = json.loads(line)
+                    except ValueError:
+                        # 最後一行可能因當機而不完整
+                        continue
+                    if op == _ADD:
+                        self._words.add(word)
+                    elif op == _REMOVE:
+                        self._words.discard(word)
+                    self._journal_entries += 1
+
+    def __contains__(self, word):
+        return word in self._words
+
+    def __len__(self):
+        return len(self._words)
+
+    def __iter__(self):
+        return iter(self.words())
+
+    def words(self):
+        """取得排序後的詞彙列表（快取至下次變更）"""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._words)
+            return self._sorted
+
+    def _append_journal(self, entries):
+        """將變更附加到日誌並同步到磁碟"""
+        if not self.path or not entries:
+            return
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_entries += len(entries)
+        if self._journal_entries >= self.compact_threshold:
+            self.compact()
+
+    def update(self, add=(), remove=()):
+        """批次新增與刪除詞彙，只寫入一次日誌
+
+        參數:
+            add: 要新增的詞彙
+            remove: 要刪除的詞彙
+
+        回傳:
+            (實際新增的數量, 實際刪除的數量)
+        """
+        with self._lock:
+            entries = []
+            added = removed = 0
+            for word in add:
+                word = word.strip()
+                if word and word not in self._words:
+                    self._words.add(word)
+                    entries.append((_ADD, word))
+                    added += 1
+            for word in remove:
+                if word in self._words:
+                    self._words.discard(word)
+                    entries.append((_REMOVE, word))
+                    removed += 1
+            if entries:
+                self._update_sorted(entries)
+                self._append_journal(entries)
+            return added, removed
+
+    def _update_sorted(self, entries):
+        """依變更更新排序後的列表
+
+        已取得的列表可能仍在其他執行緒使用，因此複製後再修改。
+        """
+        if self._sorted is None:
+            return
+        if len(entries) > INCREMENTAL_SORT_LIMIT:
+            self._sorted = None
+            return
+        words = self._sorted.copy()
+        for op, word in entries:
+            if op == _ADD:
+                insort(words, word)
+            else:
+                del words[bisect_left(words, word)]
+        self._sorted = words
+
+    def prefix_range(self, prefix):
+        """找出排序後列表中以指定字首開頭的範圍
+
+        參數:
+            prefix: 字首
+
+        回傳:
+            (排序後的詞彙列表, 起始位置, 結束位置)
+        """
+        words = self.words()
+        if not prefix:
+            return words, 0, len(words)
+        start = bisect_left(words, prefix)
+        end = bisect_left(words, prefix + "\U0010ffff", start)
+        return words, start, end
+
+    def add(self, word):
+        """新增詞彙，回傳是否為新的詞彙"""
+        return self.update(add=(word,))[0] == 1
+
+    def remove(self, word):
+        """刪除詞彙，回傳詞彙是否存在"""
+        return self.update(remove=(word,))[1] == 1
+
+    def compact(self):
+        """將目前的詞彙寫成排序後的快照並清空日誌
+
+        快照取代後才清空日誌；兩者之間當機時，重播日誌的結果不變。
+        """
+        if not self.path:
+            return
+        with self._lock:
+            write_snapshot(self.path, self._words)
+            if os.path.exists(self.journal_path):
+                os.unlink(self.journal_path)
+            self._journal_entries = 0
+
+    def close(self):
+        """有未壓縮的變更時壓縮為快照"""
+        if self._journal_entries:
+            self.compact()
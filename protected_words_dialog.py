@@ -0,0 +1,254 @@
+"""
+Module for a virtualized protected-word manager with prefix search and bulk import/export.
+"""
+import csv
+import os
+import tkinter as tk
+from bisect import bisect_left
+from tkinter import filedialog, messagebox
+
+# 列表最多同時繪製的列數
+PAGE_ROWS = 100
+
+
+def read_word_file(file_path):
+    """讀取 TXT（每行一個詞彙）或 CSV（第一欄為詞彙）
+
+    參數:
+        file_path: 檔案路徑
+
+    回傳:
+        詞彙列表
+    """
+    # utf-8-sig 可同時讀取 Excel 匯出時帶有 BOM 的檔案
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        if file_path.lower().endswith(".csv"):
+            return [row[0].strip() for row in csv.reader(f) if row and row[0].strip()]
+        return [line.strip() for line in f if line.strip()]
+
+
+def write_word_file(file_path, words):
+    """將詞彙寫成 TXT（每行一個）或 CSV（單欄）
+
+    參數:
+        file_path: 檔案路徑
+        words: 詞彙（任意可迭代物件）
+    """
+    with open(file_path, "w", encoding="utf-8-sig" if file_path.lower().endswith(".csv") else "utf-8",
+              newline="") as f:
+        if file_path.lower().endswith(".csv"):
+            writer = csv.writer(f)
+            writer.writerows([word] for word in words)
+        else:
+            f.writelines(f"{word}\n" for word in words)
+
+
+class ProtectedWordsDialog:
+    """管理保護詞彙的視窗，只繪製目前可見的列"""
+
+    def __init__(self, root, store):
+        """建立管理視窗
+
+        參數:
+            root: 主視窗
+            store: ProtectedWordStore
+        """
+        self.root = root
+        self.store = store
+        self.words = []   # 目前的排序後詞彙列表
+        self.start = 0    # 篩選結果在 words 中的起始位置
+        self.end = 0      # 篩選結果在 words 中的結束位置
+        self.top = 0      # 目前頁面第一列在篩選結果中的位置
+        self.selected = None  # 選取的詞彙
+
+        self.window = tk.Toplevel(root)
+        self.window.title("管理保護詞彙")
+        self.window.geometry("400x500")
+
+        self.create_widgets()
+        self.apply_filter()
+
+    def create_widgets(self):
+        """建立視窗元件"""
+        frame = tk.Frame(self.window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # 搜尋列（依字首即時篩選）
+        search_bar = tk.Frame(frame)
+        search_bar.pack(fill=tk.X, pady=(0, 5))
+        tk.Label(search_bar, text="搜尋:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.apply_filter())
+        tk.Entry(search_bar, textvariable=self.search_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        self.count_label = tk.Label(frame, text="保護詞彙列表:", anchor=tk.W)
+        self.count_label.pack(fill=tk.X)
+
+        # 列表框只放目前頁面的詞彙，捲動條依篩選結果的總數計算
+        list_frame = tk.Frame(frame)
+        list_frame.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(list_frame, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(list_frame, activestyle=tk.NONE, exportselection=False)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        self.listbox.bind("<Configure>", lambda event: self.render())
+        self.listbox.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.listbox.bind("<Button-4>", lambda event: self.scroll_rows(-3))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll_rows(3))
+        self.listbox.bind("<Prior>", lambda event: self.scroll_rows(-self.visible_rows()))
+        self.listbox.bind("<Next>", lambda event: self.scroll_rows(self.visible_rows()))
+
+        # 新增詞彙
+        input_frame = tk.Frame(frame)
+        input_frame.pack(fill=tk.X, pady=5)
+        tk.Label(input_frame, text="新增詞彙:").pack(side=tk.LEFT)
+        self.word_entry = tk.Entry(input_frame)
+        self.word_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.word_entry.bind("<Return>", lambda event: self.add_word())
+
+        # 按鈕
+        buttons_frame = tk.Frame(frame)
+        buttons_frame.pack(fill=tk.X)
+        tk.Button(buttons_frame, text="添加", command=self.add_word).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="刪除", command=self.remove_word).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="匯入", command=self.import_words).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="匯出", command=self.export_words).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="關閉", command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+
+    def total_rows(self):
+        """篩選結果的詞彙數"""
+        return self.end - self.start
+
+    def visible_rows(self):
+        """列表框可容納的列數"""
+        height = self.listbox.winfo_height()
+        line_height = max(1, self.listbox.tk.call("font", "metrics", self.listbox.cget("font"), "-linespace"))
+        return max(1, min(PAGE_ROWS, height // line_height))
+
+    def apply_filter(self, keep_position=False):
+        """以排序後列表的二分搜尋找出符合字首的範圍"""
+        self.words, self.start, self.end = self.store.prefix_range(self.search_var.get().strip())
+        if not keep_position:
+            self.top = 0
+        self.render()
+
+    def render(self):
+        """只繪製目前頁面可見的詞彙"""
+        total = self.total_rows()
+        page = self.visible_rows()
+        self.top = max(0, min(self.top, total - page))
+        end = min(total, self.top + page)
+
+        page_words = self.words[self.start + self.top:self.start + end]
+        self.listbox.delete(0, tk.END)
+        if page_words:
+            self.listbox.insert(tk.END, *page_words)
+        if self.selected in page_words:
+            self.listbox.selection_set(page_words.index(self.selected))
+
+        if total:
+            self.scrollbar.set(self.top / total, end / total)
+        else:
+            self.scrollbar.set(0, 1)
+        self.count_label.config(text=f"保護詞彙列表: 共 {len(self.store)} 個，符合 {total} 個")
+
+    def scroll_rows(self, count):
+        """捲動指定列數"""
+        self.top = max(0, self.top + count)
+        self.render()
+        return "break"
+
+    def on_scrollbar(self, action, *args):
+        """處理捲動條事件"""
+        total = self.total_rows()
+        if action == "moveto":
+            self.top = int(float(args[0]) * total)
+        elif action == "scroll":
+            step = self.visible_rows() if args[1] == "pages" else 1
+            self.top += int(args[0]) * step
+        self.top = max(0, self.top)
+        self.render()
+
+    def on_mouse_wheel(self, event):
+        """處理滑鼠滾輪事件"""
+        return self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def on_select(self, event):
+        """記錄選取的詞彙（捲動後重新繪製時仍保持選取）"""
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.listbox.get(selection[0])
+
+    def show_word(self, word):
+        """捲動到篩選結果中的指定詞彙並選取"""
+        position = bisect_left(self.words, word, self.start, self.end)
+        if position < self.end and self.words[position] == word:
+            self.selected = word
+            self.top = max(0, position - self.start - self.visible_rows() // 2)
+        self.render()
+
+    def add_word(self):
+        """添加新詞彙到保護列表"""
+        word = self.word_entry.get().strip()
+        if not word:
+            return
+        try:
+            self.store.add(word)
+        except Exception as e:
+            messagebox.showerror("錯誤", f"無法儲存詞彙保護表: {str(e)}")
+            return
+        self.word_entry.delete(0, tk.END)
+        self.words, self.start, self.end = self.store.prefix_range(self.search_var.get().strip())
+        self.show_word(word)
+
+    def remove_word(self):
+        """從保護列表中移除選中的詞彙"""
+        if self.selected is None:
+            return
+        try:
+            self.store.remove(self.selected)
+        except Exception as e:
+            messagebox.showerror("錯誤", f"無法儲存詞彙保護表: {str(e)}")
+            return
+        self.selected = None
+        self.apply_filter(keep_position=True)
+
+    def import_words(self):
+        """從 TXT 或 CSV 批次匯入詞彙，只寫入一次"""
+        file_path = filedialog.askopenfilename(
+            parent=self.window,
+            title="匯入保護詞彙",
+            filetypes=[("文字或 CSV 檔案", "*.txt *.csv"), ("所有檔案", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            words = read_word_file(file_path)
+            added, _ = self.store.update(add=words)
+            # 大量匯入後直接壓縮為快照，避免日誌過長
+            if added:
+                self.store.compact()
+        except Exception as e:
+            messagebox.showerror("錯誤", f"無法匯入保護詞彙: {str(e)}", parent=self.window)
+            return
+        self.apply_filter(keep_position=True)
+        messagebox.showinfo("匯入完成", f"讀取 {len(words)} 個詞彙，新增 {added} 個", parent=self.window)
+
+    def export_words(self):
+        """將目前篩選結果匯出為 TXT 或 CSV"""
+        file_path = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="匯出保護詞彙",
+            defaultextension=".txt",
+            filetypes=[("文字檔案", "*.txt"), ("CSV 檔案", "*.csv")]
+        )
+        if not file_path:
+            return
+        try:
+            write_word_file(file_path, self.words[self.start:self.end])
+        except Exception as e:
+            messagebox.showerror("錯誤", f"無法匯出保護詞彙: {str(e)}", parent=self.window)
+            return
+        messagebox.showinfo("匯出完成", f"已匯出 {self.total_rows()} 個詞彙到 {os.path.basename(file_path)}",
+                            parent=self.window)
@@ -0,0 +1,109 @@
+"""
+Tests for batch_coordinator with several worker processes sharing a temp directory.
+"""
+import multiprocessing
+import os
+import time
+
+from batch_coordinator import BatchWorker, SharedQueue, job_key
+from pipeline import build_pipeline
+
+LEASE_SECONDS = 1.0
+POLL_INTERVAL = 0.1
+
+
+def recording_pipeline(root, delay):
+    """每份文件處理 delay 秒、並在共用的記錄檔記下每次處理的處理流程"""
+    pipeline = build_pipeline(lambda text: text)
+    process_document = pipeline.process_document
+
+    def recording_process_document(file_path, *args, **kwargs):
+        with open(os.path.join(root, "processed.log"), "a", encoding="utf-8") as f:
+            f.write(os.path.relpath(file_path, os.path.join(root, "input")) + "\n")
+        time.sleep(delay)
+        return process_document(file_path, *args, **kwargs)
+
+    pipeline.process_document = recording_process_document
+    return pipeline
+
+
+def run_worker(root, delay):
+    worker = BatchWorker(root, LEASE_SECONDS, POLL_INTERVAL)
+    worker.pipeline = recording_pipeline(root, delay)
+    worker.run()
+
+
+def write_inputs(root, count):
+    for i in range(count):
+        path = os.path.join(root, "input", f"folder{i % 3}", f"doc{i}.txt")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"第{i}份")
+
+
+def run_processes(root, count, delay):
+    processes = [multiprocessing.Process(target=run_worker, args=(root, delay)) for _ in range(count)]
+    for process in processes:
+        process.start()
+    deadline = time.monotonic() + 30
+    for process in processes:
+        process.join(max(0, deadline - time.monotonic()))
+    # 租約被反覆收回時工作程序不會結束，逾時後停止並判定失敗
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+
+
+def processed_paths(root):
+    with open(os.path.join(root, "processed.log"), "r", encoding="utf-8") as f:
+        return f.read().split()
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    root = str(tmp_path)
+    write_inputs(root, 5)
+    queue = SharedQueue(root)
+    assert queue.enqueue() == 5
+    assert queue.enqueue() == 0
+    assert queue.status() == {"todo": 5, "leased": 0, "done": 0, "failed": 0}
+
+
+def test_each_file_is_processed_exactly_once(tmp_path):
+    root = str(tmp_path)
+    write_inputs(root, 8)
+    queue = SharedQueue(root)
+    queue.enqueue()
+
+    # 每份文件的處理時間是租約有效時間的數倍，租約必須靠心跳維持而不被其他工作程序收回
+    run_processes(root, 3, LEASE_SECONDS * 2.5)
+
+    paths = processed_paths(root)
+    assert sorted(paths) == sorted(set(paths))
+    assert len(paths) == 8
+    assert queue.status() == {"todo": 0, "leased": 0, "done": 8, "failed": 0}
+    for i in range(8):
+        output = os.path.join(root, "output", f"folder{i % 3}", f"doc{i}.txt.txt")
+        with open(output, "r", encoding="utf-8") as f:
+            assert f.read() == f"第{i}份"
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    root = str(tmp_path)
+    write_inputs(root, 4)
+    queue = SharedQueue(root)
+    queue.enqueue()
+
+    # 模擬領取後就停止的工作程序：租約存在但不再更新
+    relative_path = os.path.join("folder0", "doc0.txt")
+    key = job_key(relative_path)
+    os.rename(queue.ticket_path(queue.todo_dir, key),
+              os.path.join(queue.lease_dir, f"{key}.dead-worker.lease"))
+
+    run_processes(root, 2, 0)
+
+    assert processed_paths(root).count(relative_path) == 1
+    assert queue.status() == {"todo": 0, "leased": 0, "done": 4, "failed": 0}
+    with open(os.path.join(root, "output", "folder0", "doc0.txt.txt"), "r", encoding="utf-8") as f:
+        assert f.read() == "第0份"
@@ -0,0 +1,106 @@
+"""
+Tests for resumable batch runs with batch_manifest.
+"""
+import os
+
+from batch_manifest import STATUS_DONE, STATUS_FAILED, BatchManifest, run_batch, settings_fingerprint
+from pipeline import build_pipeline, iter_input_jobs
+
+
+def make_pipeline(fingerprint="v1"):
+    return build_pipeline(lambda text: text, fingerprint=fingerprint)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def run(tmp_path, inputs, pipeline=None, max_attempts=3):
+    output_dir = str(tmp_path / "out")
+    jobs = iter_input_jobs([str(path) for path in inputs], exclude=output_dir)
+    return run_batch(pipeline or make_pipeline(), jobs, output_dir, str(tmp_path / "manifest.jsonl"), max_attempts)
+
+
+def test_settings_fingerprint_is_order_independent():
+    assert settings_fingerprint(a=1, b=[1, 2]) == settings_fingerprint(b=[1, 2], a=1)
+    assert settings_fingerprint(a=1) != settings_fingerprint(a=2)
+
+
+def test_resume_skips_done_and_reprocesses_changes(tmp_path):
+    source = str(tmp_path / "in" / "a.txt")
+    write(source, "內容")
+    assert run(tmp_path, [tmp_path / "in"]) == {"done": 1, "failed": 0, "skipped": 0}
+    assert run(tmp_path, [tmp_path / "in"]) == {"done": 0, "failed": 0, "skipped": 1}
+
+    # 只改修改時間：比對雜湊後略過
+    os.utime(source, ns=(0, 0))
+    assert run(tmp_path, [tmp_path / "in"])["skipped"] == 1
+
+    write(source, "新的內容")
+    assert run(tmp_path, [tmp_path / "in"])["done"] == 1
+    assert run(tmp_path, [tmp_path / "in"], make_pipeline("v2"))["done"] == 1
+
+
+def test_failures_stop_after_max_attempts(tmp_path):
+    source = str(tmp_path / "in" / "bad.txt")
+    os.makedirs(os.path.dirname(source))
+    with open(source, "wb") as f:
+        f.write(b"\xff\xfe\xfa")
+    for _ in range(2):
+        assert run(tmp_path, [tmp_path / "in"], max_attempts=2)["failed"] == 1
+    assert run(tmp_path, [tmp_path / "in"], max_attempts=2)["skipped"] == 1
+    record = BatchManifest(str(tmp_path / "manifest.jsonl")).records[os.path.abspath(source)]
+    assert record["status"] == STATUS_FAILED and record["attempts"] == 2
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    write(str(tmp_path / "in" / "a.txt"), "甲")
+    write(str(tmp_path / "in" / "b.txt"), "乙")
+    run(tmp_path, [tmp_path / "in" / "a.txt"])
+    manifest_path = str(tmp_path / "manifest.jsonl")
+    with open(manifest_path, "a", encoding="utf-8") as f:
+        f.write('{"path": "half')
+    run(tmp_path, [tmp_path / "in" / "b.txt"])
+    records = BatchManifest(manifest_path).records
+    assert [record["status"] for record in records.values()] == [STATUS_DONE, STATUS_DONE]
+
+
+def test_same_file_names_get_separate_outputs(tmp_path):
+    write(str(tmp_path / "in" / "a" / "report.txt"), "甲")
+    write(str(tmp_path / "in" / "b" / "report.txt"), "乙")
+    assert run(tmp_path, [tmp_path / "in"])["done"] == 2
+    records = BatchManifest(str(tmp_path / "manifest.jsonl")).records.values()
+    outputs = [path for record in records for path in record["outputs"]]
+    assert len(set(outputs)) == 2
+    assert sorted(open(path, encoding="utf-8").read() for path in outputs) == sorted(["甲", "乙"])
+
+
+def test_duplicate_output_path_is_not_recorded_as_done(tmp_path):
+    write(str(tmp_path / "x" / "docs" / "report.txt"), "甲")
+    write(str(tmp_path / "y" / "docs" / "report.txt"), "乙")
+    counts = run(tmp_path, [tmp_path / "x" / "docs", tmp_path / "y" / "docs"])
+    assert counts == {"done": 1, "failed": 1, "skipped": 0}
+    # 續跑時先完成的文件仍擁有該輸出，另一份不會被當成已完成而略過
+    counts = run(tmp_path, [tmp_path / "y" / "docs"])
+    assert counts["failed"] == 1
+    output = tmp_path / "out" / "docs" / "report.txt.txt"
+    assert output.read_text(encoding="utf-8") == "甲"
+
+
+def test_output_conflicts_are_found_before_any_document_is_processed(tmp_path):
+    write(str(tmp_path / "x" / "docs" / "report.txt"), "甲")
+    write(str(tmp_path / "y" / "docs" / "report.txt"), "乙")
+    output_dir = tmp_path / "out"
+
+    def jobs():
+        yield from iter_input_jobs([str(tmp_path / "x" / "docs")], exclude=str(output_dir))
+        # 產生最後一份工作時仍未處理任何文件
+        assert not output_dir.exists()
+        yield from iter_input_jobs([str(tmp_path / "y" / "docs")], exclude=str(output_dir))
+
+    counts = run_batch(make_pipeline(), jobs(), str(output_dir), str(tmp_path / "manifest.jsonl"))
+    assert counts == {"done": 1, "failed": 1, "skipped": 0}
+    records = BatchManifest(str(tmp_path / "manifest.jsonl")).records
+    assert list(records) == [os.path.abspath(tmp_path / "x" / "docs" / "report.txt")]
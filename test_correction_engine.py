@@ -0,0 +1,46 @@
+"""
+Tests for the single-scan correction engine.
+"""
+import json
+
+from correction_engine import CorrectionEngine, get_engine, load_typo_dictionary
+
+
+def test_longest_match_and_protected_words_win_over_typos():
+    engine = CorrectionEngine(["台北", "台北市"], {"台北": "臺北", "帳號": "賬號"})
+    assert list(engine.iter_matches("台北市的帳號")) == [(0, 3, None), (4, 6, "賬號")]
+    assert engine.correct("台北人的帳號", str.upper) == "台北人的賬號"
+
+
+def test_replaced_text_is_not_converted_and_spans_are_reported():
+    engine = CorrectionEngine(["abc"], {"teh": "the"})
+    spans = []
+    assert engine.correct("xabcyteh", str.upper, spans=spans) == "XabcYthe"
+    assert spans == [(1, 4), (5, 8)]
+    assert CorrectionEngine().correct("abc", str.upper) == "ABC"
+
+
+def test_normalize_sees_neighbouring_kept_text():
+    calls = []
+
+    def normalize(segment, before, after):
+        calls.append((segment, before, after))
+        return segment
+
+    CorrectionEngine(["保護"]).correct("甲保護乙", lambda text: text, normalize)
+    assert calls == [("甲", "", "保"), ("乙", "護", "")]
+
+
+def test_typo_dictionary_and_engine_are_reused(tmp_path):
+    path = str(tmp_path / "typo_dictionary.json")
+    assert load_typo_dictionary(path) == {}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"錯字": "正字", "": "空"}, f, ensure_ascii=False)
+    fixes = load_typo_dictionary(path)
+    assert fixes == {"錯字": "正字"}
+    assert load_typo_dictionary(path) is fixes
+
+    words = ["保護"]
+    engine = get_engine(words, fixes)
+    assert get_engine(words, fixes) is engine
+    assert get_engine(list(words), fixes) is not engine
@@ -0,0 +1,94 @@
+"""
+Tests for the local correction service.
+"""
+import http.client
+import os
+import signal
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from correction_service import CorrectionService, create_server
+
+
+def kill_worker():
+    """模擬工作程序被系統終止（例如記憶體不足）"""
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.fixture
+def server(tmp_path):
+    server, service = create_server(0, 1, str(tmp_path / "protected_words.json"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, service
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def post(server, path, body):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+    connection.request("POST", path, body)
+    return connection, connection.getresponse()
+
+
+def test_correct_text(server):
+    connection, response = post(server[0], "/correct", "这个 系統".encode("utf-8"))
+    assert response.status == 200
+    assert response.read().decode("utf-8") == "這個系統"
+    connection.close()
+
+
+def test_chunked_upload_without_length_is_rejected(server):
+    connection = http.client.HTTPConnection("127.0.0.1", server[0].server_address[1], timeout=30)
+    # 只送出標頭：服務不讀取內容就回應並關閉連線，之後再送的區塊會遇到已關閉的連線
+    connection.putrequest("POST", "/correct")
+    connection.putheader("Transfer-Encoding", "chunked")
+    connection.endheaders()
+    assert connection.getresponse().status == 411
+    connection.close()
+
+
+def test_failure_after_headers_does_not_look_successful(server, monkeypatch):
+    def fail_after_first_chunk(text):
+        yield "第一段"
+        raise RuntimeError("校正失敗")
+
+    monkeypatch.setattr(server[1], "iter_corrected_text", fail_after_first_chunk)
+    connection, response = post(server[0], "/correct", "內容".encode("utf-8"))
+    assert response.status == 200
+    with pytest.raises(http.client.IncompleteRead):
+        response.read()
+    connection.close()
+
+
+def test_replaced_pool_stays_usable_until_released(tmp_path):
+    words_path = str(tmp_path / "protected_words.json")
+    service = CorrectionService(1, words_path)
+    try:
+        with service.using_executor() as old_executor:
+            with open(words_path, "w", encoding="utf-8") as f:
+                f.write('["台積電"]')
+            new_executor = service.get_executor()
+            assert new_executor is not old_executor
+            # 舊的程序池在請求結束前仍可使用
+            assert old_executor.submit(len, "abc").result() == 3
+        with pytest.raises(RuntimeError):
+            old_executor.submit(len, "abc")
+        assert new_executor.submit(len, "abc").result() == 3
+    finally:
+        service.shutdown()
+
+
+def test_broken_pool_is_replaced(tmp_path):
+    service = CorrectionService(1, str(tmp_path / "protected_words.json"))
+    try:
+        with pytest.raises(BrokenProcessPool):
+            with service.using_executor() as executor:
+                executor.submit(kill_worker).result()
+        assert service.get_executor() is not executor
+        assert "".join(service.iter_corrected_text("这个")) == "這個"
+    finally:
+        service.shutdown()
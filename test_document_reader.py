@@ -0,0 +1,20 @@
+"""
+Tests for reading .docx text with tables kept in document order.
+"""
+from docx import Document
+
+from document_reader import read_text
+
+
+def test_tables_stay_in_document_order_and_merged_cells_appear_once(tmp_path):
+    doc = Document()
+    doc.add_paragraph("表格之前")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).merge(table.cell(1, 0)).text = "合併"
+    table.cell(0, 1).text = "甲"
+    table.cell(1, 1).text = "乙"
+    doc.add_paragraph("表格之後")
+    path = str(tmp_path / "table.docx")
+    doc.save(path)
+
+    assert read_text(path) == "表格之前\n\n合併\t甲\n\n乙\n\n表格之後"
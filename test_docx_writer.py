@@ -0,0 +1,165 @@
+"""
+Tests for streaming .docx correction with docx_writer.
+"""
+import io
+import random
+import struct
+import zipfile
+import zlib
+
+import docx_writer
+from docx_writer import correct_docx, correct_xml_stream
+
+DOCUMENT = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    '<w:p><w:pPr><w:pStyle w:val="a"/></w:pPr>'
+    '<w:r><w:t>外層開頭</w:t></w:r>'
+    '<w:r><w:pict><w:txbxContent>'
+    '<w:p><w:r><w:t>文字方塊一</w:t></w:r></w:p>'
+    '<w:p/>'
+    '<w:p><w:r><w:t>文字方塊二</w:t></w:r></w:p>'
+    '</w:txbxContent></w:pict></w:r>'
+    '<w:r><w:t>外層結尾</w:t></w:r></w:p>'
+    '<w:p><w:r><w:t xml:space="preserve">第二段 </w:t></w:r></w:p>'
+    '</w:body></w:document>'
+)
+
+
+class UnseekableWriter:
+    """只能依序寫入的檔案物件"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, data):
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+def write_foreign_zip(path, members):
+    """以其他工具常見的寫法寫出未壓縮的 zip：每個成員都帶 zip64 額外欄位與時間戳記欄位
+
+    參數:
+        path: 輸出路徑
+        members: (名稱, 內容) 的列表
+    """
+    timestamp = struct.pack("<HHBI", 0x5455, 5, 1, 0)
+    data = bytearray()
+    central = bytearray()
+    for name, content in members:
+        name = name.encode("utf-8")
+        crc = zlib.crc32(content)
+        # 大小欄位為 0xFFFFFFFF，實際大小放在 zip64 額外欄位（原始大小、壓縮後大小）
+        extra = struct.pack("<HHQQ", 1, 16, len(content), len(content)) + timestamp
+        offset = len(data)
+        data += struct.pack("<IHHHHHIIIHH", 0x04034B50, 45, 0, 0, 0, 33, crc,
+                            0xFFFFFFFF, 0xFFFFFFFF, len(name), len(extra)) + name + extra + content
+        central += struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, 45, 45, 0, 0, 0, 33, crc,
+                               0xFFFFFFFF, 0xFFFFFFFF, len(name), len(extra), 0, 0, 0, 0, offset) + name + extra
+    end = struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(members), len(members), len(central), len(data), 0)
+    with open(path, "wb") as f:
+        f.write(bytes(data + central + end))
+
+
+def extra_ids(extra):
+    """額外欄位中各區塊的標頭 ID"""
+    ids = []
+    position = 0
+    while position + 4 <= len(extra):
+        header_id, size = struct.unpack("<HH", extra[position:position + 4])
+        ids.append(header_id)
+        position += 4 + size
+    return ids
+
+
+def raw_member(path, name):
+    """讀取 zip 成員未解壓縮的資料"""
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name)
+        archive.fp.seek(info.header_offset)
+        header = archive.fp.read(zipfile.sizeFileHeader)
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        archive.fp.seek(name_length + extra_length, 1)
+        return archive.fp.read(info.compress_size)
+
+
+def test_nested_text_box_paragraphs_are_corrected_separately(monkeypatch):
+    calls = []
+
+    def correct(text):
+        calls.append(text)
+        return text.replace("一", "1")
+
+    # 很小的讀取區塊，讓緩衝區在文字方塊內的段落結束處被切開
+    monkeypatch.setattr(docx_writer, "READ_CHUNK_BYTES", 16)
+    output = io.BytesIO()
+    correct_xml_stream(io.BytesIO(DOCUMENT.encode("utf-8")), output, correct)
+
+    assert sorted(calls) == sorted(["外層開頭外層結尾", "文字方塊一", "文字方塊二", "第二段 "])
+    assert output.getvalue().decode("utf-8") == DOCUMENT.replace("文字方塊一", "文字方塊1")
+
+
+def test_untouched_members_are_copied_without_recompressing(tmp_path):
+    rng = random.Random(1)
+    image = bytes(rng.choice(b"abcdefgh") for _ in range(200000))
+    source = str(tmp_path / "source.docx")
+    with zipfile.ZipFile(source, "w") as archive:
+        archive.writestr("word/document.xml", DOCUMENT, zipfile.ZIP_DEFLATED)
+        # 以最低壓縮等級寫入，重新壓縮時會得到不同的資料
+        archive.writestr("word/media/image1.png", image, zipfile.ZIP_DEFLATED, 1)
+        archive.writestr("word/styles.xml", "<w:styles/>", zipfile.ZIP_STORED)
+
+    # 寫入無法定位的串流時，成員的 CRC 與大小放在資料之後的資料描述區
+    streamed = str(tmp_path / "streamed.docx")
+    with open(streamed, "wb") as f:
+        with zipfile.ZipFile(UnseekableWriter(f), "w") as archive:
+            with zipfile.ZipFile(source) as original:
+                for info in original.infolist():
+                    archive.writestr(info, original.read(info))
+    with zipfile.ZipFile(streamed) as archive:
+        assert all(info.flag_bits & 0x08 for info in archive.infolist())
+
+    for path in (source, streamed):
+        output = str(tmp_path / "output.docx")
+        correct_docx(path, output, lambda text: text.replace("一", "1"))
+        assert raw_member(output, "word/media/image1.png") == raw_member(path, "word/media/image1.png")
+        with zipfile.ZipFile(output) as archive:
+            assert archive.testzip() is None
+            assert archive.namelist() == ["word/document.xml", "word/media/image1.png", "word/styles.xml"]
+            assert archive.read("word/media/image1.png") == image
+            assert archive.read("word/styles.xml") == b"<w:styles/>"
+            assert "文字方塊1" in archive.read("word/document.xml").decode("utf-8")
+
+
+def test_zip64_extras_from_other_writers_are_rewritten(tmp_path):
+    image = bytes(range(256)) * 100
+    source = str(tmp_path / "source.docx")
+    write_foreign_zip(source, [("word/document.xml", DOCUMENT.encode("utf-8")), ("word/media/image1.png", image)])
+
+    output = str(tmp_path / "output.docx")
+    correct_docx(source, output, lambda text: text.replace("一", "1"))
+    assert raw_member(output, "word/media/image1.png") == image
+    with zipfile.ZipFile(output) as archive:
+        assert archive.testzip() is None
+        info = archive.getinfo("word/media/image1.png")
+        # 不留下過時的 zip64 欄位，其他額外欄位保留
+        assert extra_ids(info.extra) == [0x5455]
+        assert archive.read("word/media/image1.png") == image
+        assert "文字方塊1" in archive.read("word/document.xml").decode("utf-8")
+
+
+def test_members_are_recompressed_without_zipfile_internals(tmp_path, monkeypatch):
+    monkeypatch.setattr(docx_writer, "_RAW_COPY_ATTRIBUTES", ("fp", "missing_internal"))
+    source = str(tmp_path / "source.docx")
+    with zipfile.ZipFile(source, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", DOCUMENT)
+        archive.writestr("word/media/image1.png", b"png" * 1000)
+    output = str(tmp_path / "output.docx")
+    correct_docx(source, output, lambda text: text)
+    with zipfile.ZipFile(output) as archive:
+        assert archive.testzip() is None
+        assert archive.read("word/media/image1.png") == b"png" * 1000
+        assert archive.read("word/document.xml").decode("utf-8") == DOCUMENT
@@ -0,0 +1,92 @@
+"""
+Tests for reading Word 97-2003 text through the piece table.
+"""
+import io
+import struct
+
+import olefile
+import pytest
+
+from legacy_doc_reader import read_doc_text
+
+TEXT_OFFSET = 0x400
+
+
+class FakeOleFile:
+    """以記憶體中的資料流取代 CFB 檔案"""
+
+    streams = {}
+
+    def __init__(self, file_path):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def openstream(self, name):
+        return io.BytesIO(self.streams[name])
+
+
+def build_doc(pieces, flags=0x0200, extra_chars=0):
+    """組成 WordDocument 與 1Table 資料流
+
+    參數:
+        pieces: (文字, 是否以 cp1252 儲存) 的列表
+        flags: FIB 旗標
+        extra_chars: 主文件之後的字元數（例如頁尾），不應被讀出
+    """
+    word_document = bytearray(TEXT_OFFSET)
+    struct.pack_into("<H", word_document, 0, 0xA5EC)
+    struct.pack_into("<H", word_document, 0x0A, flags)
+    cps = [0]
+    fcs = []
+    for text, compressed in pieces:
+        fc = len(word_document)
+        if compressed:
+            word_document += text.encode("cp1252")
+            fcs.append(fc * 2 | 0x40000000)
+        else:
+            word_document += text.encode("utf-16-le")
+            fcs.append(fc)
+        cps.append(cps[-1] + len(text))
+    struct.pack_into("<i", word_document, 0x4C, cps[-1] - extra_chars)
+
+    plc_pcd = struct.pack(f"<{len(cps)}I", *cps)
+    plc_pcd += b"".join(struct.pack("<HIH", 0, fc, 0) for fc in fcs)
+    # Clx：先放一個 Prc（格式資料），再放 Pcdt
+    prc = b"\x01" + struct.pack("<H", 3) + b"abc"
+    table = b"\x00" * 16 + prc + b"\x02" + struct.pack("<I", len(plc_pcd)) + plc_pcd
+    struct.pack_into("<II", word_document, 0x1A2, 16, len(table) - 16)
+    return {"WordDocument": bytes(word_document), "1Table": table}
+
+
+@pytest.fixture
+def fake_ole(monkeypatch):
+    monkeypatch.setattr(olefile, "OleFileIO", FakeOleFile)
+    return FakeOleFile
+
+
+def test_mixed_encoding_pieces_and_field_codes(fake_ole):
+    fake_ole.streams = build_doc([
+        ("Caf\xe9\r", True),
+        ("中文\x13 HYPERLINK \"x\" \x14連結\x15\x07儲存格\r", False),
+        ("頁尾\r", False),
+    ], extra_chars=3)
+    assert read_doc_text("x.doc") == "Café\n中文連結\t儲存格"
+
+
+def test_nested_fields_keep_only_the_displayed_result(fake_ole):
+    fake_ole.streams = build_doc([("甲\x13 IF \x13 PAGE \x141\x15 \x14乙\x15丙\r", False)])
+    assert read_doc_text("x.doc") == "甲乙丙"
+
+
+def test_encrypted_and_invalid_documents_are_rejected(fake_ole):
+    fake_ole.streams = build_doc([("文字\r", False)], flags=0x0300)
+    with pytest.raises(ValueError, match="encrypted"):
+        read_doc_text("x.doc")
+    fake_ole.streams = {"WordDocument": b"\x00" * TEXT_OFFSET}
+    with pytest.raises(ValueError):
+        read_doc_text("x.doc")
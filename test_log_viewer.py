@@ -0,0 +1,33 @@
+"""
+Tests for the memory-mapped log index behind the log viewer.
+"""
+from log_viewer import LEVEL_CODES, LogIndex
+
+LINES = [
+    "2025-03-30 12:00:00 - INFO - 開始\n",
+    "2025-03-30 12:00:01 - ERROR - 失敗\n",
+    "  續行\n",
+    "2025-03-31 08:00:00 - WARNING - 警告\n",
+    "2025-03-31 08:00:01 - ERROR - 又失敗\n",
+]
+
+
+def test_filtering_new_lines_matches_full_filter(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("".join(LINES[:3]), encoding="utf-8")
+    index = LogIndex(str(path))
+    index.refresh()
+    index.index_more()
+    error = LEVEL_CODES[b"ERROR"]
+    view = index.filter_lines(error)
+    assert list(view) == [1, 2]
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(LINES[3:]))
+    index.refresh()
+    start = index.line_count
+    index.index_more()
+    view.extend(index.filter_lines(error, 0, start))
+    assert list(view) == list(index.filter_lines(error)) == [1, 2, 4]
+    assert list(index.filter_lines(0, 20250331, start)) == [3, 4]
+    index.close()
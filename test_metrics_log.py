@@ -0,0 +1,54 @@
+"""
+Tests for the size- and age-based rotation of the metrics log.
+"""
+import datetime
+import json
+import logging
+import os
+import time
+
+from metrics_log import JsonLineFormatter, SizeAndAgeRotatingFileHandler
+
+MAX_AGE_SECONDS = 60 * 60
+
+
+def make_handler(path):
+    handler = SizeAndAgeRotatingFileHandler(str(path), 1024 * 1024, MAX_AGE_SECONDS, 2)
+    handler.setFormatter(JsonLineFormatter())
+    return handler
+
+
+def write_record(path, age_seconds):
+    ts = datetime.datetime.fromtimestamp(time.time() - age_seconds).isoformat(timespec="milliseconds")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"ts": ts, "event": "document"}) + "\n")
+
+
+def record():
+    return logging.LogRecord("metrics", logging.INFO, __file__, 1, "document", None, None)
+
+
+def test_age_survives_restart_even_if_file_was_just_written(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    write_record(path, MAX_AGE_SECONDS + 60)
+    handler = make_handler(path)
+    try:
+        assert handler.shouldRollover(record())
+        handler.emit(record())
+        assert os.path.exists(f"{path}.1")
+        assert not handler.shouldRollover(record())
+    finally:
+        handler.close()
+
+
+def test_recent_or_unreadable_file_is_not_rotated(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    write_record(path, 60)
+    handler = make_handler(path)
+    assert not handler.shouldRollover(record())
+    handler.close()
+
+    path.write_text("{\"ts\": \"半行", encoding="utf-8")
+    handler = make_handler(path)
+    assert not handler.shouldRollover(record())
+    handler.close()
@@ -0,0 +1,36 @@
+"""
+Tests for the n-gram context corrector.
+"""
+from ngram_model import ContextCorrector, NgramModel, train_model
+from pipeline import build_pipeline
+
+CORPUS = ["我現在在家裡。", "他正在在公司。", "我們在台北見面。", "明天再說吧。", "請再試一次。"] * 20
+
+
+def make_corrector(tmp_path):
+    path = str(tmp_path / "model.bin")
+    train_model(CORPUS, path)
+    return ContextCorrector(NgramModel(path), [["在", "再"]], margin=0.5)
+
+
+def test_rescore_fixes_confusable_character(tmp_path):
+    corrector = make_corrector(tmp_path)
+    assert corrector.rescore("明天在說吧") == "明天再說吧"
+    assert corrector.rescore("我們在台北見面") == "我們在台北見面"
+
+
+def test_protected_spans_are_kept(tmp_path):
+    corrector = make_corrector(tmp_path)
+    assert corrector.rescore("明天在說吧", [(2, 3)]) == "明天在說吧"
+
+
+def test_character_next_to_protected_word_keeps_context(tmp_path):
+    corrector = make_corrector(tmp_path)
+    # 只看「我再」無法判斷，需要保護詞彙「家裡」作為後文
+    assert corrector.rescore("我再") == "我再"
+    pipeline = build_pipeline(lambda text: text, ["家裡"], context_corrector=corrector)
+    assert pipeline.plan() == ["normalize+protect+convert+context"]
+    assert pipeline.correct("我再家裡") == "我在家裡"
+    # 保護詞彙中的字不會被替換
+    pipeline = build_pipeline(lambda text: text, ["我再"], context_corrector=corrector)
+    assert pipeline.correct("我再家裡") == "我再家裡"
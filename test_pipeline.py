@@ -0,0 +1,72 @@
+"""
+Tests for the processing pipeline and its document outputs.
+"""
+import os
+import random
+
+from benchmark import generate_docx
+from pipeline import (ParagraphStage, Pipeline, build_pipeline, iter_input_jobs, split_paragraph_chunks)
+from perf_timer import StageTimer
+
+
+def upper(text):
+    return text.upper()
+
+
+def test_split_paragraph_chunks_keeps_text():
+    text = "第一段\n" * 1000
+    chunks = split_paragraph_chunks(text, 100)
+    assert "".join(chunks) == text
+    assert all(chunk.endswith("\n") for chunk in chunks)
+
+
+def test_fused_plan_and_protected_words():
+    pipeline = build_pipeline(upper, ["abc"], {"teh": "the"})
+    assert pipeline.plan() == ["normalize+protect+convert"]
+    assert pipeline.correct("abc xyz teh ｑ") == "abc XYZ the Q"
+
+
+def test_stage_timings():
+    pipeline = Pipeline(list(build_pipeline(upper, ["abc"]).stages) + [ParagraphStage("strip", str.strip)])
+    timer = StageTimer("test")
+    assert pipeline.correct(" abc def ", timer) == "abc DEF"
+    assert {"normalize", "protect", "convert", "strip"} <= set(timer.rounded_stages())
+
+
+def test_renumber_continues_across_chunks():
+    pipeline = build_pipeline(lambda text: text, renumber=True, normalization_rules=())
+    lines = ["一、第一節", "1. 項目", "1. 項目", "一、第二節"]
+    chunks = [line + "\n" for line in lines]
+    assert "".join(pipeline.process(chunks)).split("\n")[:4] == ["一、第一節", "1. 項目", "2. 項目", "二、第二節"]
+
+
+def test_same_names_in_subfolders_do_not_collide(tmp_path):
+    for folder, text in (("a", "甲"), ("b", "乙")):
+        os.makedirs(tmp_path / "in" / folder)
+        (tmp_path / "in" / folder / "report.txt").write_text(text, encoding="utf-8")
+    pipeline = build_pipeline(lambda text: text)
+    output_dir = tmp_path / "out"
+    outputs = [pipeline.process_document(path, str(output_dir), relative_path=relative).outputs
+               for path, relative in iter_input_jobs([str(tmp_path / "in")], exclude=str(output_dir))]
+    assert len({path for paths in outputs for path in paths}) == 2
+    assert (output_dir / "in" / "a" / "report.txt.txt").read_text(encoding="utf-8") == "甲"
+    assert (output_dir / "in" / "b" / "report.txt.txt").read_text(encoding="utf-8") == "乙"
+
+
+def test_doc_and_docx_outputs_and_images_are_replaced(tmp_path):
+    rng = random.Random(1)
+    docx_path = tmp_path / "x.docx"
+    generate_docx(rng, str(docx_path), 1, 0, 2)
+    (tmp_path / "x.txt").write_text("文字", encoding="utf-8")
+    pipeline = build_pipeline(lambda text: text)
+    output_dir = str(tmp_path / "out")
+
+    first = pipeline.process_document(str(docx_path), output_dir).outputs
+    second = pipeline.process_document(str(tmp_path / "x.txt"), output_dir).outputs
+    assert not set(first) & set(second)
+    assert len(os.listdir(os.path.join(output_dir, "x.docx_images"))) == 2
+
+    # 重新處理圖片較少的版本時不會留下舊圖片
+    generate_docx(rng, str(docx_path), 1, 0, 1)
+    pipeline.process_document(str(docx_path), output_dir)
+    assert os.listdir(os.path.join(output_dir, "x.docx_images")) == ["image_1.png"]
@@ -0,0 +1,68 @@
+"""
+Tests for text_normalizer and its use next to protected words.
+"""
+from correction_engine import CorrectionEngine
+from text_normalizer import TextNormalizer
+from typo_corrector import TypoCorrector
+
+
+def identity(text):
+    return text
+
+
+def correct(text, protected_words=(), typo_fixes=None):
+    """只正規化、不轉換的校正"""
+    engine = CorrectionEngine(protected_words, typo_fixes)
+    return engine.correct(text, identity, TextNormalizer().normalize)
+
+
+def test_normalize_characters():
+    normalizer = TextNormalizer()
+    assert normalizer.normalize("ＡＢＣ１２３") == "ABC123"
+    assert normalizer.normalize("中\u200b文\u00a0A") == "中文 A"
+    assert normalizer.normalize("第一行  \n第二行\t") == "第一行\n第二行"
+    assert normalizer.normalize("中 文") == "中文"
+    assert normalizer.normalize("是嗎?好!") == "是嗎？好！"
+    assert normalizer.normalize("a, b") == "a, b"
+
+
+def test_keeps_line_count_and_fullwidth_space():
+    normalizer = TextNormalizer()
+    text = "　　縮排\r\n下一行\x0cEnd"
+    result = normalizer.normalize(text)
+    assert result == "　　縮排\n下一行 End"
+    assert result.count("\n") == text.count("\n")
+
+
+def test_rules_can_be_disabled():
+    assert TextNormalizer(("fullwidth_alnum",)).normalize("ＡＢ 中 文 ") == "AB 中 文 "
+    assert TextNormalizer(()).normalize("中文?") == "中文?"
+
+
+def test_space_before_protected_word_is_kept():
+    assert correct("Hello 台積電 公司", ["台積電"]) == correct("Hello 台積電 公司")
+    assert correct("使用 Windows 系統", ["Windows"]) == "使用 Windows 系統"
+
+
+def test_context_rules_see_protected_neighbours():
+    # 保護詞彙本身不變，但相鄰片段與沒有保護時的結果相同
+    for text in ["台積電, 公司", "台積電(股)", "公司 台積電", "說明 Windows  \n下一行"]:
+        for words in (["台積電"], ["Windows"]):
+            assert correct(text, words) == correct(text)
+    assert correct("台積電 ", ["台積電"]) == "台積電"
+
+
+def test_protected_word_is_not_normalized():
+    assert correct("ＡＢ,中", ["ＡＢ,"]) == "ＡＢ,中"
+
+
+def test_typo_replacement_is_context():
+    assert correct("錯字 公司", typo_fixes={"錯字": "正字"}) == "正字公司"
+
+
+def test_typo_corrector_keeps_space_before_protected_word():
+    corrector = TypoCorrector()
+    corrector.add_protected_word("Windows")
+    assert corrector.correct_text("使用 Windows 系統") == "使用 Windows 系統"
+    corrector.add_protected_word("台積電")
+    assert corrector.correct_text("Hello 台積電 公司").startswith("Hello 台積電")
@@ -0,0 +1,106 @@
+"""
+Tests for the watch-folder daemon, run with a thread pool instead of worker processes.
+"""
+import os
+import shutil
+import signal
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import watch_folder
+from pipeline import init_worker
+from watch_folder import FolderWatcher
+
+
+process_file = watch_folder.process_file
+
+
+def killed_on_crash(file_path, outbox, output_name=None):
+    """檔名含 crash 時模擬工作程序被系統終止（例如記憶體不足）"""
+    if "crash" in os.path.basename(file_path):
+        os.kill(os.getpid(), signal.SIGKILL)
+    return process_file(file_path, outbox, output_name)
+
+
+def make_watcher(tmp_path):
+    init_worker(str(tmp_path / "protected_words.json"))
+    return FolderWatcher(str(tmp_path / "inbox"), str(tmp_path / "outbox"), str(tmp_path / "quarantine"),
+                         workers=1, stable_seconds=0)
+
+
+def drop(watcher, name, text):
+    with open(os.path.join(watcher.inbox, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def poll_until_idle(watcher, executor):
+    watcher.poll_once(executor)
+    while watcher.pending:
+        for future in watcher.pending.values():
+            future.result()
+        watcher.poll_once(executor)
+
+
+def test_same_name_dropped_twice_keeps_both_results(tmp_path):
+    watcher = make_watcher(tmp_path)
+    with ThreadPoolExecutor(1) as executor:
+        drop(watcher, "report.txt", "第一份")
+        poll_until_idle(watcher, executor)
+        drop(watcher, "report.txt", "第二份")
+        poll_until_idle(watcher, executor)
+    results = sorted(name for name in os.listdir(watcher.outbox) if name.endswith(".txt"))
+    assert len(results) == 2
+    texts = {open(os.path.join(watcher.outbox, name), encoding="utf-8").read() for name in results}
+    assert texts == {"第一份", "第二份"}
+    assert len(os.listdir(watcher.originals)) == 2
+
+
+def test_locked_original_is_moved_on_a_later_poll(tmp_path, monkeypatch):
+    watcher = make_watcher(tmp_path)
+    real_move = shutil.move
+    attempts = []
+
+    def locked_once(source, target):
+        attempts.append(source)
+        if len(attempts) == 1:
+            raise PermissionError("檔案被其他程式使用中")
+        return real_move(source, target)
+
+    monkeypatch.setattr(watch_folder.shutil, "move", locked_once)
+    with ThreadPoolExecutor(1) as executor:
+        drop(watcher, "a.txt", "內容")
+        poll_until_idle(watcher, executor)
+        assert os.listdir(watcher.inbox) == ["a.txt"]
+        assert watcher.unmoved
+        watcher.poll_once(executor)
+    assert os.listdir(watcher.inbox) == []
+    assert os.listdir(watcher.originals) == ["a.txt"]
+    # 移動失敗期間不會重新處理
+    assert [name for name in os.listdir(watcher.outbox) if name.endswith(".txt")] == ["a.txt.txt"]
+
+
+def test_killed_worker_quarantines_file_and_pool_is_rebuilt(tmp_path, monkeypatch):
+    watcher = make_watcher(tmp_path)
+    monkeypatch.setattr(watch_folder, "process_file", killed_on_crash)
+
+    executor = ProcessPoolExecutor(1, initializer=init_worker, initargs=(watcher.protected_words_path,))
+    drop(watcher, "crash.txt", "內容")
+    assert watcher.poll_once(executor)
+    for future in watcher.pending.values():
+        future.exception()
+    assert not watcher.poll_once(executor)
+    assert not watcher.pending
+    assert sorted(os.listdir(watcher.quarantine)) == ["crash.txt", "crash.txt.reason.txt"]
+    with open(os.path.join(watcher.quarantine, "crash.txt.reason.txt"), encoding="utf-8") as f:
+        assert "工作程序異常結束" in f.read()
+
+    # 損壞的程序池無法派送：檔案留在收件匣，不會被當成處理失敗
+    drop(watcher, "good.txt", "內容")
+    assert not watcher.poll_once(executor)
+    assert os.listdir(watcher.inbox) == ["good.txt"]
+    executor.shutdown()
+
+    with ProcessPoolExecutor(1, initializer=init_worker, initargs=(watcher.protected_words_path,)) as executor:
+        poll_until_idle(watcher, executor)
+    assert os.listdir(watcher.inbox) == []
+    assert os.listdir(watcher.originals) == ["good.txt"]
+    assert "good.txt.txt" in os.listdir(watcher.outbox)
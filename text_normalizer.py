@@ -0,0 +1,124 @@
+"""
+Module for table-driven normalization of full-width characters, punctuation, control characters and whitespace.
+"""
+import re
+
+# 可用的正規化規則（依套用順序）
+NORMALIZATION_RULES = ("fullwidth_alnum", "control_chars", "whitespace", "cjk_punctuation")
+
+# 中日韓統一表意文字（含擴充 A 與相容表意文字）
+_CJK = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+
+# 全形數字與拉丁字母 → 半形
+_FULLWIDTH_ALNUM = {
+    code: code - 0xFEE0
+    for start, end in ((0xFF10, 0xFF19), (0xFF21, 0xFF3A), (0xFF41, 0xFF5A))
+    for code in range(start, end + 1)
+}
+
+# 刪除的控制字元：C0（保留 \t 與 \n，\r\n 因此變成 \n）、DEL、C1、零寬字元、軟連字號與 BOM
+_CONTROL_CHARS = dict.fromkeys(
+    [code for code in range(0x20) if code not in (0x09, 0x0A)]
+    + list(range(0x7F, 0xA0))
+    + [0x00AD, 0x200B, 0x200C, 0x200D, 0x2060, 0xFEFF]
+)
+
+# 特殊空白 → 一般空白；垂直定位、換頁與段落分隔也換成空白，不改變行數
+# （可見範圍優先校正依行號套用各區塊的結果）。全形空白常用於縮排，保持不變
+_WHITESPACE = dict.fromkeys(
+    [0x0B, 0x0C, 0x00A0, 0x2028, 0x2029, 0x202F, 0x205F] + list(range(0x2000, 0x200B)),
+    " "
+)
+
+# 與中文字相鄰的半形標點 → 全形
+_HALFWIDTH_PUNCTUATION = str.maketrans(",;:?!()", "，；：？！（）")
+_CJK_PUNCTUATION = rf"(?P<punctuation>(?<=[{_CJK}])[,;:?!)]|[,;:?!(](?=[{_CJK}]))"
+# 中文字之間多餘的半形空白（Word 複製或對齊時產生），以及行尾空白
+_CJK_SPACE = rf"(?<=[{_CJK}]) +(?=[{_CJK}])"
+_TRAILING_SPACE = r"[ \t]+$"
+
+
+class TextNormalizer:
+    """以預先建立的 str.translate 表與編譯過的正規表達式，整段批次正規化文字
+
+    逐字元的規則先以字元類別在 C 層找出需要處理的連續字元，只對這些片段執行
+    translate；一般中文文字大多不含這些字元，因此幾乎不需要複製或查表。
+    """
+
+    def __init__(self, rules=NORMALIZATION_RULES):
+        """依啟用的規則建立轉換表
+
+        參數:
+            rules: 啟用的規則名稱（見 NORMALIZATION_RULES）
+        """
+        unknown = set(rules) - set(NORMALIZATION_RULES)
+        if unknown:
+            raise ValueError(f"未知的正規化規則: {', '.join(sorted(unknown))}")
+        self.rules = tuple(rule for rule in NORMALIZATION_RULES if rule in rules)
+
+        # 逐字元的規則合併成一張表，只需一次 translate
+        table = {}
+        if "fullwidth_alnum" in self.rules:
+            table.update(_FULLWIDTH_ALNUM)
+        if "control_chars" in self.rules:
+            table.update(_CONTROL_CHARS)
+        if "whitespace" in self.rules:
+            table.update(_WHITESPACE)
+        self.table = table
+        self.pattern = re.compile(
+            "[" + "".join(re.escape(chr(code)) for code in sorted(table)) + "]+") if table else None
+
+        # 依前後字元判斷的規則合併成一個正規表達式，只需掃描一次
+        context_rules = []
+        if "whitespace" in self.rules:
+            context_rules += [_CJK_SPACE, _TRAILING_SPACE]
+        if "cjk_punctuation" in self.rules:
+            context_rules.append(_CJK_PUNCTUATION)
+        self.context_pattern = re.compile("|".join(context_rules), re.MULTILINE) if context_rules else None
+
+    def normalize(self, text, before="", after=""):
+        """正規化文字
+
+        保護詞彙與錯字字典比對到的範圍不做正規化，但會作為相鄰片段的前後文：
+        保護詞彙前的空白不是行尾空白，與中文保護詞彙相鄰的標點與空白也和沒有保護時
+        一樣處理。
+
+        參數:
+            text: 要正規化的文字
+            before: 文字前一個字元（不會修改），位於行首或文字開頭時為空字串
+            after: 文字後一個字元（不會修改），位於文字結尾時為空字串
+
+        回傳:
+            正規化後的文字
+        """
+        if not text:
+            return text
+        if self.pattern is not None:
+            text = self.pattern.sub(self._translate_run, text)
+        if self.context_pattern is None:
+            return text
+        if not before and not after:
+            return self.context_pattern.sub(self._replace_context, text)
+
+        # 加上前後字元一起比對，但只修改文字本身範圍內的結果
+        low = len(before)
+        high = low + len(text)
+
+        def replace(match):
+            if match.start() < low or match.end() > high:
+                return match.group()
+            return self._replace_context(match)
+
+        padded = self.context_pattern.sub(replace, before + text + after)
+        return padded[low:len(padded) - len(after)]
+
+    def _translate_run(self, match):
+        """以轉換表處理一段連續需要正規化的字元"""
+        return match.group().translate(self.table)
+
+    @staticmethod
+    def _replace_context(match):
+        """與中文字相鄰的半形標點換成全形，多餘的空白刪除"""
+        if match.lastgroup == "punctuation":
+            return match.group().translate(_HALFWIDTH_PUNCTUATION)
+        return ""
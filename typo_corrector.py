@@ -1,24 +1,46 @@
 """
 Module for handling typo correction using the OpenCC library with protected words.
 """
-import json
-import os
-import opencc
+from correction_engine import get_engine, load_typo_dictionary, typo_dictionary_path
+from protected_word_store import ProtectedWordStore, write_snapshot
+from text_normalizer import NORMALIZATION_RULES, TextNormalizer
+
+def convert_with_protected_words(text, protected_words, convert, typo_fixes=None, normalize=None):
+    """
+    Convert text in a single scan, leaving protected words untouched and applying custom typo fixes
+    
+    Args:
+        text (str): Text to convert
+        protected_words (list of str): Words that must not be converted
+        convert (callable): Conversion function applied to unprotected segments
+        typo_fixes (dict, optional): Custom typo -> correction mapping
+        normalize (callable, optional): Normalization applied to unprotected segments before conversion,
+            called as normalize(segment, previous_char, next_char)
+    
+    Returns:
+        str: Converted text
+    """
+    # 保護詞彙與錯字字典編譯成同一個比對結構（同一組物件會重複使用已編譯的結果）
+    return get_engine(protected_words, typo_fixes).correct(text, convert, normalize)
+
 
 class TypoCorrector:
     """
     Class to handle typo correction using OpenCC while respecting a protected words list.
     """
     
-    def __init__(self, protected_words_file=None):
+    def __init__(self, protected_words_file=None, normalization_rules=NORMALIZATION_RULES):
         """
         Initialize the typo corrector with a protected words list
         
         Args:
             protected_words_file (str, optional): Path to the JSON file containing protected words
+            normalization_rules (iterable of str, optional): Normalization rules applied before
+                conversion; pass an empty tuple to disable normalization
         """
         # 初始化OpenCC轉換器（使用正確的配置路徑）
         try:
+            import opencc  # 載入較慢，於建立校正器時才匯入
             # 使用不帶.json後綴的配置名稱
             self.converter_t2s = opencc.OpenCC('t2s')  # 繁體到簡體
             self.converter_s2t = opencc.OpenCC('s2t')  # 簡體到繁體
@@ -27,17 +49,26 @@ class TypoCorrector:
             # 如果初始化失敗，使用空函數作為替代
             self.converter_t2s = self.converter_s2t = lambda x: x
         
-        # 載入受保護詞彙列表
-        self.protected_words = []
-        if protected_words_file and os.path.exists(protected_words_file):
-            try:
-                with open(protected_words_file, 'r', encoding='utf-8') as f:
-                    self.protected_words = json.load(f)
+        # 載入受保護詞彙（以集合保存，新增與刪除只附加變更日誌）
+        try:
+            self.protected_words = ProtectedWordStore(protected_words_file)
+            if protected_words_file:
                 print(f"已載入 {len(self.protected_words)} 個受保護詞彙")
+        except Exception as e:
+            print(f"載入受保護詞彙時發生錯誤: {e}")
+            # 無法讀取時只保存在記憶體中，避免覆寫原檔案
+            self.protected_words = ProtectedWordStore()
+        
+        # 載入與詞彙保護表放在同一目錄的錯字字典
+        self.typo_fixes = {}
+        if protected_words_file:
+            try:
+                self.typo_fixes = load_typo_dictionary(typo_dictionary_path(protected_words_file))
             except Exception as e:
-                print(f"載入受保護詞彙時發生錯誤: {e}")
-                # 如果文件不存在或格式錯誤，創建一個空的JSON文件
-                self.save_protected_words(protected_words_file)
+                print(f"載入錯字字典時發生錯誤: {e}")
+        
+        # 轉換前的文字正規化（全形半形、控制字元與空白）
+        self.normalizer = TextNormalizer(normalization_rules) if normalization_rules else None
     
     def add_protected_word(self, word):
         """
@@ -46,8 +77,7 @@ class TypoCorrector:
         Args:
             word (str): Word to add to the protected list
         """
-        if word and word not in self.protected_words:
-            self.protected_words.append(word)
+        self.protected_words.add(word)
     
     def remove_protected_word(self, word):
         """
@@ -56,21 +86,17 @@ class TypoCorrector:
         Args:
             word (str): Word to remove from the protected list
         """
-        if word in self.protected_words:
-            self.protected_words.remove(word)
+        self.protected_words.remove(word)
     
     def save_protected_words(self, file_path):
         """
-        Save the protected words list to a JSON file
+        Save the protected words list to a JSON file as a sorted snapshot
         
         Args:
             file_path (str): Path to save the JSON file
         """
         try:
-            # 確保目錄存在
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.protected_words, f, ensure_ascii=False, indent=4)
+            write_snapshot(file_path, self.protected_words.words())
             print(f"受保護詞彙已保存至 {file_path}")
         except Exception as e:
             print(f"保存受保護詞彙時發生錯誤: {e}")
@@ -88,26 +114,18 @@ class TypoCorrector:
         if not text:
             return text
         
-        # 將受保護詞彙替換為佔位符
-        placeholders = {}
-        for i, word in enumerate(self.protected_words):
-            if word in text:
-                placeholder = f"__PROTECTED_WORD_{i}__"
-                text = text.replace(word, placeholder)
-                placeholders[placeholder] = word
-        
-        try:
+        def convert(segment):
             # 繁體到簡體再到繁體的轉換（用於糾正錯別字）
-            corrected_text = text
-            if hasattr(self.converter_t2s, 'convert') and hasattr(self.converter_s2t, 'convert'):
-                simplified = self.converter_t2s.convert(text)
-                corrected_text = self.converter_s2t.convert(simplified)
-        except Exception as e:
-            print(f"轉換過程中發生錯誤: {e}")
-            corrected_text = text
+            try:
+                if hasattr(self.converter_t2s, 'convert') and hasattr(self.converter_s2t, 'convert'):
+                    return self.converter_s2t.convert(self.converter_t2s.convert(segment))
+            except Exception as e:
+                print(f"轉換過程中發生錯誤: {e}")
+            return segment
         
-        # 恢復受保護詞彙
-        for placeholder, word in placeholders.items():
-            corrected_text = corrected_text.replace(placeholder, word)
+        # 正規化只套用在保護詞彙與錯字以外的片段，相鄰的保護詞彙作為前後文
+        normalize = self.normalizer.normalize if self.normalizer is not None else None
         
-        return corrected_text
+        # 一次掃描完成保護詞彙、錯字修正與轉換
+        return convert_with_protected_words(text, self.protected_words.words(), convert, self.typo_fixes,
+                                            normalize)
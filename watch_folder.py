@@ -0,0 +1,291 @@
+"""
+Headless daemon that corrects documents dropped into an inbox folder.
+
+The inbox is polled (no external services), every file is processed only after
+its size and modification time have stopped changing, and documents are handled
+by a bounded process pool:
+
+    python watch_folder.py 收件匣 輸出匣 --quarantine 隔離區 --workers 4
+"""
+import argparse
+import datetime
+import os
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics_log import setup_metrics_logging, log_event
+from pipeline import SUPPORTED_EXTENSIONS, init_worker, worker_pipeline
+
+# Pipeline.process_document 在輸出名稱後加上的後綴
+_OUTPUT_SUFFIXES = (".txt", ".docx", "_images")
+
+# 複製中的暫存檔與 Word 的鎖定檔不處理
+_IGNORED_PREFIXES = ("~$", ".")
+_IGNORED_SUFFIXES = (".tmp", ".part", ".crdownload")
+
+
+def process_file(file_path, outbox, output_name=None):
+    """在工作程序中校正一個檔案，並將結果與圖片寫到輸出匣
+
+    參數:
+        file_path: 收件匣中的檔案路徑
+        outbox: 輸出匣路徑
+        output_name: 輸出檔名稱（含原副檔名），預設為檔名
+
+    回傳:
+        各階段耗時（毫秒）
+    """
+    return worker_pipeline().process_document(file_path, outbox, relative_path=output_name).stages
+
+
+def _unique_name(directory, name, suffixes=("",)):
+    """在目錄中取得不與現有檔案衝突的名稱
+
+    參數:
+        directory: 目錄
+        name: 原本的名稱
+        suffixes: 名稱之後會加上的後綴，任一個已存在就改用加上時間的名稱
+    """
+    if not any(os.path.exists(os.path.join(directory, name + suffix)) for suffix in suffixes):
+        return name
+    return _timestamped_name(name)
+
+
+def _timestamped_name(name):
+    """在名稱與副檔名之間加上目前時間"""
+    stem, ext = os.path.splitext(name)
+    suffix = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return f"{stem}_{suffix}{ext}"
+
+
+def _unique_path(directory, name):
+    """在目錄中取得不與現有檔案衝突的路徑"""
+    return os.path.join(directory, _unique_name(directory, name))
+
+
+class FolderWatcher:
+    """輪詢收件匣，將穩定的檔案交給有上限的程序池處理"""
+
+    def __init__(self, inbox, outbox, quarantine, workers=None, poll_interval=2.0,
+                 stable_seconds=2.0, max_pending=None, protected_words_path="protected_words.json"):
+        """初始化監看器
+
+        參數:
+            inbox: 收件匣路徑
+            outbox: 輸出匣路徑（校正結果、圖片與處理完成的原始檔）
+            quarantine: 隔離區路徑（處理失敗的檔案與原因）
+            workers: 工作程序數量，預設為 CPU 數量
+            poll_interval: 輪詢間隔（秒）
+            stable_seconds: 檔案大小與修改時間需維持不變的秒數
+            max_pending: 同時排隊與處理中的檔案上限，超過時暫停派送（預設為工作程序數的兩倍）
+            protected_words_path: 詞彙保護表路徑
+        """
+        self.inbox = inbox
+        self.outbox = outbox
+        self.quarantine = quarantine
+        self.originals = os.path.join(outbox, "originals")
+        self.workers = workers or os.cpu_count() or 1
+        self.poll_interval = poll_interval
+        self.stable_seconds = stable_seconds
+        self.max_pending = max_pending or self.workers * 2
+        self.protected_words_path = protected_words_path
+
+        self.observed = {}  # 路徑 → (大小, 修改時間, 首次觀察到此狀態的時間)
+        self.pending = {}   # 路徑 → Future
+        self.output_names = {}  # 處理中的路徑 → 輸出名稱
+        self.unmoved = {}  # 已處理但原始檔無法移動（例如被鎖定）的路徑 → (各階段耗時, 錯誤)
+
+        for directory in (inbox, outbox, quarantine, self.originals):
+            os.makedirs(directory, exist_ok=True)
+
+    def _is_candidate(self, entry):
+        """判斷收件匣中的項目是否為要處理的檔案"""
+        name = entry.name
+        return (entry.is_file()
+                and name.lower().endswith(SUPPORTED_EXTENSIONS)
+                and not name.startswith(_IGNORED_PREFIXES)
+                and not name.lower().endswith(_IGNORED_SUFFIXES))
+
+    def find_stable_files(self):
+        """掃描收件匣，回傳已停止變動的檔案
+
+        回傳:
+            可處理的檔案路徑列表（依最早穩定的順序）
+        """
+        now = time.monotonic()
+        seen = {}
+        stable = []
+        with os.scandir(self.inbox) as entries:
+            for entry in entries:
+                if not self._is_candidate(entry) or entry.path in self.pending or entry.path in self.unmoved:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                state = (stat.st_size, stat.st_mtime_ns)
+                previous = self.observed.get(entry.path)
+                since = previous[2] if previous and previous[:2] == state else now
+                seen[entry.path] = state + (since,)
+                if now - since >= self.stable_seconds:
+                    stable.append((since, entry.path))
+        # 已消失的檔案不再追蹤
+        self.observed = seen
+        return [path for _, path in sorted(stable)]
+
+    def _output_name(self, name):
+        """取得不會覆寫輸出匣中既有結果或處理中檔案的輸出名稱"""
+        if name in self.output_names.values():
+            return _timestamped_name(name)
+        return _unique_name(self.outbox, name, _OUTPUT_SUFFIXES)
+
+    def _finish(self, file_path, future):
+        """處理完成後移動原始檔，失敗時移到隔離區並寫出原因
+
+        回傳:
+            工作程序池是否仍可使用（有工作程序異常結束時為 False）
+        """
+        self.observed.pop(file_path, None)
+        self.output_names.pop(file_path, None)
+        broken = False
+        try:
+            stages, error = future.result(), None
+        except BrokenProcessPool as e:
+            # 工作程序被終止（例如記憶體不足或解析文件時當掉），處理中的檔案都無法完成
+            stages, error, broken = None, RuntimeError(f"處理期間工作程序異常結束: {str(e)}"), True
+        except Exception as e:
+            stages, error = None, e
+        self._move_original(file_path, stages, error)
+        return not broken
+
+    def _finish_all(self):
+        """程序池損壞後收回所有處理中的工作，未完成的都會以 BrokenProcessPool 結束並移到隔離區"""
+        for file_path, future in list(self.pending.items()):
+            del self.pending[file_path]
+            self._finish(file_path, future)
+
+    def _move_original(self, file_path, stages, error):
+        """將原始檔移到 originals 或隔離區；無法移動時留在收件匣，下一次輪詢再重試
+
+        參數:
+            file_path: 原始檔路徑
+            stages: 各階段耗時（處理成功時）
+            error: 處理失敗的例外（處理成功時為 None）
+        """
+        name = os.path.basename(file_path)
+        target = _unique_path(self.originals if error is None else self.quarantine, name)
+        try:
+            shutil.move(file_path, target)
+        except FileNotFoundError:
+            # 原始檔已被移走或刪除，不再重試
+            self.unmoved.pop(file_path, None)
+            print(f"找不到原始檔，略過移動: {name}")
+            return
+        except OSError as e:
+            if file_path not in self.unmoved:
+                print(f"無法移動原始檔，稍後重試: {name}（{str(e)}）")
+                log_event("watch_folder", file=name, status="move_failed", error=str(e))
+            self.unmoved[file_path] = (stages, error)
+            return
+        self.unmoved.pop(file_path, None)
+
+        if error is not None:
+            with open(f"{target}.reason.txt", "w", encoding="utf-8") as f:
+                f.write(f"時間: {datetime.datetime.now().isoformat(timespec='seconds')}\n")
+                f.write(f"錯誤: {str(error)}\n\n")
+                f.write("".join(traceback.format_exception(type(error), error, error.__traceback__)))
+            print(f"處理失敗，已移到隔離區: {name}（{str(error)}）")
+            log_event("watch_folder", file=name, status="quarantined", error=str(error))
+            return
+
+        print(f"已完成: {name}")
+        log_event("watch_folder", file=name, status="done", stages_ms=stages,
+                  total_ms=round(sum(stages.values()), 1))
+
+    def poll_once(self, executor):
+        """進行一次輪詢：收回已完成的工作，並在未達上限時派送新的檔案
+
+        參數:
+            executor: 工作程序池
+
+        回傳:
+            工作程序池是否仍可使用；為 False 時處理中的檔案已移到隔離區，
+            需要建立新的程序池後再繼續輪詢
+        """
+        for file_path, (stages, error) in list(self.unmoved.items()):
+            self._move_original(file_path, stages, error)
+
+        usable = True
+        for file_path, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[file_path]
+                usable = self._finish(file_path, future) and usable
+        if not usable:
+            self._finish_all()
+            return False
+
+        for file_path in self.find_stable_files():
+            # 達到上限時暫停派送，檔案留在收件匣等下一次輪詢
+            if len(self.pending) >= self.max_pending:
+                break
+            # 每份文件使用不重複的輸出名稱，之後放入的同名檔案不會覆寫先前的結果
+            output_name = self._output_name(os.path.basename(file_path))
+            try:
+                future = executor.submit(process_file, file_path, self.outbox, output_name)
+            except BrokenProcessPool:
+                # 尚未派送的檔案留在收件匣，重建程序池後再處理
+                self._finish_all()
+                return False
+            self.output_names[file_path] = output_name
+            self.pending[file_path] = future
+        return True
+
+    def _create_executor(self):
+        """建立預先載入詞彙保護表的工作程序池"""
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                   initargs=(self.protected_words_path,))
+
+    def run(self):
+        """持續監看收件匣，直到按下 Ctrl+C；工作程序異常結束時重建程序池並繼續監看"""
+        print(f"監看收件匣: {self.inbox}（工作程序 {self.workers} 個）")
+        while True:
+            with self._create_executor() as executor:
+                try:
+                    while self.poll_once(executor):
+                        time.sleep(self.poll_interval)
+                except KeyboardInterrupt:
+                    # 未完成的檔案留在收件匣，下次啟動時重新處理
+                    print(f"停止監看，{len(self.pending)} 個未完成的檔案留在收件匣")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self.pending.clear()
+                    return
+            print("工作程序異常結束，處理中的檔案已移到隔離區，重新建立程序池")
+            log_event("watch_folder", status="pool_rebuilt")
+
+
+def main(argv=None):
+    """監看模式主入口點"""
+    parser = argparse.ArgumentParser(description="監看收件匣並自動校正文件")
+    parser.add_argument("inbox", help="收件匣資料夾")
+    parser.add_argument("outbox", help="輸出匣資料夾")
+    parser.add_argument("--quarantine", help="隔離區資料夾（預設為輸出匣旁的 quarantine）")
+    parser.add_argument("--workers", type=int, help="工作程序數量（預設為 CPU 數量）")
+    parser.add_argument("--interval", type=float, default=2.0, help="輪詢間隔（秒）")
+    parser.add_argument("--stable", type=float, default=2.0, help="檔案需維持不變的秒數")
+    parser.add_argument("--protected-words", default="protected_words.json", help="詞彙保護表路徑")
+    args = parser.parse_args(argv)
+
+    quarantine = args.quarantine or os.path.join(os.path.dirname(os.path.abspath(args.outbox)), "quarantine")
+    setup_metrics_logging("logs")
+    FolderWatcher(args.inbox, args.outbox, quarantine, workers=args.workers,
+                  poll_interval=args.interval, stable_seconds=args.stable,
+                  protected_words_path=args.protected_words).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())